@@ -28,6 +28,7 @@ setup(
         "numpy>=1.26.4",
         "pandas>=2.2.1",
         "scipy>=1.11.0",
+        "pyarrow>=15.0.0",
         "plotly>=5.19.0",
         
         # Security Tools
@@ -61,6 +62,7 @@ setup(
         # Caching and Resilience
         "cachetools>=5.3.0",
         "tenacity>=8.2.0",
+        "msgpack>=1.0.7",
     ],
     extras_require={
         "dev": [
@@ -76,6 +78,9 @@ setup(
             "pytest>=7.0.0",
             "pytest-asyncio>=0.23.0",
             "pytest-cov>=4.1.0"
+        ],
+        "zstd": [
+            "zstandard>=0.22.0"
         ]
     },
     entry_points={
@@ -15,6 +15,7 @@ import openai
 from tools.network_analyzer import AdvancedNetworkAnalyzer, ParallelProcessor
 from integrations.api_client import SecurityFeedIntegration, FinancialDataIntegration
 from core.memory_system import AdvancedMemorySystem
+from core.profiler import install_profiler
 from core.config import config, logger
 
 # Importar configuración centralizada y logging
@@ -160,6 +161,8 @@ class AISystem:
         self.security_feed = SecurityFeedIntegration()
         self.financial_data = FinancialDataIntegration()
         self._setup_integrations()
+        # Perfilador por muestreo: SIGUSR2 o MAR_PROFILE=<segundos> (ver core/profiler)
+        self.profiler = install_profiler()
         logger.info("Sistema AI inicializado con memoria avanzada y motor de decisiones")
       def _validate_config_value(self, value: Any, key: str, 
                               min_value: Optional[float] = None, 
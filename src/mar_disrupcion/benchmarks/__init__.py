@@ -0,0 +1,43 @@
+"""
+Benchmarks package for MAR-DISRUPCION.
+Contains the benchmark harness (per-operation latency percentiles,
+JSON reports and baseline comparison), the subsystem suites, the
+concurrent load generator, the synthetic dataset builder and the
+embedding similarity search benchmark.
+"""
+
+from .harness import (
+    Benchmark, BenchmarkSuite, build_report, compare_reports,
+    format_comparison, format_report, load_report, run_suites,
+    save_report, summarize
+)
+from .dataset import DATASET_CATEGORIES, build_dataset
+from .load import LoadGenerator, classify_error, format_load_report, saturation_sweep
+from .vector_search import format_pareto_table, pareto_front, run_vector_benchmark
+from .suites import api_client_suite, cache_suite, memory_suite, parallel_suite
+
+__all__ = [
+    'Benchmark',
+    'BenchmarkSuite',
+    'build_report',
+    'compare_reports',
+    'format_comparison',
+    'format_report',
+    'load_report',
+    'run_suites',
+    'save_report',
+    'summarize',
+    'api_client_suite',
+    'cache_suite',
+    'memory_suite',
+    'parallel_suite',
+    'LoadGenerator',
+    'classify_error',
+    'format_load_report',
+    'saturation_sweep',
+    'DATASET_CATEGORIES',
+    'build_dataset',
+    'format_pareto_table',
+    'pareto_front',
+    'run_vector_benchmark',
+]
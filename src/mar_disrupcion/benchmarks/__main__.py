@@ -0,0 +1,228 @@
+"""
+Línea de órdenes de los benchmarks.
+
+``python -m src.mar_disrupcion.benchmarks run --output actual.json`` ejecuta
+las suites y guarda el informe; ``compare referencia.json actual.json``
+muestra las diferencias y termina con código 1 si hay regresiones;
+``load --rate 200 --duration 30`` genera carga concurrente sobre el sistema
+de memoria y ``load --sweep 50 100 200`` busca el punto de saturación;
+``dataset memory/system_memory.db --rows 10000000`` genera una base de datos
+de memoria sintética a escala de producción y ``vector-search --size 10000
+--size 100000`` compara estrategias de búsqueda por similitud (recall@k,
+consultas/s y p99) en una tabla de Pareto.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+from .harness import (
+    COMPARED_METRICS, DEFAULT_THRESHOLD, compare_reports, format_comparison,
+    format_report, load_report, run_suites, save_report
+)
+from .dataset import DEFAULT_EMBEDDING_DIM, build_dataset
+from .load import DEFAULT_MIX, LoadGenerator, format_load_report, saturation_sweep
+from .vector_search import DEFAULT_K, format_pareto_table, run_vector_benchmark
+from .suites import api_client_suite, cache_suite, memory_suite, parallel_suite
+
+SUITES = ("memory", "cache", "api_client", "parallel")
+
+
+async def _run(args: argparse.Namespace) -> int:
+    suites = []
+    with tempfile.TemporaryDirectory(dir=args.dir, prefix="benchmarks_") as tmp:
+        if "memory" in args.suite:
+            from ..core.config import config
+            from ..core.memory_system import AdvancedMemorySystem
+
+            memory_system = AdvancedMemorySystem(config=config, db_path=str(Path(tmp) / "memory.db"))
+            suites.append(memory_suite(memory_system, rounds=args.rounds, warmup=args.warmup))
+
+        if "cache" in args.suite:
+            if not args.redis_host:
+                print("Suite cache omitida: indica un servidor con --redis-host", file=sys.stderr)
+            else:
+                from ..core.cache import DistributedCache
+
+                cache = DistributedCache(hosts=args.redis_host, namespace="mar_disrupcion_benchmark")
+                suite = cache_suite(cache, rounds=args.rounds, warmup=args.warmup)
+                suite.add_cleanup(cache.flush)
+                suites.append(suite)
+
+        if "api_client" in args.suite:
+            suites.append(await api_client_suite(rounds=args.rounds, warmup=args.warmup))
+
+        if "parallel" in args.suite:
+            from ..tools.network_analyzer import ParallelProcessor
+
+            suites.append(parallel_suite(ParallelProcessor(batch_size=args.batch_size)))
+
+        report = await run_suites(suites)
+
+    print(format_report(report))
+    if args.output:
+        save_report(report, args.output)
+    return 0
+
+
+def _compare(args: argparse.Namespace) -> int:
+    rows = compare_reports(
+        load_report(args.baseline),
+        load_report(args.current),
+        threshold=args.threshold,
+        metrics=args.metric or COMPARED_METRICS
+    )
+    print(format_comparison(rows))
+    return 1 if any(row["status"] == "regression" for row in rows) else 0
+
+
+async def _load(args: argparse.Namespace) -> int:
+    from ..core.config import config
+    from ..core.memory_system import AdvancedMemorySystem
+
+    mix = dict(DEFAULT_MIX)
+    for item in args.mix or []:
+        name, _, weight = item.partition("=")
+        mix[name] = float(weight)
+    options = {
+        "mix": mix,
+        "concurrency": args.concurrency,
+        "threads": args.threads,
+        "window": args.window,
+        "seed": args.seed
+    }
+
+    with tempfile.TemporaryDirectory(dir=args.dir, prefix="load_") as tmp:
+        memory_system = AdvancedMemorySystem(config=config, db_path=str(Path(tmp) / "memory.db"))
+        if args.sweep:
+            result = await saturation_sweep(
+                memory_system, args.sweep, duration=args.duration,
+                p99_limit_ms=args.p99_limit_ms, **options
+            )
+            for step in result["steps"]:
+                print(
+                    f"{step['rate']:>8.0f}/s  {step['throughput']:>8.0f} ops/s  "
+                    f"p99 {step['p99_ms'] or 0:>8.2f} ms  "
+                    + ("saturado" if step["saturated"] else "ok")
+                )
+            print(f"Punto de saturación: {result['saturation_rate']}")
+        else:
+            result = await LoadGenerator(
+                memory_system, rate=args.rate, duration=args.duration, **options
+            ).run()
+            print(format_load_report(result))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2, sort_keys=True))
+    return 0
+
+
+def _dataset(args: argparse.Namespace) -> int:
+    result = build_dataset(
+        args.path,
+        rows=args.rows,
+        seed=args.seed,
+        days=args.days,
+        embedding_dim=args.embedding_dim,
+        relations_per_memory=args.relations,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        overwrite=args.overwrite
+    )
+    print(
+        f"{result['rows']} memorias y {result['relations']} relaciones en {result['elapsed']:.1f} s "
+        f"({result['rows_per_second']:.0f} filas/s, {result['size_bytes'] / 2 ** 20:.0f} MiB)"
+    )
+    return 0
+
+
+def _vector_search(args: argparse.Namespace) -> int:
+    rows = run_vector_benchmark(
+        args.size or [10_000, 100_000],
+        dim=args.dim,
+        k=args.k,
+        num_queries=args.queries,
+        seed=args.seed,
+        db_path=args.db
+    )
+    print(format_pareto_table(rows, only_pareto=args.pareto_only))
+    if args.output:
+        Path(args.output).write_text(json.dumps(rows, indent=2, sort_keys=True))
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de los subsistemas de MAR-DISRUPCION")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Ejecuta las suites y muestra las latencias")
+    run.add_argument("--suite", action="append", choices=SUITES, help="Suite a ejecutar (por defecto todas)")
+    run.add_argument("--rounds", type=int, default=200, help="Llamadas medidas por benchmark")
+    run.add_argument("--warmup", type=int, default=20, help="Llamadas de calentamiento descartadas")
+    run.add_argument("--output", default=None, help="Archivo JSON del informe")
+    run.add_argument("--dir", default=None, help="Directorio del disco para la base de datos temporal")
+    run.add_argument("--redis-host", action="append", help="Servidor Redis para la suite cache")
+    run.add_argument("--batch-size", type=int, default=64, help="Tamaño de lote del procesador paralelo")
+
+    compare = commands.add_parser("compare", help="Compara un informe con otro de referencia")
+    compare.add_argument("baseline", help="Informe de referencia")
+    compare.add_argument("current", help="Informe a comparar")
+    compare.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD,
+        help="Cambio relativo tolerado como ruido (0.10 = 10%%)"
+    )
+    compare.add_argument("--metric", action="append", help="Métricas comparadas (por defecto p50 y p99)")
+
+    load = commands.add_parser("load", help="Genera carga concurrente sobre el sistema de memoria")
+    load.add_argument("--rate", type=float, default=None, help="Llegadas por segundo (por defecto lazo cerrado)")
+    load.add_argument("--sweep", type=float, nargs="+", help="Ritmos crecientes para buscar la saturación")
+    load.add_argument("--p99-limit-ms", type=float, default=None, help="p99 máximo aceptable en el barrido")
+    load.add_argument("--duration", type=float, default=10.0, help="Segundos de carga (por ritmo)")
+    load.add_argument("--concurrency", type=int, default=16, help="Corrutinas por bucle en lazo cerrado")
+    load.add_argument("--threads", type=int, default=0, help="Hilos adicionales con su bucle de eventos")
+    load.add_argument("--window", type=float, default=1.0, help="Segundos de cada ventana del informe")
+    load.add_argument("--mix", action="append", help="Peso de una operación, p. ej. store=0.5")
+    load.add_argument("--seed", type=int, default=0, help="Semilla de la mezcla y los datos")
+    load.add_argument("--output", default=None, help="Archivo JSON del informe")
+    load.add_argument("--dir", default=None, help="Directorio del disco para la base de datos temporal")
+
+    dataset = commands.add_parser("dataset", help="Genera una base de datos de memoria sintética")
+    dataset.add_argument("path", help="Archivo de la base de datos a crear")
+    dataset.add_argument("--rows", type=int, default=1_000_000, help="Memorias a generar")
+    dataset.add_argument("--seed", type=int, default=0, help="Semilla de los datos")
+    dataset.add_argument("--days", type=float, default=30.0, help="Días en los que se reparten las memorias")
+    dataset.add_argument(
+        "--embedding-dim", type=int, default=DEFAULT_EMBEDDING_DIM, help="Dimensión de los embeddings"
+    )
+    dataset.add_argument("--relations", type=float, default=1.0, help="Relaciones medias por memoria")
+    dataset.add_argument("--batch-size", type=int, default=20000, help="Filas por transacción")
+    dataset.add_argument("--workers", type=int, default=None, help="Procesos generadores (por defecto uno por CPU)")
+    dataset.add_argument("--overwrite", action="store_true", help="Sustituye la base de datos si existe")
+
+    vector = commands.add_parser("vector-search", help="Recall y latencia de la búsqueda por similitud")
+    vector.add_argument("--size", type=int, action="append", help="Vectores indexados (repetible)")
+    vector.add_argument("--dim", type=int, default=256, help="Dimensión de los embeddings sintéticos")
+    vector.add_argument("--k", type=int, default=DEFAULT_K, help="Vecinos por consulta")
+    vector.add_argument("--queries", type=int, default=500, help="Consultas por configuración")
+    vector.add_argument("--seed", type=int, default=0, help="Semilla de los datos y las consultas")
+    vector.add_argument("--db", default=None, help="Base de datos de memoria de la que leer los embeddings")
+    vector.add_argument("--pareto-only", action="store_true", help="Muestra solo el frente de Pareto")
+    vector.add_argument("--output", default=None, help="Archivo JSON con todas las filas")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        return _compare(args)
+    if args.command == "dataset":
+        return _dataset(args)
+    if args.command == "vector-search":
+        return _vector_search(args)
+    if args.command == "load":
+        return asyncio.run(_load(args))
+    args.suite = args.suite or list(SUITES)
+    return asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,414 @@
+"""
+Generador masivo de bases de datos de memoria sintéticas.
+
+Escribe directamente un ``system_memory.db`` con el esquema del sistema de
+memoria, sin pasar por ``store_memory``: los embeddings son vectores
+unitarios aleatorios en lugar de salidas del LSTM y las filas se insertan
+por lotes grandes en transacciones únicas, con los índices creados al
+final. Los lotes se generan en procesos paralelos mientras el proceso
+principal escribe.
+
+Distribuciones:
+
+- Categorías con sesgo de Zipf: pocas categorías concentran la mayoría de
+  las memorias.
+- Importancia con distribución beta (por defecto ``Beta(2, 5)``): la
+  mayoría poco importante y una cola de memorias importantes.
+- Contenido con la forma de los eventos reales según la categoría:
+  resultados de escaneos, cotizaciones y alertas.
+- Relaciones con un número de Poisson por memoria hacia memorias
+  anteriores cercanas (la distancia sigue una geométrica).
+
+El resultado depende solo de la semilla, del número de filas y de ``end``;
+no del número de procesos ni del tamaño de lote.
+"""
+import logging
+import os
+import pickle
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from ..core.memory_schema import MEMORY_COLUMNS, RELATIONS_TABLE, apply_schema
+from ..core.snowflake import EPOCH_MS, MAX_NODE_ID, MAX_SEQUENCE, NODE_BITS, SEQUENCE_BITS
+from ..core.storage import open_connection
+
+logger = logging.getLogger(__name__)
+
+# Categorías por rango de Zipf y forma de su contenido
+DATASET_CATEGORIES: Dict[str, str] = {
+    "security": "alert",
+    "network_scan": "scan",
+    "market_data": "quote",
+    "alerts": "alert",
+    "vulnerabilities": "scan",
+    "financial": "quote",
+    "incidents": "alert",
+}
+
+# Igual que lstm_hidden_size en config.toml
+DEFAULT_EMBEDDING_DIM = 1024
+
+# Distancia media (en filas) entre una memoria y las que relaciona
+RELATION_LOCALITY = 1000
+
+# Ajustes de la conexión de carga: sin diario ni sincronización, el archivo
+# se prepara aparte y solo se publica completo
+BULK_PROFILE = {
+    "journal_mode": "off",
+    "synchronous": "off",
+    "cache_size": -262144,
+    "temp_store": "memory"
+}
+
+BUILDING_SUFFIX = ".building"
+
+# Filas de cada bloque con su propio generador aleatorio; los lotes son
+# múltiplos de bloques, así el resultado no depende del tamaño de lote
+SEED_BLOCK_ROWS = 1000
+
+_SERVICES = [(22, "ssh"), (80, "http"), (443, "https"), (3306, "mysql"), (5432, "postgresql"),
+             (6379, "redis"), (8080, "http-proxy"), (25, "smtp"), (53, "domain"), (3389, "ms-wbt-server")]
+_SEVERITIES = ["low", "medium", "high", "critical"]
+_ALERT_TYPES = ["intrusion", "malware", "anomaly", "policy_violation", "brute_force", "data_exfiltration"]
+_SYMBOLS = ["AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "BTC-USD", "ETH-USD", "EURUSD", "SAN.MC", "ITX.MC"]
+
+
+def _address(rng: random.Random) -> str:
+    return f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+
+
+def _scan_result(rng: random.Random, timestamp: str) -> Dict[str, Any]:
+    """Resultado de un análisis de red, como el de NetworkAnalyzer."""
+    ports = rng.sample(_SERVICES, rng.randint(1, 6))
+    return {
+        "target": _address(rng),
+        "scan_type": rng.choice(["deep", "quick"]),
+        "port_scan": [
+            {"port": port, "state": rng.choice(["open", "open", "filtered"]), "service": service}
+            for port, service in ports
+        ],
+        "vulnerabilities": [
+            {
+                "id": f"CVE-{rng.randint(2015, 2025)}-{rng.randint(1000, 49999)}",
+                "severity": rng.choice(_SEVERITIES),
+                "type": "vulnerability",
+                "port": rng.choice(ports)[0]
+            }
+            for _ in range(int(rng.expovariate(1.5)))
+        ],
+        "duration": round(rng.uniform(0.5, 120.0), 3),
+        "timestamp": timestamp
+    }
+
+
+def _quote(rng: random.Random, timestamp: str) -> Dict[str, Any]:
+    """Cotización de mercado, como las de FinancialDataIntegration."""
+    price = round(rng.lognormvariate(4.0, 1.2), 4)
+    spread = price * rng.uniform(0.0001, 0.002)
+    return {
+        "symbol": rng.choice(_SYMBOLS),
+        "price": price,
+        "bid": round(price - spread / 2, 4),
+        "ask": round(price + spread / 2, 4),
+        "volume": int(rng.paretovariate(1.2) * 100),
+        "change_percent": round(rng.gauss(0.0, 1.5), 3),
+        "timestamp": timestamp
+    }
+
+
+def _alert(rng: random.Random, timestamp: str) -> Dict[str, Any]:
+    """Alerta de seguridad."""
+    alert_type = rng.choice(_ALERT_TYPES)
+    return {
+        "type": alert_type,
+        "severity": rng.choices(_SEVERITIES, weights=[50, 30, 15, 5])[0],
+        "source": _address(rng),
+        "destination": _address(rng),
+        "message": f"{alert_type} detectado ({rng.randint(1, 500)} eventos)",
+        "confidence": round(rng.random(), 3),
+        "timestamp": timestamp
+    }
+
+
+_CONTENT = {"scan": _scan_result, "quote": _quote, "alert": _alert}
+
+
+def _ids(indexes: np.ndarray, rows: int, start_ms: int, span_ms: int, node_id: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ids snowflake y milisegundos Unix de las filas ``indexes``.
+
+    Las filas se reparten uniformemente entre ``start_ms`` y
+    ``start_ms + span_ms``; las que caen en el mismo milisegundo usan
+    secuencias consecutivas, así que los ids son únicos y crecientes.
+    """
+    offsets = indexes * span_ms // rows
+    first = -((-offsets * rows) // span_ms)
+    sequence = indexes - first
+    unix_ms = start_ms + offsets
+    ids = ((unix_ms - EPOCH_MS) << (NODE_BITS + SEQUENCE_BITS)) | (node_id << SEQUENCE_BITS) | sequence
+    return ids, unix_ms
+
+
+def _build_block(spec: Dict[str, Any], first: int, count: int) -> Tuple[List[tuple], List[tuple]]:
+    """Genera las filas de memorias y relaciones de un bloque."""
+    rows = spec["rows"]
+    np_rng = np.random.default_rng([spec["seed"], first])
+    rng = random.Random(spec["seed"] * 1_000_003 + first)
+
+    indexes = np.arange(first, first + count, dtype=np.int64)
+    ids, unix_ms = _ids(indexes, rows, spec["start_ms"], spec["span_ms"], spec["node_id"])
+
+    categories = list(DATASET_CATEGORIES)
+    weights = 1.0 / np.arange(1, len(categories) + 1) ** spec["category_skew"]
+    category_index = np_rng.choice(len(categories), size=count, p=weights / weights.sum())
+    importance = np_rng.beta(spec["importance_alpha"], spec["importance_beta"], size=count)
+
+    embeddings = np_rng.standard_normal((count, spec["embedding_dim"]), dtype=np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    # Las memorias importantes se consultan más y más recientemente
+    access_count = np_rng.poisson(importance * 10)
+    age = spec["end_ms"] - unix_ms
+    accessed_ms = np.where(access_count > 0, spec["end_ms"] - (age * np_rng.random(count)).astype(np.int64), unix_ms)
+
+    relation_counts = np_rng.poisson(spec["relations_per_memory"], size=count)
+    distances = 1 + np_rng.geometric(1.0 / RELATION_LOCALITY, size=int(relation_counts.sum()))
+
+    memories = []
+    columns = zip(
+        ids.tolist(), category_index.tolist(), importance.tolist(),
+        unix_ms.tolist(), accessed_ms.tolist(), access_count.tolist()
+    )
+    for i, (memory_id, category_i, weight, created, accessed, accesses) in enumerate(columns):
+        timestamp = datetime.fromtimestamp(created / 1000).isoformat(" ")
+        category = categories[category_i]
+        content = _CONTENT[DATASET_CATEGORIES[category]](rng, timestamp)
+        memories.append((
+            memory_id,
+            category,
+            pickle.dumps(content),
+            weight,
+            timestamp,
+            datetime.fromtimestamp(accessed / 1000).isoformat(" "),
+            accesses,
+            pickle.dumps(embeddings[i:i + 1])
+        ))
+
+    # Destinos anteriores a cada fuente; se descartan los repetidos y los
+    # que caerían antes de la primera fila
+    sources = np.repeat(indexes, relation_counts)
+    targets = sources - distances
+    keep = targets >= 0
+    sources, targets = sources[keep], targets[keep]
+    pairs = np.unique(np.stack([sources, targets], axis=1), axis=0)
+    relations = []
+    if len(pairs):
+        source_ids, _ = _ids(pairs[:, 0], rows, spec["start_ms"], spec["span_ms"], spec["node_id"])
+        target_ids, _ = _ids(pairs[:, 1], rows, spec["start_ms"], spec["span_ms"], spec["node_id"])
+        strength = importance[pairs[:, 0] - first]
+        relations = [
+            (s, t, "related", w)
+            for s, t, w in zip(source_ids.tolist(), target_ids.tolist(), strength.tolist())
+        ]
+
+    return memories, relations
+
+
+def _build_batch(spec: Dict[str, Any]) -> Tuple[List[tuple], List[tuple]]:
+    """Genera las filas de memorias y relaciones de un lote."""
+    memories, relations = [], []
+    end = spec["first"] + spec["count"]
+    for first in range(spec["first"], end, SEED_BLOCK_ROWS):
+        block_memories, block_relations = _build_block(spec, first, min(SEED_BLOCK_ROWS, end - first))
+        memories.extend(block_memories)
+        relations.extend(block_relations)
+    return memories, relations
+
+
+def build_dataset(
+    db_path: Union[str, Path],
+    rows: int,
+    seed: int = 0,
+    days: float = 30.0,
+    end: Optional[datetime] = None,
+    embedding_dim: int = DEFAULT_EMBEDDING_DIM,
+    relations_per_memory: float = 1.0,
+    category_skew: float = 1.1,
+    importance_alpha: float = 2.0,
+    importance_beta: float = 5.0,
+    node_id: int = 0,
+    batch_size: int = 20000,
+    workers: Optional[int] = None,
+    overwrite: bool = False
+) -> Dict[str, Any]:
+    """
+    Genera una base de datos de memoria sintética.
+
+    La base de datos se escribe en un archivo ``.building`` junto al
+    destino y se renombra al terminar, así que nunca queda a medias. Las
+    memorias van a la tabla ``memories`` (sin particiones diarias).
+
+    Args:
+        db_path: Archivo de la base de datos a crear
+        rows: Memorias a generar
+        seed: Semilla de todos los datos
+        days: Días hacia atrás desde ``end`` en los que se reparten las memorias
+        end: Instante de la memoria más reciente (por defecto ahora)
+        embedding_dim: Dimensión de los embeddings
+        relations_per_memory: Relaciones medias por memoria
+        category_skew: Exponente de Zipf de las categorías
+        importance_alpha: Parámetro alfa de la beta de importancia
+        importance_beta: Parámetro beta de la beta de importancia
+        node_id: Nodo de los ids snowflake
+        batch_size: Filas por lote y por transacción (se redondea a un
+            múltiplo de ``SEED_BLOCK_ROWS``)
+        workers: Procesos generadores (por defecto uno por CPU; 0 genera
+            en el proceso principal)
+        overwrite: Sustituye el archivo si ya existe
+
+    Returns:
+        Filas, relaciones, duración, ritmo y tamaño del archivo
+
+    Raises:
+        FileExistsError: Si el archivo existe y no se pide sobrescribirlo
+        ValueError: Si los parámetros no permiten ids únicos
+    """
+    db_path = Path(db_path)
+    if db_path.exists() and not overwrite:
+        raise FileExistsError(f"La base de datos ya existe: {db_path}")
+    if not 0 <= node_id <= MAX_NODE_ID:
+        raise ValueError(f"node_id fuera de rango: {node_id}")
+
+    end = end or datetime.now()
+    end_ms = int(end.timestamp() * 1000)
+    span_ms = max(1, int(days * 86400 * 1000))
+    start_ms = end_ms - span_ms
+    if start_ms < EPOCH_MS:
+        raise ValueError(f"Los ids snowflake no admiten fechas anteriores a {datetime.fromtimestamp(EPOCH_MS / 1000)}")
+    if rows > span_ms * (MAX_SEQUENCE + 1):
+        raise ValueError(f"Demasiadas filas para {days} días: más de {MAX_SEQUENCE + 1} por milisegundo")
+
+    batch_size = max(1, round(batch_size / SEED_BLOCK_ROWS)) * SEED_BLOCK_ROWS
+    specs = [
+        {
+            "seed": seed,
+            "first": first,
+            "count": min(batch_size, rows - first),
+            "rows": rows,
+            "start_ms": start_ms,
+            "span_ms": span_ms,
+            "end_ms": end_ms,
+            "node_id": node_id,
+            "embedding_dim": embedding_dim,
+            "relations_per_memory": relations_per_memory,
+            "category_skew": category_skew,
+            "importance_alpha": importance_alpha,
+            "importance_beta": importance_beta
+        }
+        for first in range(0, rows, batch_size)
+    ]
+
+    building = db_path.with_name(db_path.name + BUILDING_SUFFIX)
+    building.parent.mkdir(parents=True, exist_ok=True)
+    building.unlink(missing_ok=True)
+
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+    started = time.perf_counter()
+    written = relations = 0
+    conn = open_connection(building, BULK_PROFILE)
+    try:
+        # Antes de crear tablas, como hace el sistema de memoria
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute(f"CREATE TABLE memories ({MEMORY_COLUMNS})")
+        conn.execute(RELATIONS_TABLE)
+
+        # Ventana acotada de lotes en curso para no acumular memoria si la
+        # escritura es más lenta que la generación
+        pending = deque()
+        batches = iter(specs)
+        while True:
+            while executor is not None and len(pending) < 2 * workers:
+                spec = next(batches, None)
+                if spec is None:
+                    break
+                pending.append(executor.submit(_build_batch, spec))
+
+            if executor is not None:
+                if not pending:
+                    break
+                memories, links = pending.popleft().result()
+            else:
+                spec = next(batches, None)
+                if spec is None:
+                    break
+                memories, links = _build_batch(spec)
+
+            with conn:
+                conn.executemany(
+                    """
+                    INSERT INTO memories
+                    (id, category, content, importance, timestamp,
+                    last_accessed, access_count, embedding)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    memories
+                )
+                conn.executemany(
+                    """
+                    INSERT INTO memory_relations
+                    (source_id, target_id, relation_type, strength)
+                    VALUES (?, ?, ?, ?)
+                    """,
+                    links
+                )
+            written += len(memories)
+            relations += len(links)
+            if written % (batch_size * 25) < batch_size:
+                elapsed = time.perf_counter() - started
+                logger.info(f"Dataset: {written}/{rows} memorias ({written / elapsed:.0f} filas/s)")
+
+        logger.info("Dataset: creando índices")
+        with conn:
+            apply_schema(conn)
+            conn.execute("ANALYZE memories")
+            conn.execute("ANALYZE memory_relations")
+        conn.execute("PRAGMA journal_mode = wal").fetchall()
+    except BaseException:
+        conn.close()
+        building.unlink(missing_ok=True)
+        raise
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    conn.close()
+
+    with open(building, "rb+") as f:
+        os.fsync(f.fileno())
+    # Los archivos auxiliares de una base de datos sustituida no corresponden
+    # a la nueva
+    for suffix in ("-wal", "-shm"):
+        db_path.with_name(db_path.name + suffix).unlink(missing_ok=True)
+    os.replace(building, db_path)
+
+    elapsed = time.perf_counter() - started
+    result = {
+        "path": str(db_path),
+        "rows": written,
+        "relations": relations,
+        "elapsed": elapsed,
+        "rows_per_second": written / elapsed if elapsed else 0.0,
+        "size_bytes": db_path.stat().st_size
+    }
+    logger.info(
+        f"Dataset creado en {db_path}: {written} memorias y {relations} relaciones "
+        f"en {elapsed:.1f} s ({result['rows_per_second']:.0f} filas/s)"
+    )
+    return result
@@ -0,0 +1,294 @@
+"""
+Arnés de benchmarks con latencias por operación.
+
+Cada benchmark mide operaciones individuales con ``time.perf_counter_ns``.
+Las entradas se generan antes de medir y las primeras ``warmup`` rondas se
+descartan (cachés frías, compilación de consultas, conexiones nuevas). Los
+resultados incluyen percentiles p50/p95/p99/p999 en nanosegundos y se
+guardan como JSON para compararlos con una ejecución de referencia.
+"""
+import gc
+import inspect
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+REPORT_FORMAT_VERSION = 1
+
+PERCENTILES = {"p50": 50.0, "p95": 95.0, "p99": 99.0, "p999": 99.9}
+
+# Cambio relativo a partir del cual una diferencia no se considera ruido
+DEFAULT_THRESHOLD = 0.10
+COMPARED_METRICS = ("p50", "p99")
+
+
+def summarize(samples_ns: Sequence[int]) -> Dict[str, float]:
+    """Estadísticas de una serie de latencias en nanosegundos."""
+    samples = np.asarray(samples_ns, dtype=np.float64)
+    stats = {
+        "count": int(samples.size),
+        "mean": float(samples.mean()),
+        "std": float(samples.std()),
+        "min": float(samples.min()),
+        "max": float(samples.max())
+    }
+    for name, value in zip(PERCENTILES, np.percentile(samples, list(PERCENTILES.values()))):
+        stats[name] = float(value)
+    stats["ops_per_second"] = 1e9 / stats["mean"] if stats["mean"] else 0.0
+    return stats
+
+
+class Benchmark:
+    """Operación medida llamada a llamada."""
+
+    def __init__(
+        self,
+        name: str,
+        operation: Callable[..., Union[Any, Awaitable[Any]]],
+        make_inputs: Optional[Callable[[int], Sequence[Any]]] = None,
+        rounds: int = 200,
+        warmup: int = 20
+    ):
+        """
+        Args:
+            name: Nombre del benchmark dentro de su suite
+            operation: Función o corrutina medida; recibe una entrada por
+                llamada si hay ``make_inputs``
+            make_inputs: Genera las entradas de todas las llamadas antes de
+                medir, para no mezclar su coste con el de la operación
+            rounds: Llamadas medidas
+            warmup: Llamadas previas descartadas
+        """
+        self.name = name
+        self.operation = operation
+        self.make_inputs = make_inputs
+        self.rounds = rounds
+        self.warmup = warmup
+
+    async def run(self) -> Dict[str, float]:
+        """Ejecuta el benchmark y devuelve sus estadísticas."""
+        count = self.warmup + self.rounds
+        if self.make_inputs is not None:
+            calls = [(item,) for item in self.make_inputs(count)]
+        else:
+            calls = [()] * count
+
+        gc.collect()
+        samples = []
+        for i, args in enumerate(calls):
+            start = time.perf_counter_ns()
+            result = self.operation(*args)
+            if inspect.isawaitable(result):
+                await result
+            elapsed = time.perf_counter_ns() - start
+            if i >= self.warmup:
+                samples.append(elapsed)
+
+        stats = summarize(samples)
+        stats["warmup"] = self.warmup
+        return stats
+
+
+class BenchmarkSuite:
+    """Conjunto de benchmarks de un subsistema con sus recursos."""
+
+    def __init__(self, name: str, rounds: int = 200, warmup: int = 20):
+        """
+        Args:
+            name: Nombre de la suite; prefijo de sus resultados
+            rounds: Llamadas medidas por defecto en cada benchmark
+            warmup: Llamadas de calentamiento por defecto
+        """
+        self.name = name
+        self.rounds = rounds
+        self.warmup = warmup
+        self.benchmarks: List[Benchmark] = []
+        self._cleanups: List[Callable[[], Union[Any, Awaitable[Any]]]] = []
+
+    def add(
+        self,
+        name: str,
+        operation: Callable[..., Union[Any, Awaitable[Any]]],
+        make_inputs: Optional[Callable[[int], Sequence[Any]]] = None,
+        rounds: Optional[int] = None,
+        warmup: Optional[int] = None
+    ) -> Benchmark:
+        """Registra un benchmark en la suite."""
+        benchmark = Benchmark(
+            name,
+            operation,
+            make_inputs,
+            rounds=self.rounds if rounds is None else rounds,
+            warmup=self.warmup if warmup is None else warmup
+        )
+        self.benchmarks.append(benchmark)
+        return benchmark
+
+    def add_cleanup(self, cleanup: Callable[[], Union[Any, Awaitable[Any]]]) -> None:
+        """Registra una función que libera recursos al cerrar la suite."""
+        self._cleanups.append(cleanup)
+
+    async def run(self, only: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Ejecuta los benchmarks en orden de registro.
+
+        Args:
+            only: Nombres de los benchmarks a ejecutar (por defecto todos)
+
+        Returns:
+            Estadísticas por ``<suite>.<benchmark>``
+        """
+        selected = set(only) if only is not None else None
+        results = {}
+        for benchmark in self.benchmarks:
+            if selected is not None and benchmark.name not in selected:
+                continue
+            stats = await benchmark.run()
+            results[f"{self.name}.{benchmark.name}"] = stats
+            logger.info(
+                f"Benchmark {self.name}.{benchmark.name}: p50 {stats['p50'] / 1e3:.1f} µs, "
+                f"p99 {stats['p99'] / 1e3:.1f} µs"
+            )
+        return results
+
+    async def close(self) -> None:
+        """Libera los recursos de la suite en orden inverso."""
+        for cleanup in reversed(self._cleanups):
+            result = cleanup()
+            if inspect.isawaitable(result):
+                await result
+        self._cleanups.clear()
+
+
+def build_report(results: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
+    """Informe con los resultados y el entorno en el que se midieron."""
+    return {
+        "format": REPORT_FORMAT_VERSION,
+        "created": datetime.now().isoformat(),
+        "unit": "ns",
+        "environment": {
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count()
+        },
+        "benchmarks": results
+    }
+
+
+def save_report(report: Dict[str, Any], path: Union[str, Path]) -> None:
+    """Guarda un informe como JSON."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, sort_keys=True))
+
+
+def load_report(path: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Carga un informe guardado con ``save_report``.
+
+    Raises:
+        ValueError: Si el formato del informe no es compatible
+    """
+    report = json.loads(Path(path).read_text())
+    if report.get("format") != REPORT_FORMAT_VERSION:
+        raise ValueError(f"Formato de informe no compatible: {report.get('format')}")
+    return report
+
+
+def compare_reports(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+    metrics: Sequence[str] = COMPARED_METRICS
+) -> List[Dict[str, Any]]:
+    """
+    Compara un informe con otro de referencia.
+
+    Una métrica es una regresión si la latencia crece más de ``threshold``
+    (relativo) y una mejora si baja más de ``threshold``; el resto se
+    considera ruido.
+
+    Returns:
+        Una fila por benchmark y métrica; ``status`` es ``regression``,
+        ``improvement``, ``unchanged``, ``new`` o ``missing``
+    """
+    rows = []
+    base_results = baseline["benchmarks"]
+    current_results = current["benchmarks"]
+    for name in sorted(set(base_results) | set(current_results)):
+        if name not in current_results:
+            rows.append({"benchmark": name, "metric": None, "status": "missing"})
+            continue
+        if name not in base_results:
+            rows.append({"benchmark": name, "metric": None, "status": "new"})
+            continue
+
+        for metric in metrics:
+            before = base_results[name][metric]
+            after = current_results[name][metric]
+            change = (after - before) / before if before else 0.0
+            if change > threshold:
+                status = "regression"
+            elif change < -threshold:
+                status = "improvement"
+            else:
+                status = "unchanged"
+            rows.append({
+                "benchmark": name,
+                "metric": metric,
+                "baseline": before,
+                "current": after,
+                "change": change,
+                "status": status
+            })
+    return rows
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Tabla de texto con las latencias de un informe en microsegundos."""
+    lines = [
+        f"{'benchmark':<36}{'n':>7}{'p50 µs':>11}{'p95 µs':>11}{'p99 µs':>11}{'p999 µs':>11}{'ops/s':>11}"
+    ]
+    for name, stats in sorted(report["benchmarks"].items()):
+        lines.append(
+            f"{name:<36}{stats['count']:>7}{stats['p50'] / 1e3:>11.1f}{stats['p95'] / 1e3:>11.1f}"
+            f"{stats['p99'] / 1e3:>11.1f}{stats['p999'] / 1e3:>11.1f}{stats['ops_per_second']:>11.0f}"
+        )
+    return "\n".join(lines)
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    """Tabla de texto con el resultado de ``compare_reports``."""
+    lines = [f"{'benchmark':<36}{'métrica':>8}{'antes µs':>11}{'ahora µs':>11}{'cambio':>9}  estado"]
+    for row in rows:
+        if row["metric"] is None:
+            lines.append(f"{row['benchmark']:<36}{'':>8}{'':>11}{'':>11}{'':>9}  {row['status']}")
+            continue
+        lines.append(
+            f"{row['benchmark']:<36}{row['metric']:>8}{row['baseline'] / 1e3:>11.1f}"
+            f"{row['current'] / 1e3:>11.1f}{row['change']:>+9.1%}  {row['status']}"
+        )
+    return "\n".join(lines)
+
+
+async def run_suites(suites: Iterable[BenchmarkSuite]) -> Dict[str, Any]:
+    """Ejecuta varias suites, cerrando cada una al terminar, y construye el informe."""
+    results = {}
+    for suite in suites:
+        try:
+            results.update(await suite.run())
+        finally:
+            await suite.close()
+    return build_report(results)
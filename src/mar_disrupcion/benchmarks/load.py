@@ -0,0 +1,442 @@
+"""
+Generador de carga concurrente con mezcla de operaciones sobre el sistema
+de memoria.
+
+Dos modos:
+
+- Lazo cerrado (``rate=None``): ``concurrency`` corrutinas repiten
+  operaciones sin pausa; mide la capacidad con esa concurrencia.
+- Lazo abierto (``rate`` operaciones/s): las llegadas siguen un proceso de
+  Poisson independiente de lo que tarden las respuestas. La latencia se
+  mide desde el instante de llegada previsto, de modo que la espera en
+  cola cuenta (sin omisión coordinada).
+
+Con ``threads`` la carga se reparte además entre hilos con su propio bucle
+de eventos, como los executors de producción; las operaciones SQLite de
+distintos hilos compiten de verdad por el bloqueo de escritura.
+
+El informe se agrega por ventanas de ``window`` segundos: rendimiento,
+latencias por operación, errores SQLite de ocupado/bloqueo y retraso del
+bucle de eventos principal. ``saturation_sweep`` repite el lazo abierto con
+ritmos crecientes para localizar el punto de saturación.
+"""
+import asyncio
+import logging
+import random
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .harness import summarize
+from .suites import MEMORY_CATEGORIES, generate_memories
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIX = {"store": 0.2, "retrieve": 0.5, "cache_read": 0.3}
+ERROR_KINDS = ("busy", "locked", "other")
+
+# Un ritmo está saturado si se atiende menos de esta fracción de lo pedido
+SATURATION_THROUGHPUT_RATIO = 0.9
+
+
+def classify_error(error: BaseException) -> str:
+    """Clasifica un error como ``busy``, ``locked`` u ``other``."""
+    if isinstance(error, sqlite3.OperationalError):
+        name = getattr(error, "sqlite_errorname", "")
+        message = str(error)
+        if name.startswith("SQLITE_LOCKED") or "table is locked" in message:
+            return "locked"
+        if name.startswith("SQLITE_BUSY") or "database is locked" in message or "busy" in message:
+            return "busy"
+    return "other"
+
+
+class _Recorder:
+    """Agrega resultados por ventana de tiempo; seguro entre hilos."""
+
+    def __init__(self, start_ns: int, window: float):
+        self.start_ns = start_ns
+        self.window_ns = int(window * 1e9)
+        self._lock = threading.Lock()
+        self.latencies: Dict[int, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+        self.errors: Dict[int, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(ERROR_KINDS, 0))
+        self.lag: Dict[int, List[int]] = defaultdict(list)
+        self.dropped: Dict[int, int] = defaultdict(int)
+        self.arrivals = 0
+
+    def _window(self, t_ns: int) -> int:
+        return (t_ns - self.start_ns) // self.window_ns
+
+    def record(self, operation: str, start_ns: int, end_ns: int, error: Optional[str] = None) -> None:
+        window = self._window(end_ns)
+        with self._lock:
+            self.latencies[window][operation].append(end_ns - start_ns)
+            if error is not None:
+                self.errors[window][error] += 1
+
+    def record_lag(self, t_ns: int, lag_ns: int) -> None:
+        with self._lock:
+            self.lag[self._window(t_ns)].append(lag_ns)
+
+    def record_drop(self, t_ns: int) -> None:
+        with self._lock:
+            self.dropped[self._window(t_ns)] += 1
+
+
+class LoadGenerator:
+    """Carga concurrente de ``store_memory``, ``retrieve_memories`` y lecturas del caché."""
+
+    def __init__(
+        self,
+        memory_system,
+        mix: Optional[Dict[str, float]] = None,
+        concurrency: int = 16,
+        threads: int = 0,
+        rate: Optional[float] = None,
+        duration: float = 10.0,
+        window: float = 1.0,
+        lag_interval: float = 0.01,
+        max_in_flight: int = 1024,
+        seed: int = 0
+    ):
+        """
+        Args:
+            memory_system: AdvancedMemorySystem sobre el que generar carga
+            mix: Peso de cada operación (``store``, ``retrieve``, ``cache_read``)
+            concurrency: Corrutinas por bucle de eventos en lazo cerrado
+            threads: Hilos adicionales, cada uno con su bucle de eventos
+            rate: Llegadas por segundo en lazo abierto (None: lazo cerrado)
+            duration: Segundos de carga
+            window: Segundos de cada ventana del informe
+            lag_interval: Periodo de la sonda de retraso del bucle de eventos
+            max_in_flight: Operaciones simultáneas en lazo abierto; las
+                llegadas por encima se descartan y se cuentan
+            seed: Semilla de la mezcla y de los datos
+        """
+        mix = dict(mix or DEFAULT_MIX)
+        unknown = set(mix) - set(DEFAULT_MIX)
+        if unknown:
+            raise ValueError(f"Operaciones desconocidas en la mezcla: {sorted(unknown)}")
+        self.memory_system = memory_system
+        self.mix = mix
+        self.concurrency = concurrency
+        self.threads = threads
+        self.rate = rate
+        self.duration = duration
+        self.window = window
+        self.lag_interval = lag_interval
+        self.max_in_flight = max_in_flight
+        self.seed = seed
+        self._stored_ids: List[int] = []
+        self._operations: Dict[str, Callable[[random.Random], Any]] = {
+            "store": self._store,
+            "retrieve": self._retrieve,
+            "cache_read": self._cache_read
+        }
+
+    async def _store(self, rng: random.Random) -> None:
+        data = generate_memories(1, rng)[0]
+        memory_id = await self.memory_system.store_memory(
+            content=data["content"], category=data["category"], importance=data["importance"]
+        )
+        self._stored_ids.append(memory_id)
+
+    async def _retrieve(self, rng: random.Random) -> None:
+        await self.memory_system.retrieve_memories(
+            category=rng.choice(MEMORY_CATEGORIES), limit=50, min_importance=0.3
+        )
+
+    async def _cache_read(self, rng: random.Random) -> None:
+        recent = self._stored_ids[-1000:]
+        memory_id = rng.choice(recent) if recent else rng.getrandbits(62)
+        await self.memory_system.get_from_cache(memory_id)
+
+    def _choose(self, rng: random.Random) -> str:
+        return rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+
+    async def _execute(self, recorder: _Recorder, operation: str, rng: random.Random, start_ns: int) -> None:
+        """Ejecuta una operación y registra su latencia desde ``start_ns``."""
+        error = None
+        try:
+            await self._operations[operation](rng)
+        except Exception as e:
+            error = classify_error(e)
+        recorder.record(operation, start_ns, time.perf_counter_ns(), error)
+
+    async def _closed_loop(self, recorder: _Recorder, deadline_ns: int, seed: int) -> None:
+        async def worker(index: int) -> None:
+            rng = random.Random(seed * 100003 + index)
+            while time.perf_counter_ns() < deadline_ns:
+                await self._execute(recorder, self._choose(rng), rng, time.perf_counter_ns())
+                # Ceder el bucle aunque la operación no haya esperado nada
+                await asyncio.sleep(0)
+
+        await asyncio.gather(*(worker(i) for i in range(self.concurrency)))
+
+    async def _open_loop(
+        self,
+        recorder: _Recorder,
+        deadline_ns: int,
+        loops: List[asyncio.AbstractEventLoop]
+    ) -> None:
+        """Programa llegadas de Poisson repartidas entre los bucles de eventos."""
+        rng = random.Random(self.seed)
+        main_loop = asyncio.get_running_loop()
+        in_flight = 0
+        in_flight_lock = threading.Lock()
+        pending = set()
+
+        def finished(_) -> None:
+            nonlocal in_flight
+            with in_flight_lock:
+                in_flight -= 1
+
+        next_ns = time.perf_counter_ns()
+        arrival = 0
+        while True:
+            next_ns += int(rng.expovariate(self.rate) * 1e9)
+            if next_ns >= deadline_ns:
+                break
+            delay = (next_ns - time.perf_counter_ns()) / 1e9
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            recorder.arrivals += 1
+            with in_flight_lock:
+                if in_flight >= self.max_in_flight:
+                    recorder.record_drop(next_ns)
+                    continue
+                in_flight += 1
+
+            op_rng = random.Random(self.seed * 100003 + arrival)
+            coroutine = self._execute(recorder, self._choose(rng), op_rng, next_ns)
+            loop = loops[arrival % len(loops)]
+            arrival += 1
+            if loop is main_loop:
+                future = asyncio.ensure_future(coroutine)
+            else:
+                future = asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, loop))
+            future.add_done_callback(finished)
+            pending.add(future)
+            future.add_done_callback(pending.discard)
+
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _lag_probe(self, recorder: _Recorder, stop: asyncio.Event) -> None:
+        """Mide cuánto tarda el bucle de eventos principal en despertar."""
+        while not stop.is_set():
+            expected = time.perf_counter_ns() + int(self.lag_interval * 1e9)
+            await asyncio.sleep(self.lag_interval)
+            now = time.perf_counter_ns()
+            recorder.record_lag(now, max(0, now - expected))
+
+    def _start_threads(self):
+        """Arranca los hilos con su bucle de eventos; devuelve hilos y bucles."""
+        loops = []
+        threads = []
+        ready = threading.Barrier(self.threads + 1)
+
+        def run_loop() -> None:
+            loop = asyncio.new_event_loop()
+            loops.append(loop)
+            ready.wait()
+            loop.run_forever()
+            loop.close()
+
+        for _ in range(self.threads):
+            thread = threading.Thread(target=run_loop, daemon=True)
+            thread.start()
+            threads.append(thread)
+        ready.wait()
+        return threads, loops
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Genera carga durante ``duration`` segundos.
+
+        Returns:
+            Informe con la configuración, las ventanas y los totales
+        """
+        start_ns = time.perf_counter_ns()
+        deadline_ns = start_ns + int(self.duration * 1e9)
+        recorder = _Recorder(start_ns, self.window)
+        stop_probe = asyncio.Event()
+        probe = asyncio.ensure_future(self._lag_probe(recorder, stop_probe))
+
+        threads, thread_loops = self._start_threads() if self.threads else ([], [])
+        try:
+            if self.rate is None:
+                jobs = [self._closed_loop(recorder, deadline_ns, seed=self.seed)]
+                jobs += [
+                    asyncio.wrap_future(asyncio.run_coroutine_threadsafe(
+                        self._closed_loop(recorder, deadline_ns, seed=self.seed + i + 1), loop
+                    ))
+                    for i, loop in enumerate(thread_loops)
+                ]
+                await asyncio.gather(*jobs)
+            else:
+                await self._open_loop(recorder, deadline_ns, [asyncio.get_running_loop(), *thread_loops])
+        finally:
+            stop_probe.set()
+            await probe
+            for loop in thread_loops:
+                loop.call_soon_threadsafe(loop.stop)
+            for thread in threads:
+                thread.join()
+
+        elapsed = (time.perf_counter_ns() - start_ns) / 1e9
+        return self._report(recorder, elapsed)
+
+    def _report(self, recorder: _Recorder, elapsed: float) -> Dict[str, Any]:
+        """Informe por ventanas y totales (latencias en nanosegundos)."""
+        windows = []
+        all_latencies: Dict[str, List[int]] = defaultdict(list)
+        total_errors = dict.fromkeys(ERROR_KINDS, 0)
+        indexes = sorted(set(recorder.latencies) | set(recorder.lag) | set(recorder.dropped))
+        for index in indexes:
+            latencies = recorder.latencies.get(index, {})
+            errors = recorder.errors.get(index, dict.fromkeys(ERROR_KINDS, 0))
+            lag = recorder.lag.get(index, [])
+            ops = sum(len(values) for values in latencies.values())
+            combined = [value for values in latencies.values() for value in values]
+            window = {
+                "start": index * self.window,
+                "ops": ops,
+                "throughput": ops / self.window,
+                "p50": float(np.percentile(combined, 50)) if combined else None,
+                "p99": float(np.percentile(combined, 99)) if combined else None,
+                "operations": {
+                    name: {
+                        "count": len(values),
+                        "p50": float(np.percentile(values, 50)),
+                        "p99": float(np.percentile(values, 99))
+                    }
+                    for name, values in sorted(latencies.items())
+                },
+                "errors": dict(errors),
+                "dropped": recorder.dropped.get(index, 0),
+                "loop_lag_p99": float(np.percentile(lag, 99)) if lag else None,
+                "loop_lag_max": float(max(lag)) if lag else None
+            }
+            windows.append(window)
+            for name, values in latencies.items():
+                all_latencies[name].extend(values)
+            for kind in ERROR_KINDS:
+                total_errors[kind] += errors[kind]
+
+        all_lag = [value for values in recorder.lag.values() for value in values]
+        combined = [value for values in all_latencies.values() for value in values]
+        ops = len(combined)
+        arrivals = recorder.arrivals if self.rate is not None else ops
+        return {
+            "unit": "ns",
+            "config": {
+                "mode": "closed" if self.rate is None else "open",
+                "mix": self.mix,
+                "concurrency": self.concurrency,
+                "threads": self.threads,
+                "rate": self.rate,
+                "duration": self.duration,
+                "window": self.window
+            },
+            "windows": windows,
+            "totals": {
+                "ops": ops,
+                "elapsed": elapsed,
+                "throughput": ops / elapsed if elapsed else 0.0,
+                "arrivals": arrivals,
+                "offered_rate": arrivals / self.duration,
+                "latency": summarize(combined) if combined else None,
+                "operations": {name: summarize(values) for name, values in sorted(all_latencies.items())},
+                "errors": total_errors,
+                "dropped": sum(recorder.dropped.values()),
+                "loop_lag": summarize(all_lag) if all_lag else None
+            }
+        }
+
+
+async def saturation_sweep(
+    memory_system,
+    rates: Sequence[float],
+    duration: float = 10.0,
+    p99_limit_ms: Optional[float] = None,
+    **options
+) -> Dict[str, Any]:
+    """
+    Ejecuta el lazo abierto con ritmos crecientes.
+
+    Un ritmo está saturado si el rendimiento conseguido baja del 90% de las
+    llegadas generadas (el ritmo ofrecido real, no el nominal), se descartan
+    llegadas, hay errores de ocupado/bloqueo o el p99 supera
+    ``p99_limit_ms``.
+
+    Args:
+        memory_system: AdvancedMemorySystem sobre el que generar carga
+        rates: Llegadas por segundo a probar, en orden creciente
+        duration: Segundos de carga por ritmo
+        p99_limit_ms: Latencia p99 máxima aceptable
+        **options: Argumentos adicionales de ``LoadGenerator``
+
+    Returns:
+        Resultado por ritmo y ``saturation_rate``, el primer ritmo saturado
+        (None si ninguno lo está)
+    """
+    steps = []
+    saturation_rate = None
+    for rate in rates:
+        report = await LoadGenerator(memory_system, rate=rate, duration=duration, **options).run()
+        totals = report["totals"]
+        p99_ms = totals["latency"]["p99"] / 1e6 if totals["latency"] else None
+        contention = totals["errors"]["busy"] + totals["errors"]["locked"]
+        saturated = (
+            totals["throughput"] < totals["offered_rate"] * SATURATION_THROUGHPUT_RATIO
+            or totals["dropped"] > 0
+            or contention > 0
+            or (p99_limit_ms is not None and p99_ms is not None and p99_ms > p99_limit_ms)
+        )
+        steps.append({
+            "rate": rate,
+            "offered_rate": totals["offered_rate"],
+            "throughput": totals["throughput"],
+            "p99_ms": p99_ms,
+            "errors": totals["errors"],
+            "dropped": totals["dropped"],
+            "loop_lag_p99_ms": totals["loop_lag"]["p99"] / 1e6 if totals["loop_lag"] else None,
+            "saturated": saturated
+        })
+        logger.info(
+            f"Ritmo {rate:.0f}/s: {totals['throughput']:.0f} ops/s, p99 {p99_ms or 0:.1f} ms"
+            + (" (saturado)" if saturated else "")
+        )
+        if saturated:
+            saturation_rate = rate
+            break
+
+    return {"steps": steps, "saturation_rate": saturation_rate}
+
+
+def format_load_report(report: Dict[str, Any]) -> str:
+    """Tabla de texto con las ventanas de un informe de carga."""
+    lines = [
+        f"{'t s':>6}{'ops/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'busy':>6}{'locked':>8}"
+        f"{'otros':>7}{'desc.':>7}{'lag p99 ms':>12}"
+    ]
+    for w in report["windows"]:
+        def ms(value):
+            return f"{value / 1e6:.2f}" if value is not None else "-"
+        lines.append(
+            f"{w['start']:>6.1f}{w['throughput']:>9.0f}{ms(w['p50']):>9}{ms(w['p99']):>9}"
+            f"{w['errors']['busy']:>6}{w['errors']['locked']:>8}{w['errors']['other']:>7}"
+            f"{w['dropped']:>7}{ms(w['loop_lag_p99']):>12}"
+        )
+    totals = report["totals"]
+    lines.append(
+        f"total: {totals['ops']} ops, {totals['throughput']:.0f} ops/s, "
+        f"errores {totals['errors']}, descartadas {totals['dropped']}"
+    )
+    return "\n".join(lines)
@@ -0,0 +1,189 @@
+"""
+Suites de benchmarks de los subsistemas: memoria, caché distribuido,
+cliente de APIs externas y procesamiento paralelo.
+
+Las suites reciben la instancia a medir, salvo la del cliente de APIs, que
+levanta un servidor HTTP local para no depender de la red.
+"""
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from .harness import BenchmarkSuite
+
+MEMORY_CATEGORIES = ["info", "error", "warning", "debug", "critical"]
+
+# Características por paso de la red de memoria (input_size del LSTM)
+FEATURE_SIZE = 512
+
+
+def generate_memories(count: int, rng: Optional[random.Random] = None) -> List[Dict[str, Any]]:
+    """
+    Genera memorias sintéticas que el sistema de memoria puede almacenar.
+
+    ``store_memory`` calcula el embedding del contenido con la red neuronal,
+    así que el contenido es un vector numérico de ``FEATURE_SIZE``
+    características.
+    """
+    rng = rng or random.Random()
+    memories = []
+    for _ in range(count):
+        memories.append({
+            "category": rng.choice(MEMORY_CATEGORIES),
+            "content": {"features": [rng.random() for _ in range(FEATURE_SIZE)]},
+            "importance": rng.random()
+        })
+    return memories
+
+
+def memory_suite(memory_system, rounds: int = 200, warmup: int = 20, seed: int = 0) -> BenchmarkSuite:
+    """
+    Benchmarks del sistema de memoria.
+
+    Las escrituras se miden primero, de modo que las lecturas encuentran
+    los datos que generan.
+    """
+    suite = BenchmarkSuite("memory", rounds=rounds, warmup=warmup)
+    rng = random.Random(seed)
+
+    def categories(count: int) -> List[str]:
+        return [MEMORY_CATEGORIES[i % len(MEMORY_CATEGORIES)] for i in range(count)]
+
+    suite.add(
+        "store_memory",
+        lambda data: memory_system.store_memory(
+            content=data["content"], category=data["category"], importance=data["importance"]
+        ),
+        lambda count: generate_memories(count, rng)
+    )
+    suite.add(
+        "retrieve_memories",
+        lambda category: memory_system.retrieve_memories(category=category, limit=50, min_importance=0.3),
+        categories
+    )
+    suite.add(
+        "retrieve_with_context",
+        lambda category: memory_system.retrieve_memories(
+            category=category, limit=100, min_importance=0.7, context_size=5
+        ),
+        categories
+    )
+    suite.add(
+        "generate_embedding",
+        memory_system._generate_embedding,
+        lambda count: [data["content"] for data in generate_memories(count, rng)]
+    )
+    return suite
+
+
+def cache_suite(cache, rounds: int = 200, warmup: int = 20, batch: int = 100) -> BenchmarkSuite:
+    """
+    Benchmarks del caché distribuido.
+
+    Usa claves ``benchmark:*``; el llamador elige el namespace del caché y
+    lo limpia si hace falta.
+    """
+    suite = BenchmarkSuite("cache", rounds=rounds, warmup=warmup)
+    value = {"message": "benchmark", "values": list(range(32)), "nested": {"field": "x" * 64}}
+
+    def keys(count: int) -> List[str]:
+        return [f"benchmark:{i}" for i in range(count)]
+
+    def batches(count: int) -> List[List[str]]:
+        return [[f"benchmark:batch:{i}:{j}" for j in range(batch)] for i in range(count)]
+
+    suite.add("set", lambda key: cache.set(key, value, ttl=600), keys)
+    suite.add("get_hit", cache.get, keys)
+    suite.add("get_miss", cache.get, lambda count: [f"benchmark:missing:{i}" for i in range(count)])
+    suite.add(
+        "set_many",
+        lambda keys: cache.set_many({key: value for key in keys}, ttl=600),
+        batches
+    )
+    suite.add("get_many", cache.get_many, batches)
+    return suite
+
+
+async def api_client_suite(rounds: int = 200, warmup: int = 20) -> BenchmarkSuite:
+    """
+    Benchmarks del cliente de APIs externas contra un servidor HTTP local.
+
+    Mide llamadas que van a la red (cada una a un endpoint distinto),
+    llamadas servidas desde el caché TTL del cliente y POST con cuerpo JSON.
+    """
+    from aiohttp import web
+
+    from ..integrations.api_client import ExternalAPIIntegration
+
+    async def item(request):
+        return web.json_response({"id": request.match_info["item_id"], "payload": "x" * 256})
+
+    async def echo(request):
+        return web.json_response(await request.json())
+
+    app = web.Application()
+    app.router.add_get("/items/{item_id}", item)
+    app.router.add_post("/echo", echo)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    base_url = f"http://{host}:{port}"
+
+    client = ExternalAPIIntegration()
+    client.register_api("benchmark", {"api_key": "benchmark", "rate_limit": 10 ** 9})
+    await client.initialize()
+
+    suite = BenchmarkSuite("api_client", rounds=rounds, warmup=warmup)
+    suite.add_cleanup(runner.cleanup)
+    suite.add_cleanup(client.close)
+
+    suite.add(
+        "call_api_network",
+        lambda i: client.call_api("benchmark", f"{base_url}/items/{i}"),
+        lambda count: list(range(count))
+    )
+    suite.add(
+        "call_api_cached",
+        lambda i: client.call_api("benchmark", f"{base_url}/items/{i % 10}"),
+        lambda count: list(range(count))
+    )
+    suite.add(
+        "call_api_post",
+        lambda body: client.call_api("benchmark", f"{base_url}/echo", method="POST", data=body),
+        lambda count: [{"id": i, "values": list(range(16))} for i in range(count)]
+    )
+    return suite
+
+
+def _cpu_work(n: int) -> int:
+    """Trabajo de CPU pura: suma de cuadrados."""
+    return sum(i * i for i in range(n))
+
+
+def _io_work(seconds: float) -> float:
+    """Trabajo que espera sin usar CPU, como una llamada de red bloqueante."""
+    time.sleep(seconds)
+    return seconds
+
+
+def parallel_suite(processor, rounds: int = 50, warmup: int = 5, items: int = 256) -> BenchmarkSuite:
+    """
+    Benchmarks del procesador paralelo.
+
+    Cada llamada procesa ``items`` elementos; la latencia medida es la del
+    lote completo.
+    """
+    suite = BenchmarkSuite("parallel", rounds=rounds, warmup=warmup)
+    suite.add(
+        "process_batch_cpu",
+        lambda batch: processor.process_batch(batch, _cpu_work),
+        lambda count: [[2000] * items for _ in range(count)]
+    )
+    suite.add(
+        "process_batch_io",
+        lambda batch: processor.process_batch(batch, _io_work),
+        lambda count: [[0.001] * (items // 4) for _ in range(count)]
+    )
+    return suite
@@ -0,0 +1,381 @@
+"""
+Benchmark de búsqueda por similitud de embeddings: recall@k frente a
+latencia.
+
+Para cada tamaño de conjunto se calcula el top-k exacto de cada consulta
+(la verdad de referencia) y se mide cada estrategia con cada combinación de
+parámetros: recall@k medio, consultas por segundo y percentiles de latencia
+por consulta. ``pareto_front`` marca las configuraciones que ninguna otra
+supera a la vez en recall y en rendimiento, que son las únicas candidatas
+razonables al elegir parámetros.
+
+Estrategias:
+
+- ``exact``: producto matricial contra todos los vectores.
+- ``ivf``: índice de listas invertidas con centroides de k-means en numpy;
+  ``nlist`` listas al construir y ``nprobe`` listas exploradas por consulta.
+- ``faiss-ivf`` y ``faiss-hnsw``: índices de faiss, solo si está instalado.
+
+Los embeddings pueden leerse de una base de datos de memoria
+(``load_embeddings``) o generarse como una mezcla de gaussianas
+(``clustered_embeddings``). Las consultas son vectores almacenados con
+ruido, como las búsquedas de memorias parecidas a una nueva.
+"""
+import logging
+import pickle
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .harness import summarize
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_K = 10
+
+# Parámetros por defecto de la rejilla de cada estrategia
+DEFAULT_NLISTS = (64, 256)
+DEFAULT_NPROBES = (1, 4, 16, 64)
+DEFAULT_EF_SEARCH = (16, 64, 256)
+
+# Iteraciones y muestras por lista al entrenar los centroides de IVF
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLES_PER_LIST = 40
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def load_embeddings(db_path: Union[str, Path], limit: Optional[int] = None) -> np.ndarray:
+    """Embeddings normalizados de la tabla ``memories``, en orden de id."""
+    sql = "SELECT embedding FROM memories ORDER BY id"
+    if limit is not None:
+        sql += f" LIMIT {int(limit)}"
+    with sqlite3.connect(str(db_path)) as conn:
+        vectors = [pickle.loads(row[0]).reshape(-1) for row in conn.execute(sql)]
+    if not vectors:
+        raise ValueError(f"No hay embeddings en {db_path}")
+    return _normalize(np.stack(vectors))
+
+
+def clustered_embeddings(
+    count: int,
+    dim: int,
+    clusters: int = 100,
+    spread: float = 1.0,
+    seed: int = 0
+) -> np.ndarray:
+    """Embeddings unitarios agrupados alrededor de ``clusters`` centros."""
+    rng = np.random.default_rng(seed)
+    centers = _normalize(rng.standard_normal((clusters, dim)))
+    labels = rng.integers(0, clusters, size=count)
+    noise = rng.standard_normal((count, dim)).astype(np.float32) * (spread / np.sqrt(dim))
+    return _normalize(centers[labels] + noise)
+
+
+def make_queries(base: np.ndarray, count: int, noise: float = 0.3, seed: int = 0) -> np.ndarray:
+    """Consultas a partir de vectores almacenados con ruido gaussiano."""
+    rng = np.random.default_rng(seed)
+    picked = base[rng.integers(0, len(base), size=count)]
+    perturbation = rng.standard_normal(picked.shape).astype(np.float32) * (noise / np.sqrt(base.shape[1]))
+    return _normalize(picked + perturbation)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Índices de las ``k`` mayores puntuaciones de cada fila, de mayor a menor."""
+    k = min(k, scores.shape[-1])
+    part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(part, order, axis=-1)
+
+
+def ground_truth(base: np.ndarray, queries: np.ndarray, k: int = DEFAULT_K, block: int = 256) -> np.ndarray:
+    """Top-k exacto por producto interno (coseno en vectores unitarios), por bloques de consultas."""
+    return np.concatenate([
+        _top_k(queries[i:i + block] @ base.T, k)
+        for i in range(0, len(queries), block)
+    ])
+
+
+def recall_at_k(found: Sequence[np.ndarray], truth: np.ndarray) -> float:
+    """Fracción media del top-k exacto presente en los resultados."""
+    k = truth.shape[1]
+    hits = sum(len(np.intersect1d(ids[:k], expected)) for ids, expected in zip(found, truth))
+    return hits / (len(truth) * k)
+
+
+class ExactSearch:
+    """Búsqueda exacta contra todos los vectores."""
+
+    name = "exact"
+
+    def build(self, base: np.ndarray) -> None:
+        self.base = base
+
+    def settings(self) -> List[Dict[str, Any]]:
+        return [{}]
+
+    def configure(self) -> None:
+        pass
+
+    def search(self, query: np.ndarray, k: int) -> np.ndarray:
+        return _top_k(self.base @ query, k)
+
+
+class IvfSearch:
+    """
+    Índice de listas invertidas en numpy.
+
+    Los vectores se reordenan por lista para que cada una sea un bloque
+    contiguo; una consulta puntúa los centroides, recorre las ``nprobe``
+    listas más cercanas y ordena solo sus vectores.
+    """
+
+    name = "ivf"
+
+    def __init__(self, nlist: int, nprobes: Iterable[int] = DEFAULT_NPROBES, seed: int = 0):
+        self.nlist = nlist
+        self.nprobes = [n for n in nprobes if n <= nlist]
+        self.nprobe = self.nprobes[0] if self.nprobes else 1
+        self.seed = seed
+
+    def build(self, base: np.ndarray) -> None:
+        rng = np.random.default_rng(self.seed)
+        nlist = min(self.nlist, len(base))
+        sample = base[rng.choice(len(base), size=min(len(base), nlist * KMEANS_SAMPLES_PER_LIST), replace=False)]
+
+        # k-means esférico: asignación por producto interno y centroides renormalizados
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)]
+        for _ in range(KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            empty = np.bincount(labels, minlength=nlist) == 0
+            sums[empty] = centroids[empty]
+            centroids = _normalize(sums)
+
+        labels = np.concatenate([
+            np.argmax(base[i:i + 65536] @ centroids.T, axis=1)
+            for i in range(0, len(base), 65536)
+        ])
+        order = np.argsort(labels, kind="stable")
+        self.centroids = centroids
+        self.ids = order
+        self.vectors = base[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=nlist))])
+
+    def settings(self) -> List[Dict[str, Any]]:
+        return [{"nlist": self.nlist, "nprobe": nprobe} for nprobe in self.nprobes]
+
+    def configure(self, nlist: int, nprobe: int) -> None:
+        self.nprobe = nprobe
+
+    def search(self, query: np.ndarray, k: int) -> np.ndarray:
+        lists = _top_k(self.centroids @ query, self.nprobe)
+        positions = np.concatenate([
+            np.arange(self.offsets[i], self.offsets[i + 1]) for i in lists
+        ])
+        if not len(positions):
+            return positions
+        return self.ids[positions[_top_k(self.vectors[positions] @ query, k)]]
+
+
+class FaissSearch:
+    """Índices de faiss construidos con ``index_factory`` (producto interno)."""
+
+    def __init__(self, name: str, factory: str, parameter: str, values: Iterable[int]):
+        """
+        Args:
+            name: Nombre de la estrategia en los resultados
+            factory: Descripción del índice para ``faiss.index_factory``
+            parameter: Parámetro de búsqueda a recorrer (``nprobe`` o ``efSearch``)
+            values: Valores del parámetro de búsqueda
+        """
+        self.name = name
+        self.factory = factory
+        self.parameter = parameter
+        self.values = list(values)
+
+    def build(self, base: np.ndarray) -> None:
+        import faiss
+
+        self._faiss = faiss
+        self.index = faiss.index_factory(base.shape[1], self.factory, faiss.METRIC_INNER_PRODUCT)
+        self.index.train(base)
+        self.index.add(base)
+
+    def settings(self) -> List[Dict[str, Any]]:
+        return [{"index": self.factory, self.parameter: value} for value in self.values]
+
+    def configure(self, index: str, **params) -> None:
+        self._faiss.ParameterSpace().set_index_parameter(self.index, self.parameter, params[self.parameter])
+
+    def search(self, query: np.ndarray, k: int) -> np.ndarray:
+        _, ids = self.index.search(query.reshape(1, -1), k)
+        return ids[0][ids[0] >= 0]
+
+
+def default_strategies(
+    size: int,
+    nlists: Iterable[int] = DEFAULT_NLISTS,
+    nprobes: Iterable[int] = DEFAULT_NPROBES,
+    ef_search: Iterable[int] = DEFAULT_EF_SEARCH
+) -> List[Any]:
+    """
+    Estrategias disponibles para un conjunto de ``size`` vectores.
+
+    Se omiten los ``nlist`` con menos de 39 vectores por lista de media
+    (el mínimo con el que faiss entrena sin avisos), y faiss si no está
+    instalado.
+    """
+    nlists = [nlist for nlist in nlists if size >= nlist * 39]
+    strategies: List[Any] = [ExactSearch()]
+    strategies.extend(IvfSearch(nlist, nprobes) for nlist in nlists)
+    try:
+        import faiss  # noqa: F401
+    except ImportError:
+        logger.info("faiss no está instalado; se omiten sus índices")
+        return strategies
+
+    strategies.extend(
+        FaissSearch("faiss-ivf", f"IVF{nlist},Flat", "nprobe", [n for n in nprobes if n <= nlist])
+        for nlist in nlists
+    )
+    strategies.append(FaissSearch("faiss-hnsw", "HNSW32,Flat", "efSearch", ef_search))
+    return strategies
+
+
+def benchmark_strategy(
+    strategy,
+    base: np.ndarray,
+    queries: np.ndarray,
+    truth: np.ndarray,
+    k: int = DEFAULT_K,
+    warmup: int = 10
+) -> List[Dict[str, Any]]:
+    """
+    Mide una estrategia con cada uno de sus ajustes.
+
+    Las consultas se lanzan de una en una, como en el sistema de memoria;
+    las ``warmup`` primeras se repiten antes de medir y no cuentan.
+    """
+    started = time.perf_counter()
+    strategy.build(base)
+    build_seconds = time.perf_counter() - started
+
+    rows = []
+    for setting in strategy.settings():
+        strategy.configure(**setting)
+        for query in queries[:warmup]:
+            strategy.search(query, k)
+
+        found = []
+        samples = []
+        for query in queries:
+            start = time.perf_counter_ns()
+            ids = strategy.search(query, k)
+            samples.append(time.perf_counter_ns() - start)
+            found.append(ids)
+
+        latency = summarize(samples)
+        rows.append({
+            "strategy": strategy.name,
+            "params": setting,
+            "size": len(base),
+            "k": k,
+            "recall": recall_at_k(found, truth),
+            "qps": len(samples) * 1e9 / sum(samples),
+            "p50_ms": latency["p50"] / 1e6,
+            "p99_ms": latency["p99"] / 1e6,
+            "build_seconds": build_seconds
+        })
+        logger.info(
+            f"{strategy.name} {setting} n={len(base)}: recall@{k} {rows[-1]['recall']:.3f}, "
+            f"{rows[-1]['qps']:.0f} consultas/s, p99 {rows[-1]['p99_ms']:.3f} ms"
+        )
+    return rows
+
+
+def pareto_front(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Marca con ``pareto`` las filas no dominadas de cada tamaño.
+
+    Una fila está dominada si otra del mismo tamaño tiene recall y
+    consultas por segundo mayores o iguales, y alguno de los dos mayor.
+    """
+    for row in rows:
+        row["pareto"] = not any(
+            other is not row
+            and other["size"] == row["size"]
+            and other["recall"] >= row["recall"]
+            and other["qps"] >= row["qps"]
+            and (other["recall"] > row["recall"] or other["qps"] > row["qps"])
+            for other in rows
+        )
+    return rows
+
+
+def run_vector_benchmark(
+    sizes: Sequence[int],
+    dim: int = 256,
+    k: int = DEFAULT_K,
+    num_queries: int = 500,
+    noise: float = 0.3,
+    seed: int = 0,
+    db_path: Optional[Union[str, Path]] = None,
+    strategies=default_strategies
+) -> List[Dict[str, Any]]:
+    """
+    Ejecuta el benchmark para cada tamaño de conjunto.
+
+    Args:
+        sizes: Número de vectores indexados en cada ejecución
+        dim: Dimensión de los embeddings sintéticos
+        k: Vecinos por consulta
+        num_queries: Consultas por configuración
+        noise: Ruido de las consultas respecto a los vectores almacenados
+        seed: Semilla de los datos y las consultas
+        db_path: Base de datos de memoria de la que leer los embeddings
+            (por defecto se generan)
+        strategies: Función que devuelve las estrategias para un tamaño
+
+    Returns:
+        Una fila por estrategia, ajuste y tamaño, con ``pareto`` marcado
+    """
+    if db_path is not None:
+        embeddings = load_embeddings(db_path, limit=max(sizes))
+    else:
+        embeddings = clustered_embeddings(max(sizes), dim, seed=seed)
+
+    rows = []
+    for size in sorted(sizes):
+        base = embeddings[:size]
+        queries = make_queries(base, num_queries, noise=noise, seed=seed)
+        truth = ground_truth(base, queries, k)
+        for strategy in strategies(len(base)):
+            rows.extend(benchmark_strategy(strategy, base, queries, truth, k))
+    return pareto_front(rows)
+
+
+def format_pareto_table(rows: List[Dict[str, Any]], only_pareto: bool = False) -> str:
+    """Tabla de texto por tamaño y recall descendente; ``*`` marca el frente de Pareto."""
+    lines = [
+        f"{'n':>9}  {'estrategia':<12}{'parámetros':<28}{'recall':>8}{'cons./s':>10}"
+        f"{'p50 ms':>9}{'p99 ms':>9}{'build s':>9}"
+    ]
+    for row in sorted(rows, key=lambda r: (r["size"], -r["recall"], -r["qps"])):
+        if only_pareto and not row["pareto"]:
+            continue
+        params = ",".join(f"{name}={value}" for name, value in row["params"].items())
+        lines.append(
+            f"{row['size']:>9}{'*' if row['pareto'] else ' ':>2}{row['strategy']:<12}{params:<28}"
+            f"{row['recall']:>8.3f}{row['qps']:>10.0f}{row['p50_ms']:>9.3f}{row['p99_ms']:>9.3f}"
+            f"{row['build_seconds']:>9.2f}"
+        )
+    return "\n".join(lines)
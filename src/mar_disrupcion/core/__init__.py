@@ -17,6 +17,7 @@ from .exceptions import (
     SecurityError, MemoryError, ProcessingError
 )
 from .config_models import Settings
+from .profiler import SamplingProfiler, install_profiler
 
 __all__ = [
     # Configuration
@@ -49,4 +50,8 @@ __all__ = [
     'SecurityError',
     'MemoryError',
     'ProcessingError',
+    
+    # Profiling
+    'SamplingProfiler',
+    'install_profiler',
 ]
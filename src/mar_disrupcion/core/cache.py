@@ -1,38 +1,61 @@
 """
 Sistema de caché distribuido usando Redis.
 """
-import json
-from typing import Any, Dict, List, Optional, Union
+import asyncio
+import inspect
+import math
+import random
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
 import redis
 from redis.cluster import RedisCluster
 import structlog
+from cachetools import TTLCache
 from prometheus_client import Counter, Histogram
 
-from ..core.metrics import record_memory_operation
-from ..core.exceptions import MemoryError
+from ..core.metrics import CACHE_HITS, CACHE_MISSES, record_memory_operation
+from ..core.exceptions import CircuitOpenError, MemoryError
+from ..core.circuit_breaker import CircuitBreaker
+from ..core.hash_ring import ConsistentHashRing
+from ..core.serialization import CacheSerializer, MsgpackSerializer
 
 logger = structlog.get_logger(__name__)
 
 # Métricas de caché
-CACHE_HITS = Counter(
-    "cache_hits_total",
-    "Total number of cache hits",
-    ["cache_type"]
-)
-
-CACHE_MISSES = Counter(
-    "cache_misses_total",
-    "Total number of cache misses",
-    ["cache_type"]
-)
-
 CACHE_LATENCY = Histogram(
     "cache_operation_latency_seconds",
     "Cache operation latency in seconds",
     ["operation"]
 )
 
+CACHE_RECOMPUTES = Counter(
+    "cache_recomputes_total",
+    "Number of values recomputed by get_or_compute",
+    ["reason"]
+)
+
+CACHE_RECOMPUTES_AVOIDED = Counter(
+    "cache_recomputes_avoided_total",
+    "Number of recomputations avoided by get_or_compute",
+    ["reason"]
+)
+
+# Libera un lock solo si sigue perteneciendo a quien lo adquirió
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Nombre del único "nodo" lógico en modo cluster: el propio RedisCluster
+# se encarga de enrutar cada clave a su slot
+CLUSTER_NODE = "cluster"
+
 class DistributedCache:
     """Implementación de caché distribuido usando Redis."""
     
@@ -43,7 +66,19 @@ class DistributedCache:
         db: int = 0,
         password: Optional[str] = None,
         cluster_mode: bool = False,
-        default_ttl: int = 3600
+        default_ttl: int = 3600,
+        batch_size: int = 500,
+        serializer: Optional[CacheSerializer] = None,
+        namespace: str = "mar_disrupcion",
+        virtual_nodes: int = 160,
+        client_factory: Optional[Callable[[str], Any]] = None,
+        socket_timeout: Optional[float] = 1.0,
+        failure_threshold: int = 5,
+        latency_threshold: Optional[float] = 0.25,
+        reset_timeout: float = 30.0,
+        fallback_size: int = 10000,
+        fallback_ttl: int = 60,
+        legacy_keys: bool = False
     ):
         """
         Inicializa el caché distribuido.
@@ -55,25 +90,81 @@ class DistributedCache:
             password: Contraseña de Redis
             cluster_mode: Si usar modo cluster
             default_ttl: Tiempo de vida por defecto en segundos
+            batch_size: Máximo de claves por comando en operaciones en lote
+            serializer: Serializador de valores (msgpack por defecto)
+            namespace: Prefijo de todas las claves; aísla a este caché de
+                otros usuarios de la misma base de datos de Redis
+            virtual_nodes: Nodos virtuales por host en el anillo de hashing
+                consistente (solo fuera del modo cluster)
+            client_factory: Función que crea el cliente de un host; por
+                defecto ``redis.Redis``. Permite usar sustitutos locales
+            socket_timeout: Timeout de conexión y de socket en segundos
+            failure_threshold: Fallos consecutivos que abren el circuito de un shard
+            latency_threshold: Latencia en segundos que cuenta como fallo
+            reset_timeout: Segundos antes de sondear un shard con el circuito abierto
+            fallback_size: Máximo de valores del caché local de respaldo
+            fallback_ttl: Vida en segundos de los valores del caché local
+            legacy_keys: Interruptor de migración: las lecturas que fallan
+                buscan también la clave sin prefijo que usaban las versiones
+                anteriores (un único cliente sobre el primer host), con un
+                viaje más a Redis por fallo. Los valores encontrados se
+                copian a la clave nueva con el TTL que les queda. Solo debe
+                activarse durante el despliegue y retirarse cuando haya
+                pasado el TTL máximo de las claves antiguas
         """
         self.default_ttl = default_ttl
+        self.cluster_mode = cluster_mode
+        self.batch_size = batch_size
+        self.serializer = serializer or MsgpackSerializer()
+        self.namespace = namespace
+        # Nodo donde viven las claves sin prefijo anteriores al despliegue
+        self.legacy_node = (CLUSTER_NODE if cluster_mode else hosts[0]) if legacy_keys else None
+        self.clients: Dict[str, Any] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.ring = ConsistentHashRing(virtual_nodes=virtual_nodes)
+        self._client_factory = client_factory or (
+            lambda host: redis.Redis(
+                host=host,
+                port=port,
+                db=db,
+                password=password,
+                decode_responses=False,
+                socket_timeout=socket_timeout,
+                socket_connect_timeout=socket_timeout
+            )
+        )
+        self._breaker_settings = {
+            "failure_threshold": failure_threshold,
+            "latency_threshold": latency_threshold,
+            "reset_timeout": reset_timeout
+        }
+        
+        # Respaldo en proceso: se alimenta con cada lectura y escritura
+        # correcta y se sirve mientras el shard correspondiente no responde
+        self.fallback = TTLCache(maxsize=fallback_size, ttl=fallback_ttl)
         
         try:
             if cluster_mode:
                 nodes = [{"host": host, "port": port} for host in hosts]
-                self.client = RedisCluster(
+                self.clients[CLUSTER_NODE] = RedisCluster(
                     startup_nodes=nodes,
                     password=password,
-                    decode_responses=True
+                    decode_responses=False,
+                    socket_timeout=socket_timeout,
+                    socket_connect_timeout=socket_timeout
                 )
+                self._add_breaker(CLUSTER_NODE)
             else:
-                self.client = redis.Redis(
-                    host=hosts[0],
-                    port=port,
-                    db=db,
-                    password=password,
-                    decode_responses=True
-                )
+                # Cada host es un shard independiente del anillo
+                for host in hosts:
+                    self.add_node(host)
+            
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(len(hosts), 1),
+                thread_name_prefix="cache-shard"
+            )
+            first_client = next(iter(self.clients.values()))
+            self._release_lock = first_client.register_script(RELEASE_LOCK_SCRIPT)
                 
             logger.info(
                 "Caché distribuido inicializado",
@@ -89,15 +180,179 @@ class DistributedCache:
             )
             raise MemoryError(f"Error inicializando caché: {str(e)}")
     
+    def add_node(self, host: str) -> None:
+        """
+        Añade un host de Redis al anillo de shards.
+        
+        Solo se reasigna la fracción de claves que pasa a pertenecer al
+        nuevo host; esas claves se leerán como fallos hasta recalcularse.
+        """
+        if self.cluster_mode:
+            raise MemoryError("En modo cluster los nodos los gestiona Redis Cluster")
+        if host not in self.clients:
+            self.clients[host] = self._client_factory(host)
+            self._add_breaker(host)
+            self.ring.add_node(host)
+    
+    def remove_node(self, host: str) -> None:
+        """Retira un host de Redis del anillo de shards."""
+        if self.cluster_mode:
+            raise MemoryError("En modo cluster los nodos los gestiona Redis Cluster")
+        if host in self.clients:
+            self.ring.remove_node(host)
+            self.breakers.pop(host)
+            client = self.clients.pop(host)
+            client.close()
+    
+    def _add_breaker(self, node: str) -> None:
+        """Crea el circuit breaker de un nodo."""
+        self.breakers[node] = CircuitBreaker(f"redis:{node}", **self._breaker_settings)
+    
+    def _call(self, node: str, operation: Callable[[Any], Any], timed: bool = True) -> Any:
+        """
+        Ejecuta una operación sobre el cliente de un nodo a través de su breaker.
+        
+        Raises:
+            CircuitOpenError: Si el circuito del nodo está abierto
+        """
+        breaker = self.breakers[node]
+        if not breaker.allow_request():
+            raise CircuitOpenError(f"Circuito abierto para el nodo de caché {node}")
+        
+        start_time = time.perf_counter()
+        try:
+            result = operation(self.clients[node])
+        except Exception:
+            breaker.record_failure()
+            raise
+        
+        breaker.record_success(time.perf_counter() - start_time if timed else 0.0)
+        return result
+    
+    def _get_local(self, full_key: str) -> Optional[Any]:
+        """Lee un valor del caché local de respaldo."""
+        value = self.fallback.get(full_key)
+        if value is not None:
+            CACHE_HITS.labels(cache_type="local").inc()
+        else:
+            CACHE_MISSES.labels(cache_type="local").inc()
+        return value
+    
+    def _get_legacy(self, keys: List[str]) -> List[Optional[Any]]:
+        """
+        Lee valores guardados con claves sin prefijo por versiones anteriores.
+        
+        Antes del espacio de nombres todas las claves vivían sin prefijo en
+        el primer host. Los valores encontrados se copian a su clave nueva
+        con el TTL que les queda, así que cada clave antigua se lee como
+        mucho una vez por aquí. Cualquier error cuenta como fallo de caché.
+        """
+        values: List[Optional[Any]] = [None] * len(keys)
+        if not keys or self.legacy_node not in self.clients:
+            return values
+        
+        def read(client) -> List[Any]:
+            pipe = client.pipeline(transaction=False)
+            for key in keys:
+                pipe.get(key)
+                pipe.pttl(key)
+            return pipe.execute()
+        
+        try:
+            replies = self._call(self.legacy_node, read, timed=False)
+        except Exception as e:
+            logger.warning("Error leyendo claves anteriores al espacio de nombres", error=str(e))
+            return values
+        
+        promoted: Dict[str, List[Tuple[str, bytes, int]]] = {}
+        for index, (raw, pttl) in enumerate(zip(replies[::2], replies[1::2])):
+            if raw is None:
+                continue
+            try:
+                values[index] = self.serializer.loads(raw)
+            except Exception:
+                continue
+            full_key = self._key(keys[index])
+            ttl_ms = pttl if pttl and pttl > 0 else self.default_ttl * 1000
+            promoted.setdefault(self._node_for(full_key), []).append(
+                (full_key, self.serializer.dumps(values[index]), ttl_ms)
+            )
+        
+        for node, entries in promoted.items():
+            def write(client, entries=entries) -> Any:
+                pipe = client.pipeline(transaction=False)
+                for full_key, payload, ttl_ms in entries:
+                    pipe.psetex(full_key, ttl_ms, payload)
+                return pipe.execute()
+            try:
+                self._call(node, write, timed=False)
+            except Exception as e:
+                logger.warning("Error copiando claves anteriores al espacio de nombres", node=node, error=str(e))
+        
+        return values
+    
+    def _node_for(self, full_key: str) -> str:
+        """Devuelve el nodo responsable de una clave de Redis."""
+        if self.cluster_mode:
+            return CLUSTER_NODE
+        return self.ring.get_node(full_key)
+    
+    def _group_by_node(self, full_keys: List[str]) -> Dict[str, List[int]]:
+        """Agrupa las posiciones de ``full_keys`` por nodo responsable."""
+        groups: Dict[str, List[int]] = {}
+        for index, full_key in enumerate(full_keys):
+            groups.setdefault(self._node_for(full_key), []).append(index)
+        return groups
+    
+    async def _fan_out(self, jobs: Dict[str, Callable[[Any], Any]]) -> Dict[str, Any]:
+        """
+        Ejecuta un trabajo por shard en paralelo a través de su breaker.
+        
+        Con un solo shard el trabajo se ejecuta directamente para no pagar
+        el salto al pool de hilos. Los errores de cada shard se devuelven
+        como resultado para que el llamador pueda recurrir al respaldo local.
+        Un lote grande es lento por naturaleza, así que su latencia no
+        cuenta para el umbral del breaker; sí cuentan sus errores y timeouts.
+        """
+        def guarded(node: str, job: Callable[[Any], Any]) -> Callable[[], Any]:
+            def run() -> Any:
+                try:
+                    return self._call(node, job, timed=False)
+                except Exception as e:
+                    return e
+            return run
+        
+        if len(jobs) == 1:
+            node, job = next(iter(jobs.items()))
+            return {node: guarded(node, job)()}
+        
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*[
+            loop.run_in_executor(self._executor, guarded(node, job))
+            for node, job in jobs.items()
+        ])
+        return dict(zip(jobs, results))
+    
     async def get(self, key: str) -> Optional[Any]:
-        """Obtiene un valor del caché."""
+        """
+        Obtiene un valor del caché.
+        
+        Si el shard de la clave falla o tiene el circuito abierto, el valor
+        se busca en el caché local de respaldo.
+        """
+        full_key = self._key(key)
         try:
             start_time = datetime.now()
-            value = self.client.get(key)
+            value = self._call(self._node_for(full_key), lambda client: client.get(full_key))
+            
+            if value is not None:
+                value = self.serializer.loads(value)
+            else:
+                value = self._get_legacy([key])[0]
             
             if value is not None:
                 CACHE_HITS.labels(cache_type="redis").inc()
-                value = json.loads(value)
+                self.fallback[full_key] = value
             else:
                 CACHE_MISSES.labels(cache_type="redis").inc()
             
@@ -107,6 +362,10 @@ class DistributedCache:
             record_memory_operation("cache_get", "success" if value else "miss")
             return value
             
+        except CircuitOpenError:
+            record_memory_operation("cache_get", "fallback")
+            return self._get_local(full_key)
+            
         except Exception as e:
             logger.error(
                 "Error obteniendo valor del caché",
@@ -114,27 +373,44 @@ class DistributedCache:
                 error=str(e)
             )
             record_memory_operation("cache_get", "error")
-            return None
+            return self._get_local(full_key)
     
     async def set(
         self,
         key: str,
         value: Any,
-        ttl: Optional[int] = None
+        ttl: Optional[int] = None,
+        tags: Optional[List[str]] = None
     ) -> bool:
-        """Guarda un valor en el caché."""
+        """
+        Guarda un valor en el caché.
+        
+        Args:
+            key: Clave del valor
+            value: Valor a guardar
+            ttl: Tiempo de vida en segundos (por defecto ``default_ttl``)
+            tags: Etiquetas bajo las que se registra la clave para poder
+                invalidarla con ``invalidate_tag``
+            
+        Returns:
+            True si el valor se guardó en Redis. Si el shard no está
+            disponible el valor solo queda en el caché local y se devuelve False
+        """
+        full_key = self._key(key)
+        self.fallback[full_key] = value
         try:
             start_time = datetime.now()
-            serialized = json.dumps(value)
+            serialized = self.serializer.dumps(value)
             
             if ttl is None:
                 ttl = self.default_ttl
                 
-            success = self.client.setex(
-                key,
-                ttl,
-                serialized
+            success = self._call(
+                self._node_for(full_key),
+                lambda client: client.setex(full_key, ttl, serialized)
             )
+            if tags:
+                self._register_tags([full_key], tags, ttl)
             
             duration = (datetime.now() - start_time).total_seconds()
             CACHE_LATENCY.labels(operation="set").observe(duration)
@@ -142,6 +418,10 @@ class DistributedCache:
             record_memory_operation("cache_set", "success" if success else "error")
             return success
             
+        except CircuitOpenError:
+            record_memory_operation("cache_set", "fallback")
+            return False
+            
         except Exception as e:
             logger.error(
                 "Error guardando valor en caché",
@@ -151,11 +431,414 @@ class DistributedCache:
             record_memory_operation("cache_set", "error")
             return False
     
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """
+        Obtiene varios valores del caché en lote.
+        
+        Las claves se reparten por shard y, dentro de cada uno, se agrupan
+        en MGET de hasta ``batch_size`` claves (por slot en modo cluster)
+        enviados en un único pipeline. Los shards se consultan en paralelo,
+        de modo que leer miles de claves cuesta unos pocos viajes de red.
+        
+        Args:
+            keys: Claves a consultar
+            
+        Returns:
+            Valores en el mismo orden que ``keys`` (``None`` si no existen)
+        """
+        if not keys:
+            return []
+            
+        try:
+            start_time = datetime.now()
+            results: List[Optional[Any]] = [None] * len(keys)
+            full_keys = [self._key(key) for key in keys]
+            
+            def fetch(indexes: List[int]) -> Callable[[Any], List[Tuple[int, Any]]]:
+                def job(client) -> List[Tuple[int, Any]]:
+                    shard_keys = [full_keys[i] for i in indexes]
+                    batches = self._batch_indexes(client, shard_keys)
+                    
+                    pipe = client.pipeline(transaction=False)
+                    for batch in batches:
+                        pipe.mget([shard_keys[i] for i in batch])
+                    replies = pipe.execute()
+                    
+                    return [
+                        (indexes[i], value)
+                        for batch, values in zip(batches, replies)
+                        for i, value in zip(batch, values)
+                    ]
+                return job
+            
+            groups = self._group_by_node(full_keys)
+            shard_results = await self._fan_out({
+                node: fetch(indexes)
+                for node, indexes in groups.items()
+            })
+            
+            hits = 0
+            for node, pairs in shard_results.items():
+                if isinstance(pairs, Exception):
+                    if not isinstance(pairs, CircuitOpenError):
+                        logger.error(
+                            "Error obteniendo valores de un shard del caché",
+                            node=node,
+                            error=str(pairs)
+                        )
+                    for index in groups[node]:
+                        results[index] = self._get_local(full_keys[index])
+                    continue
+                
+                for index, value in pairs:
+                    if value is not None:
+                        results[index] = self.serializer.loads(value)
+                        self.fallback[full_keys[index]] = results[index]
+                        hits += 1
+            
+            missing = [
+                index
+                for node, pairs in shard_results.items() if not isinstance(pairs, Exception)
+                for index in groups[node] if results[index] is None
+            ]
+            legacy = self._get_legacy([keys[index] for index in missing])
+            for index, value in zip(missing, legacy):
+                if value is not None:
+                    results[index] = value
+                    self.fallback[full_keys[index]] = value
+                    hits += 1
+            
+            misses = sum(len(groups[node]) for node, pairs in shard_results.items()
+                         if not isinstance(pairs, Exception)) - hits
+            if hits:
+                CACHE_HITS.labels(cache_type="redis").inc(hits)
+            if misses:
+                CACHE_MISSES.labels(cache_type="redis").inc(misses)
+            
+            duration = (datetime.now() - start_time).total_seconds()
+            CACHE_LATENCY.labels(operation="get_many").observe(duration)
+            
+            record_memory_operation("cache_get_many", "success" if hits else "miss")
+            return results
+            
+        except Exception as e:
+            logger.error(
+                "Error obteniendo valores del caché en lote",
+                keys=len(keys),
+                error=str(e)
+            )
+            record_memory_operation("cache_get_many", "error")
+            return [None] * len(keys)
+    
+    async def set_many(
+        self,
+        items: Dict[str, Any],
+        ttl: Optional[int] = None,
+        tags: Optional[List[str]] = None
+    ) -> bool:
+        """
+        Guarda varios valores en el caché en lote.
+        
+        Los SETEX se reparten por shard y se envían en pipelines sin
+        transacción de hasta ``batch_size`` comandos; los shards se
+        escriben en paralelo.
+        
+        Args:
+            items: Diccionario clave -> valor a guardar
+            ttl: Tiempo de vida en segundos (por defecto ``default_ttl``)
+            tags: Etiquetas bajo las que se registran todas las claves
+            
+        Returns:
+            True si todos los valores se guardaron correctamente
+        """
+        if not items:
+            return True
+            
+        try:
+            start_time = datetime.now()
+            
+            if ttl is None:
+                ttl = self.default_ttl
+            
+            entries = [
+                (self._key(key), self.serializer.dumps(value))
+                for key, value in items.items()
+            ]
+            for (full_key, _), value in zip(entries, items.values()):
+                self.fallback[full_key] = value
+            
+            def store(indexes: List[int]) -> Callable[[Any], bool]:
+                def job(client) -> bool:
+                    stored = True
+                    for offset in range(0, len(indexes), self.batch_size):
+                        pipe = client.pipeline(transaction=False)
+                        for i in indexes[offset:offset + self.batch_size]:
+                            pipe.setex(entries[i][0], ttl, entries[i][1])
+                        stored = all(pipe.execute()) and stored
+                    return stored
+                return job
+            
+            full_keys = [full_key for full_key, _ in entries]
+            shard_results = await self._fan_out({
+                node: store(indexes)
+                for node, indexes in self._group_by_node(full_keys).items()
+            })
+            
+            success = True
+            for node, stored in shard_results.items():
+                if isinstance(stored, Exception):
+                    if not isinstance(stored, CircuitOpenError):
+                        logger.error(
+                            "Error guardando valores en un shard del caché",
+                            node=node,
+                            error=str(stored)
+                        )
+                    success = False
+                else:
+                    success = stored and success
+            
+            if tags:
+                self._register_tags(full_keys, tags, ttl)
+            
+            duration = (datetime.now() - start_time).total_seconds()
+            CACHE_LATENCY.labels(operation="set_many").observe(duration)
+            
+            record_memory_operation("cache_set_many", "success" if success else "error")
+            return success
+            
+        except Exception as e:
+            logger.error(
+                "Error guardando valores en caché en lote",
+                keys=len(items),
+                error=str(e)
+            )
+            record_memory_operation("cache_set_many", "error")
+            return False
+    
+    async def get_or_compute(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: Optional[int] = None,
+        stale_ttl: Optional[int] = None,
+        lock_timeout: float = 30.0,
+        wait_timeout: float = 5.0,
+        beta: float = 1.0,
+        tags: Optional[List[str]] = None
+    ) -> Any:
+        """
+        Obtiene un valor del caché o lo calcula con ``loader`` una sola vez.
+        
+        El valor se guarda junto con su tiempo de cálculo y su expiración
+        lógica, y se conserva en Redis ``stale_ttl`` segundos más. Antes de
+        expirar se refresca de forma probabilística (XFetch): cuanto más
+        caro es el cálculo y más cerca está la expiración, más probable es
+        que un llamador lo recalcule. Un lock corto en Redis garantiza que
+        solo un llamador de todo el cluster recalcula; el resto recibe el
+        valor antiguo o, si no existe, espera a que se publique.
+        
+        Las claves gestionadas por este método almacenan un sobre con
+        metadatos, por lo que no deben leerse con ``get``.
+        
+        Args:
+            key: Clave del valor
+            loader: Función (síncrona o asíncrona) que calcula el valor
+            ttl: Vida lógica del valor en segundos (por defecto ``default_ttl``)
+            stale_ttl: Tiempo extra que se sirve el valor antiguo (por defecto ``ttl``)
+            lock_timeout: Duración máxima del lock de recálculo en segundos
+            wait_timeout: Espera máxima por el valor cuando otro llamador lo calcula
+            beta: Factor de anticipación de XFetch (>1 refresca antes)
+            tags: Etiquetas bajo las que se registra la clave
+            
+        Returns:
+            El valor cacheado o recién calculado
+        """
+        if ttl is None:
+            ttl = self.default_ttl
+        if stale_ttl is None:
+            stale_ttl = ttl
+        
+        entry = self._read_entry(key)
+        now = time.time()
+        
+        if entry is not None and not self._should_refresh(entry, now, beta):
+            CACHE_HITS.labels(cache_type="redis").inc()
+            record_memory_operation("cache_get_or_compute", "success")
+            return entry["value"]
+        
+        if entry is None:
+            CACHE_MISSES.labels(cache_type="redis").inc()
+            reason = "miss"
+        else:
+            CACHE_HITS.labels(cache_type="redis").inc()
+            reason = "expired" if now >= entry["expires"] else "early"
+        
+        lock_key = self._key(f"{key}:lock")
+        token = self._acquire_lock(lock_key, lock_timeout)
+        
+        if token is None:
+            if entry is not None:
+                CACHE_RECOMPUTES_AVOIDED.labels(reason="stale").inc()
+                record_memory_operation("cache_get_or_compute", "stale")
+                return entry["value"]
+            
+            deadline = time.monotonic() + wait_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                entry = self._read_entry(key)
+                if entry is not None:
+                    CACHE_RECOMPUTES_AVOIDED.labels(reason="waited").inc()
+                    record_memory_operation("cache_get_or_compute", "success")
+                    return entry["value"]
+            
+            logger.warning(
+                "Tiempo de espera agotado aguardando recálculo",
+                key=key,
+                wait_timeout=wait_timeout
+            )
+            reason = "lock_timeout"
+        
+        try:
+            start_time = time.perf_counter()
+            try:
+                value = loader()
+                if inspect.isawaitable(value):
+                    value = await value
+            except Exception as e:
+                if entry is None:
+                    raise
+                logger.error(
+                    "Error recalculando valor, sirviendo valor antiguo",
+                    key=key,
+                    error=str(e)
+                )
+                record_memory_operation("cache_get_or_compute", "error")
+                return entry["value"]
+            
+            delta = time.perf_counter() - start_time
+            CACHE_RECOMPUTES.labels(reason=reason).inc()
+            CACHE_LATENCY.labels(operation="compute").observe(delta)
+            
+            self._write_entry(
+                key,
+                {"value": value, "delta": delta, "expires": time.time() + ttl},
+                ttl + stale_ttl,
+                tags
+            )
+            record_memory_operation("cache_get_or_compute", "computed")
+            return value
+            
+        finally:
+            if token is not None:
+                self._release(lock_key, token)
+    
+    @staticmethod
+    def _should_refresh(entry: Dict, now: float, beta: float) -> bool:
+        """Decide con XFetch si un valor debe recalcularse anticipadamente."""
+        # 1 - random() está en (0, 1], por lo que el logaritmo está definido
+        jitter = -entry["delta"] * beta * math.log(1.0 - random.random())
+        return now + jitter >= entry["expires"]
+    
+    def _read_entry(self, key: str) -> Optional[Dict]:
+        """Lee el sobre de un valor gestionado por ``get_or_compute``."""
+        full_key = self._key(key)
+        try:
+            raw = self._call(self._node_for(full_key), lambda client: client.get(full_key))
+        except CircuitOpenError:
+            return self._get_local(full_key)
+        except Exception as e:
+            logger.error("Error leyendo valor del caché", key=key, error=str(e))
+            return self._get_local(full_key)
+        
+        if raw is None:
+            return None
+        entry = self.serializer.loads(raw)
+        self.fallback[full_key] = entry
+        return entry
+    
+    def _write_entry(
+        self,
+        key: str,
+        entry: Dict,
+        ttl: int,
+        tags: Optional[List[str]] = None
+    ) -> None:
+        """Guarda el sobre de un valor gestionado por ``get_or_compute``."""
+        full_key = self._key(key)
+        self.fallback[full_key] = entry
+        try:
+            serialized = self.serializer.dumps(entry)
+            self._call(
+                self._node_for(full_key),
+                lambda client: client.setex(full_key, ttl, serialized)
+            )
+            if tags:
+                self._register_tags([full_key], tags, ttl)
+        except CircuitOpenError:
+            pass
+        except Exception as e:
+            logger.error("Error guardando valor en caché", key=key, error=str(e))
+    
+    def _acquire_lock(self, lock_key: str, timeout: float) -> Optional[str]:
+        """Intenta adquirir un lock de recálculo; devuelve su token o None."""
+        token = uuid.uuid4().hex
+        try:
+            acquired = self._call(
+                self._node_for(lock_key),
+                lambda client: client.set(lock_key, token, nx=True, px=int(timeout * 1000))
+            )
+            return token if acquired else None
+        except CircuitOpenError:
+            # Sin Redis no hay coordinación posible: se calcula localmente
+            return token
+        except Exception as e:
+            # Sin Redis no hay coordinación posible: se calcula localmente
+            logger.error("Error adquiriendo lock de recálculo", key=lock_key, error=str(e))
+            return token
+    
+    def _release(self, lock_key: str, token: str) -> None:
+        """Libera un lock de recálculo si sigue siendo nuestro."""
+        try:
+            self._call(
+                self._node_for(lock_key),
+                lambda client: self._release_lock(keys=[lock_key], args=[token], client=client)
+            )
+        except CircuitOpenError:
+            pass
+        except Exception as e:
+            logger.error("Error liberando lock de recálculo", key=lock_key, error=str(e))
+    
+    def _batch_indexes(self, client, keys: List[str]) -> List[List[int]]:
+        """
+        Agrupa las posiciones de ``keys`` en lotes aptos para un MGET.
+        
+        En modo cluster un MGET solo puede tocar un hash slot, por lo que
+        las claves se agrupan primero por slot.
+        """
+        if self.cluster_mode:
+            groups: Dict[int, List[int]] = {}
+            for index, key in enumerate(keys):
+                groups.setdefault(client.keyslot(key), []).append(index)
+            ordered = list(groups.values())
+        else:
+            ordered = [list(range(len(keys)))]
+        
+        return [
+            group[offset:offset + self.batch_size]
+            for group in ordered
+            for offset in range(0, len(group), self.batch_size)
+        ]
+    
     async def delete(self, key: str) -> bool:
         """Elimina un valor del caché."""
+        full_key = self._key(key)
+        self.fallback.pop(full_key, None)
         try:
             start_time = datetime.now()
-            success = bool(self.client.delete(key))
+            success = bool(self._call(
+                self._node_for(full_key),
+                lambda client: client.delete(full_key)
+            ))
             
             duration = (datetime.now() - start_time).total_seconds()
             CACHE_LATENCY.labels(operation="delete").observe(duration)
@@ -172,19 +855,174 @@ class DistributedCache:
             record_memory_operation("cache_delete", "error")
             return False
     
+    async def invalidate_tag(self, tag: str) -> int:
+        """
+        Invalida todas las claves registradas bajo una etiqueta.
+        
+        Los miembros de la etiqueta se recorren con SSCAN y se eliminan con
+        UNLINK en lotes de ``batch_size``, cediendo el bucle de eventos
+        entre lotes, de modo que ninguna llamada bloquea Redis aunque la
+        etiqueta agrupe millones de claves.
+        
+        Args:
+            tag: Etiqueta a invalidar
+            
+        Returns:
+            Número de claves eliminadas
+        """
+        try:
+            start_time = datetime.now()
+            tag_key = self._tag_key(tag)
+            tag_node = self._node_for(tag_key)
+            
+            removed = 0
+            cursor = 0
+            while True:
+                cursor, members = self._call(
+                    tag_node,
+                    lambda client: client.sscan(tag_key, cursor, count=self.batch_size)
+                )
+                batch = [member.decode("utf-8") for member in members]
+                if batch:
+                    removed += self._unlink(batch)
+                    await asyncio.sleep(0)
+                if cursor == 0:
+                    break
+            self._call(tag_node, lambda client: client.unlink(tag_key))
+            
+            duration = (datetime.now() - start_time).total_seconds()
+            CACHE_LATENCY.labels(operation="invalidate_tag").observe(duration)
+            
+            record_memory_operation("cache_invalidate_tag", "success" if removed else "miss")
+            logger.info("Etiqueta de caché invalidada", tag=tag, removed=removed)
+            return removed
+            
+        except CircuitOpenError:
+            logger.warning("Caché no disponible para invalidar etiqueta", tag=tag)
+            record_memory_operation("cache_invalidate_tag", "error")
+            return 0
+            
+        except Exception as e:
+            logger.error("Error invalidando etiqueta del caché", tag=tag, error=str(e))
+            record_memory_operation("cache_invalidate_tag", "error")
+            return 0
+    
     async def flush(self) -> bool:
-        """Limpia todo el caché."""
+        """
+        Limpia todas las claves del namespace de este caché.
+        
+        En lugar de FLUSHDB, que bloquea Redis y borra las claves de otros
+        usuarios de la base de datos, recorre el namespace con SCAN y
+        elimina cada lote con UNLINK, que libera la memoria en segundo plano.
+        """
         try:
             start_time = datetime.now()
-            success = self.client.flushdb()
+            pattern = f"{self._escape_pattern(self.namespace)}:*"
+            self.fallback.clear()
+            
+            removed = 0
+            for node in list(self.clients):
+                for keys in self._scan(node, pattern):
+                    removed += self._call(node, lambda client: client.unlink(*keys), timed=False)
+                    await asyncio.sleep(0)
             
             duration = (datetime.now() - start_time).total_seconds()
             CACHE_LATENCY.labels(operation="flush").observe(duration)
             
-            record_memory_operation("cache_flush", "success" if success else "error")
-            return success
+            record_memory_operation("cache_flush", "success")
+            logger.info("Caché limpiado", namespace=self.namespace, removed=removed)
+            return True
             
         except Exception as e:
             logger.error("Error limpiando caché", error=str(e))
             record_memory_operation("cache_flush", "error")
             return False
+    
+    def _scan(self, node: str, pattern: str) -> Iterator[List[bytes]]:
+        """
+        Recorre con SCAN las claves de ``pattern`` en un nodo, lote a lote.
+        
+        En modo cluster SCAN se envía a todos los primarios y devuelve un
+        cursor por nodo; cada cursor se continúa solo en su nodo hasta
+        llegar a 0.
+        """
+        if not self.cluster_mode:
+            cursor = 0
+            while True:
+                cursor, keys = self._call(
+                    node,
+                    lambda client: client.scan(cursor, match=pattern, count=self.batch_size),
+                    timed=False
+                )
+                if keys:
+                    yield keys
+                if cursor == 0:
+                    return
+        
+        cursors, keys = self._call(
+            node,
+            lambda client: client.scan(match=pattern, count=self.batch_size),
+            timed=False
+        )
+        if keys:
+            yield keys
+        pending = {name: cursor for name, cursor in cursors.items() if cursor != 0}
+        while pending:
+            for name, cursor in list(pending.items()):
+                def step(client, name=name, cursor=cursor):
+                    return client.scan(
+                        cursor,
+                        match=pattern,
+                        count=self.batch_size,
+                        target_nodes=client.get_node(node_name=name)
+                    )
+                cursors, keys = self._call(node, step, timed=False)
+                if keys:
+                    yield keys
+                if cursors[name] == 0:
+                    del pending[name]
+                else:
+                    pending[name] = cursors[name]
+    
+    def _key(self, key: str) -> str:
+        """Construye la clave de Redis de un valor dentro del namespace."""
+        return f"{self.namespace}:v:{key}"
+    
+    def _tag_key(self, tag: str) -> str:
+        """Construye la clave del conjunto de miembros de una etiqueta."""
+        return f"{self.namespace}:t:{tag}"
+    
+    def _register_tags(self, keys: List[str], tags: List[str], ttl: int) -> None:
+        """
+        Registra ``keys`` bajo cada etiqueta en el shard de la etiqueta.
+        
+        El conjunto de la etiqueta expira con el más longevo de sus miembros
+        (EXPIRE NX seguido de EXPIRE GT, Redis >= 7.0).
+        """
+        def register(tag_key: str) -> Callable[[Any], Any]:
+            def job(client) -> Any:
+                pipe = client.pipeline(transaction=False)
+                pipe.sadd(tag_key, *keys)
+                pipe.expire(tag_key, ttl, nx=True)
+                pipe.expire(tag_key, ttl, gt=True)
+                return pipe.execute()
+            return job
+        
+        for tag in tags:
+            tag_key = self._tag_key(tag)
+            self._call(self._node_for(tag_key), register(tag_key))
+    
+    def _unlink(self, full_keys: List[str]) -> int:
+        """Elimina con UNLINK claves que pueden estar en varios shards."""
+        removed = 0
+        for full_key in full_keys:
+            self.fallback.pop(full_key, None)
+        for node, indexes in self._group_by_node(full_keys).items():
+            shard_keys = [full_keys[i] for i in indexes]
+            removed += self._call(node, lambda client: client.unlink(*shard_keys))
+        return removed
+    
+    @staticmethod
+    def _escape_pattern(value: str) -> str:
+        """Escapa los caracteres especiales de un patrón glob de SCAN."""
+        return re.sub(r"([*?\[\]\\])", r"\\\1", value)
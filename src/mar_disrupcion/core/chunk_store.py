@@ -0,0 +1,205 @@
+"""
+Troceado por contenido y almacén de chunks direccionado por contenido.
+
+Los backups incrementales dividen la base de datos en chunks cuyos límites
+dependen solo de los bytes cercanos (gear hash), de modo que un cambio en
+unas pocas páginas solo altera los chunks que las contienen. Cada chunk se
+guarda comprimido una única vez con su SHA-256 como nombre.
+"""
+import gzip
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, Set, Tuple
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Tabla del gear hash: 256 valores de 64 bits fijos para que los límites de
+# los chunks sean estables entre ejecuciones
+GEAR = np.random.default_rng(0x6D61722D).integers(
+    0, np.iinfo(np.uint64).max, size=256, dtype=np.uint64, endpoint=True
+)
+
+# El hash de 64 bits depende de los últimos 64 bytes
+GEAR_WINDOW = 64
+
+MIN_CHUNK_SIZE = 16 * 1024
+AVG_CHUNK_BITS = 16  # chunks de 64 KiB de media
+MAX_CHUNK_SIZE = 256 * 1024
+READ_BLOCK_SIZE = 4 * 1024 * 1024
+
+CODEC_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def _gear_hashes(data: np.ndarray, history: np.ndarray) -> np.ndarray:
+    """
+    Gear hash en cada posición de un bloque.
+
+    ``h[i] = (h[i-1] << 1) + GEAR[b[i]]`` equivale a sumar
+    ``GEAR[b[i-k]] << k`` para los últimos 64 bytes. La suma se construye
+    duplicando la ventana (1, 2, 4... 64 bytes), con seis operaciones
+    vectoriales por bloque. ``history`` son los bytes previos al bloque.
+    """
+    hashes = GEAR[np.concatenate([history, data])]
+    width = 1
+    while width < GEAR_WINDOW:
+        hashes[width:] += hashes[:-width] << np.uint64(width)
+        width *= 2
+    return hashes[len(history):]
+
+
+def iter_chunks(
+    source: BinaryIO,
+    min_size: int = MIN_CHUNK_SIZE,
+    avg_bits: int = AVG_CHUNK_BITS,
+    max_size: int = MAX_CHUNK_SIZE,
+    block_size: int = READ_BLOCK_SIZE
+) -> Iterator[bytes]:
+    """
+    Divide un flujo en chunks definidos por su contenido.
+
+    Se corta tras un byte cuyo hash tiene a cero sus ``avg_bits`` bits altos
+    (los que dependen de toda la ventana), respetando los tamaños mínimo y
+    máximo. Lee el flujo por bloques, con memoria acotada.
+    """
+    mask = np.uint64(((1 << avg_bits) - 1) << (64 - avg_bits))
+    history = np.empty(0, dtype=np.uint8)
+    pending = bytearray()
+
+    while True:
+        block = source.read(block_size)
+        if not block:
+            break
+        data = np.frombuffer(block, dtype=np.uint8)
+        candidates = np.flatnonzero((_gear_hashes(data, history) & mask) == 0) + 1
+        history = np.concatenate([history, data])[-(GEAR_WINDOW - 1):]
+
+        pos = 0
+        for end in candidates.tolist():
+            while len(pending) + end - pos > max_size:
+                take = max_size - len(pending)
+                pending += block[pos:pos + take]
+                pos += take
+                yield bytes(pending)
+                pending.clear()
+            if len(pending) + end - pos < min_size:
+                continue
+            pending += block[pos:end]
+            pos = end
+            yield bytes(pending)
+            pending.clear()
+
+        while len(pending) + len(block) - pos > max_size:
+            take = max_size - len(pending)
+            pending += block[pos:pos + take]
+            pos += take
+            yield bytes(pending)
+            pending.clear()
+        pending += block[pos:]
+
+    if pending:
+        yield bytes(pending)
+
+
+class ChunkStore:
+    """
+    Almacén local de chunks comprimidos direccionado por SHA-256.
+
+    Los chunks se guardan en ``<dir>/<2 primeros hex>/<sha256><sufijo>`` y
+    nunca se reescriben; los que no referencia ningún manifiesto se eliminan
+    con ``collect_garbage``.
+    """
+
+    def __init__(self, root: Path, codec: str = "zstd", level: int = 3):
+        """
+        Args:
+            root: Directorio del almacén
+            codec: Códec de los chunks (zstd o gzip)
+            level: Nivel de compresión
+        """
+        if codec not in CODEC_SUFFIXES:
+            raise ValueError(f"Códec de compresión desconocido: {codec}")
+        if codec == "zstd" and zstandard is None:
+            codec = "gzip"
+        self.root = Path(root)
+        self.codec = codec
+        self.level = level
+
+    def path(self, digest: str, codec: str) -> Path:
+        """Ruta del archivo de un chunk."""
+        return self.root / digest[:2] / (digest + CODEC_SUFFIXES[codec])
+
+    def put(self, data: bytes) -> Tuple[str, int]:
+        """
+        Guarda un chunk si no existe.
+
+        Returns:
+            (sha256 en hexadecimal, bytes escritos en disco; 0 si ya existía)
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest, self.codec)
+        if path.exists():
+            return digest, 0
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if self.codec == "zstd":
+            compressed = zstandard.ZstdCompressor(level=self.level).compress(data)
+        else:
+            compressed = gzip.compress(data, compresslevel=self.level, mtime=0)
+
+        partial = path.with_name(path.name + ".partial")
+        with open(partial, "wb") as f:
+            f.write(compressed)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(partial, path)
+        return digest, len(compressed)
+
+    def get(self, digest: str, codec: str) -> bytes:
+        """Lee un chunk y comprueba su SHA-256."""
+        compressed = self.path(digest, codec).read_bytes()
+        if codec == "zstd":
+            if zstandard is None:
+                raise ValueError("El chunk usa zstd y el módulo zstandard no está instalado")
+            data = zstandard.ZstdDecompressor().decompress(compressed)
+        else:
+            data = gzip.decompress(compressed)
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Checksum del chunk no coincide: {digest}")
+        return data
+
+    def sync(self) -> None:
+        """Sincroniza con el disco los directorios del almacén."""
+        if not self.root.exists():
+            return
+        for directory in [self.root, *(d for d in self.root.iterdir() if d.is_dir())]:
+            dir_fd = os.open(str(directory), os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    def collect_garbage(self, referenced: Iterable[Path]) -> Dict:
+        """
+        Elimina los chunks que no están en ``referenced``.
+
+        Returns:
+            Chunks y bytes eliminados
+        """
+        keep: Set[Path] = set(referenced)
+        stats = {"chunks_deleted": 0, "bytes_deleted": 0}
+        for path in self.root.glob("*/*"):
+            if path in keep:
+                continue
+            stats["bytes_deleted"] += path.stat().st_size
+            stats["chunks_deleted"] += 1
+            path.unlink()
+        return stats
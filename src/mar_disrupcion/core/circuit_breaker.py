@@ -0,0 +1,130 @@
+"""
+Circuit breaker para dependencias externas poco fiables.
+"""
+import threading
+import time
+from typing import Optional
+
+import structlog
+
+from ..core.metrics import CIRCUIT_BREAKER_STATE
+
+logger = structlog.get_logger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker con umbral de errores y de latencia.
+
+    Cerrado deja pasar todas las llamadas. Tras ``failure_threshold`` fallos
+    consecutivos (las llamadas más lentas que ``latency_threshold`` cuentan
+    como fallos) se abre y rechaza llamadas durante ``reset_timeout``
+    segundos. Después pasa a semiabierto y deja pasar hasta
+    ``half_open_max_calls`` sondas: un éxito lo cierra y un fallo lo
+    vuelve a abrir.
+    """
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+    # Valores exportados en el gauge de Prometheus
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        latency_threshold: Optional[float] = None,
+        reset_timeout: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        """
+        Inicializa el circuit breaker.
+
+        Args:
+            name: Nombre del breaker (etiqueta de la métrica)
+            failure_threshold: Fallos consecutivos que abren el circuito
+            latency_threshold: Latencia en segundos a partir de la cual una
+                llamada cuenta como fallo (None desactiva el umbral)
+            reset_timeout: Segundos que el circuito permanece abierto
+            half_open_max_calls: Sondas simultáneas permitidas en semiabierto
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.latency_threshold = latency_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+
+        CIRCUIT_BREAKER_STATE.labels(breaker=name).set(self.STATE_VALUES[self.CLOSED])
+
+    @property
+    def state(self) -> str:
+        """Estado actual del circuito."""
+        with self._lock:
+            if self._state == self.OPEN and self._reset_elapsed():
+                return self.HALF_OPEN
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Indica si una llamada puede pasar y la registra como sonda si procede."""
+        with self._lock:
+            if self._state == self.OPEN:
+                if not self._reset_elapsed():
+                    return False
+                self._transition(self.HALF_OPEN)
+
+            if self._state == self.HALF_OPEN:
+                if self._half_open_calls >= self.half_open_max_calls:
+                    return False
+                self._half_open_calls += 1
+
+            return True
+
+    def record_success(self, duration: float = 0.0) -> None:
+        """Registra una llamada completada y su duración en segundos."""
+        if self.latency_threshold is not None and duration > self.latency_threshold:
+            self.record_failure()
+            return
+
+        with self._lock:
+            self._failures = 0
+            if self._state != self.CLOSED:
+                self._transition(self.CLOSED)
+
+    def record_failure(self) -> None:
+        """Registra una llamada fallida."""
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._transition(self.OPEN)
+
+    def _reset_elapsed(self) -> bool:
+        """Indica si ya pasó el tiempo de apertura del circuito."""
+        return time.monotonic() - self._opened_at >= self.reset_timeout
+
+    def _transition(self, state: str) -> None:
+        """Cambia de estado y actualiza la métrica (requiere el lock)."""
+        if state == self._state:
+            if state == self.OPEN:
+                self._half_open_calls = 0
+            return
+
+        logger.warning(
+            "Circuit breaker cambia de estado",
+            breaker=self.name,
+            from_state=self._state,
+            to_state=state
+        )
+        self._state = state
+        self._half_open_calls = 0
+        if state == self.CLOSED:
+            self._failures = 0
+        CIRCUIT_BREAKER_STATE.labels(breaker=self.name).set(self.STATE_VALUES[state])
@@ -11,7 +11,7 @@ from prometheus_client import start_http_server
 
 from .config_models import (
     Settings, APIConfig, SecurityConfig,
-    MemoryConfig, MLConfig, MonitoringConfig
+    MemoryConfig, StorageConfig, MLConfig, MonitoringConfig
 )
 from .exceptions import ConfigurationError
 
@@ -44,6 +44,7 @@ def load_config() -> Dict[str, Any]:
         )
         
         memory_config = MemoryConfig(**raw_config.get("memory", {}))
+        storage_config = StorageConfig(**raw_config.get("storage", {}))
         ml_config = MLConfig(**raw_config.get("ml", {}))
         monitoring_config = MonitoringConfig(**raw_config.get("monitoring", {}))
         
@@ -52,6 +53,7 @@ def load_config() -> Dict[str, Any]:
             api=api_config,
             security=security_config,
             memory=memory_config,
+            storage=storage_config,
             ml=ml_config,
             monitoring=monitoring_config
         )
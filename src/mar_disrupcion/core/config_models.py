@@ -1,7 +1,7 @@
 """
 Modelos de configuración usando Pydantic para validación.
 """
-from typing import Optional
+from typing import Dict, Optional
 from pydantic import BaseModel, Field, validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -29,6 +29,22 @@ class MemoryConfig(BaseModel):
     context_depth: int = Field(8, ge=1, le=50, description="Profundidad del contexto")
     confidence_threshold: float = Field(0.75, ge=0, le=1, description="Umbral de confianza")
     cache_size: int = Field(2048, ge=256, description="Tamaño de caché")
+    partition_by_day: bool = Field(False, description="Particionar memorias en tablas diarias")
+    node_id: int = Field(0, ge=0, le=1022, description="Nodo de los ids de memoria")
+
+class StorageProfile(BaseModel):
+    """PRAGMA de SQLite de un perfil de almacenamiento"""
+    journal_mode: str = Field("wal", description="Modo de journal")
+    synchronous: str = Field("normal", description="Nivel de sincronización con el disco")
+    cache_size: int = Field(-65536, description="Caché de páginas (negativo en KiB)")
+    mmap_size: int = Field(0, ge=0, description="Bytes mapeados en memoria")
+    temp_store: str = Field("default", description="Almacenamiento de tablas temporales")
+    busy_timeout: int = Field(5000, ge=0, description="Espera por bloqueos en milisegundos")
+
+class StorageConfig(BaseModel):
+    """Configuración del almacenamiento SQLite"""
+    profile: str = Field("balanced", description="Perfil de almacenamiento activo")
+    profiles: Dict[str, StorageProfile] = Field(default_factory=dict, description="Perfiles de almacenamiento")
 
 class MLConfig(BaseModel):
     """Configuración de aprendizaje automático"""
@@ -48,6 +64,7 @@ class Settings(BaseSettings):
     api: APIConfig
     security: SecurityConfig
     memory: MemoryConfig
+    storage: StorageConfig = StorageConfig()
     ml: MLConfig
     monitoring: MonitoringConfig
     
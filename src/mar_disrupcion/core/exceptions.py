@@ -22,6 +22,10 @@ class MemoryError(MarDisrupcionError):
     """Error en el sistema de memoria."""
     pass
 
+class BackupIntegrityError(MemoryError):
+    """Backup de memoria corrupto o con checksum incorrecto."""
+    pass
+
 class ProcessingError(MarDisrupcionError):
     """Error en el procesamiento de datos."""
     pass
@@ -34,6 +38,10 @@ class ConnectionError(MarDisrupcionError):
     """Error en conexiones externas."""
     pass
 
+class CircuitOpenError(MarDisrupcionError):
+    """Llamada rechazada por un circuit breaker abierto."""
+    pass
+
 class ResourceError(MarDisrupcionError):
     """Error en el manejo de recursos."""
     pass
@@ -0,0 +1,78 @@
+"""
+Anillo de hashing consistente para repartir claves entre nodos.
+"""
+import bisect
+import hashlib
+from typing import Dict, Iterable, List, Optional
+
+
+def _hash(value: str) -> int:
+    """Hash estable de 64 bits de una cadena."""
+    return int.from_bytes(
+        hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(),
+        "big"
+    )
+
+
+class ConsistentHashRing:
+    """
+    Anillo de hashing consistente con nodos virtuales.
+
+    Cada nodo ocupa ``virtual_nodes`` posiciones del anillo, lo que reparte
+    las claves de forma uniforme. Añadir o quitar un nodo solo reasigna las
+    claves de las posiciones afectadas (aproximadamente 1/N del total).
+    """
+
+    def __init__(self, nodes: Optional[Iterable[str]] = None, virtual_nodes: int = 160):
+        """
+        Inicializa el anillo.
+
+        Args:
+            nodes: Nodos iniciales
+            virtual_nodes: Posiciones del anillo por nodo
+        """
+        self.virtual_nodes = virtual_nodes
+        self._positions: List[int] = []
+        self._owners: Dict[int, str] = {}
+        self._nodes: List[str] = []
+
+        for node in nodes or []:
+            self.add_node(node)
+
+    @property
+    def nodes(self) -> List[str]:
+        """Nodos presentes en el anillo."""
+        return list(self._nodes)
+
+    def add_node(self, node: str) -> None:
+        """Añade un nodo al anillo."""
+        if node in self._nodes:
+            return
+
+        self._nodes.append(node)
+        for replica in range(self.virtual_nodes):
+            position = _hash(f"{node}#{replica}")
+            # Las colisiones son improbables; en ese caso conserva el primero
+            if position in self._owners:
+                continue
+            self._owners[position] = node
+            bisect.insort(self._positions, position)
+
+    def remove_node(self, node: str) -> None:
+        """Elimina un nodo del anillo."""
+        if node not in self._nodes:
+            return
+
+        self._nodes.remove(node)
+        self._positions = [p for p in self._positions if self._owners[p] != node]
+        self._owners = {p: self._owners[p] for p in self._positions}
+
+    def get_node(self, key: str) -> str:
+        """Devuelve el nodo responsable de una clave."""
+        if not self._positions:
+            raise ValueError("El anillo no contiene nodos")
+
+        index = bisect.bisect(self._positions, _hash(key))
+        if index == len(self._positions):
+            index = 0
+        return self._owners[self._positions[index]]
@@ -0,0 +1,261 @@
+from pathlib import Path
+import logging
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from .storage import connect
+
+logger = logging.getLogger(__name__)
+
+# Esquema de los archivos del archivo frío. category y month son columnas
+# de partición (directorios category=.../month=YYYY-MM) y no se guardan
+# dentro de cada archivo.
+ARCHIVE_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("importance", pa.float64()),
+    ("timestamp", pa.timestamp("us")),
+    ("last_accessed", pa.timestamp("us")),
+    ("access_count", pa.int64()),
+    ("content", pa.binary()),
+    ("embedding", pa.binary()),
+    ("category", pa.string()),
+    ("month", pa.string())
+])
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("category", pa.string()), ("month", pa.string())]),
+    flavor="hive"
+)
+
+def _parse_datetime(value) -> Optional[datetime]:
+    """Convierte un DATETIME de SQLite a datetime."""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+class MemoryArchiver:
+    """
+    Archivo frío de memorias antiguas en archivos Parquet.
+
+    Mueve en bloque las memorias anteriores a la ventana de retención a
+    archivos Parquet comprimidos, particionados por categoría y mes, y las
+    elimina de la base de datos caliente. Las consultas históricas leen el
+    archivo con filtros que se aplican sobre las particiones y las
+    estadísticas de cada archivo.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        archive_dir: Optional[Path] = None,
+        compression: str = "zstd",
+        batch_size: int = 5000
+    ):
+        """
+        Args:
+            db_path: Ruta de la base de datos de memoria
+            archive_dir: Directorio del archivo frío
+            compression: Códec Parquet (zstd, snappy, gzip...)
+            batch_size: Filas movidas por lote
+        """
+        self.db_path = Path(db_path)
+        self.archive_dir = Path(archive_dir or self.db_path.parent / "archive")
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self.compression = compression
+        self.batch_size = batch_size
+        self._file_format = ds.ParquetFileFormat()
+
+    async def archive_old_memories(self, retention_days: int = 30) -> Dict:
+        """
+        Mueve al archivo frío las memorias anteriores al período de retención.
+
+        Cada lote se escribe primero en Parquet y después se borra de la
+        base de datos junto con sus relaciones. Si el proceso se interrumpe
+        entre ambos pasos, el lote se vuelve a archivar en la siguiente
+        ejecución, por lo que las consultas deben tolerar duplicados por id.
+
+        Args:
+            retention_days: Días que las memorias permanecen en la base de
+                datos caliente
+
+        Returns:
+            Estadísticas de filas y lotes archivados
+        """
+        try:
+            cutoff_date = datetime.now() - timedelta(days=retention_days)
+            loop = asyncio.get_running_loop()
+            start_time = time.perf_counter()
+            stats = {"archived": 0, "batches": 0}
+
+            for table in self._memory_tables():
+                last_rowid = 0
+                while True:
+                    archived, last_rowid = await loop.run_in_executor(
+                        None, self._archive_batch, table, cutoff_date, last_rowid
+                    )
+                    if archived == 0:
+                        break
+                    stats["archived"] += archived
+                    stats["batches"] += 1
+
+            stats["duration"] = time.perf_counter() - start_time
+            logger.info(
+                f"Archivadas {stats['archived']} memorias en {stats['batches']} lotes "
+                f"({stats['duration']:.2f}s)"
+            )
+            return stats
+
+        except Exception as e:
+            logger.error(f"Error archivando memorias: {e}")
+            raise
+
+    def _memory_tables(self) -> List[str]:
+        """Tabla principal y particiones diarias de memorias."""
+        with connect(self.db_path) as conn:
+            return [
+                row[0] for row in conn.execute(
+                    """
+                    SELECT name FROM sqlite_master
+                    WHERE type = 'table' AND (name = 'memories' OR name LIKE 'memories\\_%' ESCAPE '\\')
+                    ORDER BY name
+                    """
+                )
+            ]
+
+    def _archive_batch(self, table: str, cutoff_date: datetime, last_rowid: int):
+        """Archiva un lote de memorias expiradas y lo elimina de la base de datos."""
+        with connect(self.db_path, isolation_level=None) as conn:
+            rows = conn.execute(
+                f"""
+                SELECT rowid, id, category, importance, timestamp, last_accessed,
+                access_count, content, embedding
+                FROM {table}
+                WHERE rowid > ? AND timestamp < ?
+                ORDER BY rowid
+                LIMIT ?
+                """,
+                (last_rowid, cutoff_date, self.batch_size)
+            ).fetchall()
+            if not rows:
+                return 0, last_rowid
+
+            timestamps = [_parse_datetime(r[4]) for r in rows]
+            batch = pa.Table.from_pydict(
+                {
+                    "id": [str(r[1]) for r in rows],
+                    "importance": [r[3] for r in rows],
+                    "timestamp": timestamps,
+                    "last_accessed": [_parse_datetime(r[5]) for r in rows],
+                    "access_count": [r[6] for r in rows],
+                    "content": [r[7] for r in rows],
+                    "embedding": [r[8] for r in rows],
+                    "category": [r[2] or "" for r in rows],
+                    "month": [t.strftime("%Y-%m") if t else "unknown" for t in timestamps]
+                },
+                schema=ARCHIVE_SCHEMA
+            )
+
+            ds.write_dataset(
+                batch,
+                self.archive_dir,
+                format=self._file_format,
+                partitioning=PARTITIONING,
+                basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+                file_options=self._file_format.make_write_options(compression=self.compression)
+            )
+
+            # Borrar del almacenamiento caliente solo tras escribir el lote
+            rowids = [r[0] for r in rows]
+            ids = [r[1] for r in rows]
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for start in range(0, len(rows), 500):
+                    id_chunk = ids[start:start + 500]
+                    placeholders = ",".join("?" * len(id_chunk))
+                    for column in ("source_id", "target_id"):
+                        conn.execute(
+                            f"DELETE FROM memory_relations WHERE {column} IN ({placeholders})",
+                            id_chunk
+                        )
+                    conn.execute(
+                        f"DELETE FROM {table} WHERE rowid IN ({placeholders})",
+                        rowids[start:start + 500]
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            return len(rows), rowids[-1]
+
+    def dataset(self) -> ds.Dataset:
+        """Dataset de pyarrow sobre todo el archivo frío."""
+        return ds.dataset(
+            self.archive_dir,
+            schema=ARCHIVE_SCHEMA,
+            format=self._file_format,
+            partitioning=PARTITIONING
+        )
+
+    async def query(
+        self,
+        category: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        min_importance: Optional[float] = None,
+        columns: Optional[List[str]] = None,
+        limit: Optional[int] = None
+    ) -> pa.Table:
+        """
+        Consulta el archivo frío.
+
+        Los filtros de categoría y fechas descartan directorios de partición
+        completos; el resto se evalúa con las estadísticas de cada archivo
+        Parquet antes de leer sus datos.
+
+        Args:
+            category: Categoría de las memorias
+            start: Inicio (inclusive) del rango de timestamp
+            end: Fin (exclusivo) del rango de timestamp
+            min_importance: Importancia mínima
+            columns: Columnas a leer (todas por defecto)
+            limit: Número máximo de filas
+
+        Returns:
+            Tabla de pyarrow con las memorias encontradas
+        """
+        expression = None
+
+        def _and(condition):
+            nonlocal expression
+            expression = condition if expression is None else expression & condition
+
+        if category is not None:
+            _and(ds.field("category") == category)
+        if start is not None:
+            _and(ds.field("month") >= start.strftime("%Y-%m"))
+            _and(ds.field("timestamp") >= pa.scalar(start, pa.timestamp("us")))
+        if end is not None:
+            _and(ds.field("month") <= end.strftime("%Y-%m"))
+            _and(ds.field("timestamp") < pa.scalar(end, pa.timestamp("us")))
+        if min_importance is not None:
+            _and(ds.field("importance") >= min_importance)
+
+        def _scan() -> pa.Table:
+            dataset = self.dataset()
+            if limit is not None:
+                return dataset.head(limit, columns=columns, filter=expression)
+            return dataset.to_table(columns=columns, filter=expression)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, _scan)
+        except Exception as e:
+            logger.error(f"Error consultando archivo de memorias: {e}")
+            raise
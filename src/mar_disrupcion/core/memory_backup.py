@@ -6,94 +6,680 @@ from datetime import datetime
 import json
 import gzip
 import asyncio
-from typing import Optional, Dict
+import hashlib
+import os
+import struct
+import time
+import zlib
+from typing import BinaryIO, Callable, Optional, Dict
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from .chunk_store import ChunkStore, iter_chunks
+from .exceptions import BackupIntegrityError, MemoryError
+from .storage import connect, quiesce
+from .wal_archiver import CHAIN_FILE, CHAIN_PREFIX, WalArchiver, recovery_plan, replay_segments
 
 logger = logging.getLogger(__name__)
 
+# Cabecera de los backups comprimidos: magic, versión del formato, códec,
+# SHA-256 y tamaño de la base de datos sin comprimir
+BACKUP_MAGIC = b"MDBK"
+BACKUP_FORMAT_VERSION = 1
+HEADER = struct.Struct(">4sBB32sQ")
+
+CODECS = {"gzip": 1, "zstd": 2}
+CODEC_NAMES = {code: name for name, code in CODECS.items()}
+CODEC_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+CHUNK_SIZE = 1 << 20
+
+# Manifiesto de un backup incremental (lista de chunks del almacén)
+MANIFEST_SUFFIX = ".manifest"
+
+# Junto a la base de datos: copia preparada para restaurar y base de datos
+# sustituida por la última restauración
+STAGED_SUFFIX = ".staged"
+PRE_RESTORE_SUFFIX = ".pre-restore"
+
+# Archivos auxiliares de SQLite en modo WAL
+SIDECAR_SUFFIXES = ("-wal", "-shm")
+
+# Cabecera de todo archivo de base de datos SQLite
+SQLITE_HEADER = b"SQLite format 3\x00"
+
+# Errores de los descompresores ante datos dañados
+DECOMPRESSION_ERRORS = (EOFError, zlib.error, gzip.BadGzipFile) + (
+    (zstandard.ZstdError,) if zstandard is not None else ()
+)
+
+def _partial(path: Path) -> Path:
+    """Ruta temporal en la que se escribe un archivo antes de renombrarlo."""
+    return path.with_name(path.name + ".partial")
+
+def _fsync_dir(directory: Path) -> None:
+    """Persiste en el disco las entradas de un directorio."""
+    dir_fd = os.open(str(directory), os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+def _fsync_and_rename(partial_path: Path, path: Path) -> None:
+    """Sincroniza un archivo con el disco y lo renombra de forma atómica."""
+    with open(partial_path, "rb+") as f:
+        os.fsync(f.fileno())
+    os.replace(partial_path, path)
+    _fsync_dir(path.parent)
+
+class _TooManyRestarts(Exception):
+    """Interrumpe un backup por pasos que no deja de reiniciarse."""
+
 class MemoryBackup:
     """Sistema de respaldo para la base de datos de memoria"""
     
-    def __init__(self, db_path: Path, backup_dir: Optional[Path] = None):
+    def __init__(
+        self,
+        db_path: Path,
+        backup_dir: Optional[Path] = None,
+        pages_per_step: int = 1024,
+        step_sleep: float = 0.01,
+        max_restarts: int = 10,
+        compression: str = "zstd",
+        compression_level: Optional[int] = None,
+        compression_threads: int = -1,
+        quiesce_timeout: float = 30.0
+    ):
+        """
+        Args:
+            db_path: Ruta de la base de datos de memoria
+            backup_dir: Directorio de los backups
+            pages_per_step: Páginas copiadas en cada paso del backup
+            step_sleep: Pausa en segundos entre pasos para dejar avanzar a
+                los escritores
+            max_restarts: Reinicios tolerados por escrituras concurrentes
+                antes de terminar la copia en un único paso
+            compression: Códec de compresión (zstd o gzip); sin el módulo
+                zstandard se usa gzip
+            compression_level: Nivel de compresión (por defecto el del códec)
+            compression_threads: Hilos de compresión zstd (-1: uno por CPU)
+            quiesce_timeout: Segundos que una restauración espera a que se
+                cierren las conexiones a la base de datos
+        """
         self.db_path = db_path
         self.backup_dir = backup_dir or db_path.parent / "backups"
         self.backup_dir.mkdir(exist_ok=True)
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self.max_restarts = max_restarts
+        if compression not in CODECS:
+            raise ValueError(f"Códec de compresión desconocido: {compression}")
+        if compression == "zstd" and zstandard is None:
+            logger.warning("Módulo zstandard no disponible; los backups se comprimen con gzip")
+            compression = "gzip"
+        self.compression = compression
+        self.compression_level = compression_level
+        self.compression_threads = compression_threads
+        self.quiesce_timeout = quiesce_timeout
+        self.last_backup_stats: Dict = {}
+        
+        # Chunks de los backups incrementales, compartidos entre manifiestos
+        self.chunk_store = ChunkStore(
+            self.backup_dir / "chunks", codec=compression, level=compression_level or 3
+        )
+        self._chunk_lock = asyncio.Lock()
         
-    async def create_backup(self, compress: bool = True) -> Path:
-        """Crea un backup completo de la base de datos"""
+        # Segmentos del WAL para recuperar la base de datos a un instante
+        self.wal_dir = self.backup_dir / "wal"
+        self._archiver: Optional[WalArchiver] = None
+        
+    async def create_backup(
+        self,
+        compress: bool = True,
+        progress: Optional[Callable[[Dict], None]] = None
+    ) -> Path:
+        """
+        Crea un backup completo de la base de datos.
+        
+        La copia se escribe directamente en el archivo de destino por pasos
+        de ``pages_per_step`` páginas en un hilo del executor. Entre pasos se
+        libera el bloqueo de lectura de la base de datos, de modo que los
+        escritores avanzan durante el backup y la memoria usada no depende
+        del tamaño de la base de datos.
+        
+        Con ``compress`` la copia va a una instantánea temporal sin
+        sincronizar que se comprime por bloques (zstd multihilo o gzip) con
+        un checksum en la cabecera y se elimina. El backup se escribe como
+        ``.partial`` y se renombra tras sincronizarlo con el disco, de modo
+        que un backup con su nombre definitivo siempre está completo.
+        
+        Args:
+            compress: Comprimir el backup
+            progress: Función llamada tras cada paso con las páginas
+                copiadas y totales
+            
+        Returns:
+            Ruta del backup creado
+        """
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
             backup_name = f"memory_backup_{timestamp}.db"
             backup_path = self.backup_dir / backup_name
             
-            # Crear backup
-            with sqlite3.connect(str(self.db_path)) as src_conn:
-                # Backup en memoria primero
-                memory_conn = sqlite3.connect(":memory:")
-                src_conn.backup(memory_conn)
-                
-                # Guardar a archivo
-                with sqlite3.connect(str(backup_path)) as dest_conn:
-                    memory_conn.backup(dest_conn)
-                    
-            # Comprimir si es necesario
+            loop = asyncio.get_running_loop()
             if compress:
-                compressed_path = backup_path.with_suffix(".db.gz")
-                with open(backup_path, "rb") as f_in:
-                    with gzip.open(compressed_path, "wb") as f_out:
-                        shutil.copyfileobj(f_in, f_out)
-                backup_path.unlink()  # Eliminar archivo sin comprimir
+                # Solo el archivo comprimido necesita llegar al disco
+                snapshot_path = self.backup_dir / f"memory_backup_{timestamp}.snapshot"
+                compressed_path = backup_path.with_name(backup_name + CODEC_SUFFIXES[self.compression])
+                try:
+                    self.last_backup_stats = await loop.run_in_executor(
+                        None, self._copy_database, snapshot_path, progress, False
+                    )
+                    self.last_backup_stats.update(await loop.run_in_executor(
+                        None, self._compress_snapshot, snapshot_path, compressed_path
+                    ))
+                finally:
+                    snapshot_path.unlink(missing_ok=True)
                 backup_path = compressed_path
+            else:
+                self.last_backup_stats = await loop.run_in_executor(
+                    None, self._copy_database, backup_path, progress
+                )
                 
-            logger.info(f"Backup creado en: {backup_path}")
+            stats = self.last_backup_stats
+            logger.info(
+                f"Backup creado en: {backup_path} ({stats['pages']} páginas en "
+                f"{stats['duration']:.2f}s, {stats['bytes_per_second'] / 2**20:.1f} MiB/s, "
+                f"{stats['steps']} pasos, {stats['restarts']} reinicios)"
+            )
             return backup_path
             
         except Exception as e:
             logger.error(f"Error creando backup: {e}")
             raise
             
-    async def restore_backup(self, backup_path: Path) -> bool:
-        """Restaura la base de datos desde un backup"""
+    async def create_incremental_backup(
+        self,
+        progress: Optional[Callable[[Dict], None]] = None
+    ) -> Path:
+        """
+        Crea un backup incremental deduplicado.
+        
+        La copia se divide en chunks definidos por su contenido que se
+        guardan en el almacén de chunks solo si no existían; el backup es un
+        manifiesto con la lista de chunks. Las páginas que no cambiaron desde
+        el backup anterior producen los mismos chunks y no se reescriben.
+        
+        La API de backup de SQLite necesita una base de datos de destino,
+        así que la copia pasa por una instantánea temporal; se elimina al
+        terminar, también si la copia o el troceado fallan.
+        
+        Args:
+            progress: Función llamada tras cada paso de la copia
+            
+        Returns:
+            Ruta del manifiesto
+        """
         try:
-            # Descomprimir si es necesario
-            if backup_path.suffix == ".gz":
-                temp_path = backup_path.with_suffix("")
-                with gzip.open(backup_path, "rb") as f_in:
-                    with open(temp_path, "wb") as f_out:
-                        shutil.copyfileobj(f_in, f_out)
-                backup_path = temp_path
-                
-            # Crear backup temporal del actual
-            temp_backup = await self.create_backup()
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            snapshot_path = self.backup_dir / f"memory_backup_{timestamp}.snapshot"
+            manifest_path = self.backup_dir / f"memory_backup_{timestamp}.db{MANIFEST_SUFFIX}"
             
+            loop = asyncio.get_running_loop()
             try:
-                # Restaurar desde backup
-                with sqlite3.connect(str(backup_path)) as src_conn:
-                    with sqlite3.connect(str(self.db_path)) as dest_conn:
+                async with self._chunk_lock:
+                    self.last_backup_stats = await loop.run_in_executor(
+                        None, self._copy_database, snapshot_path, progress, False
+                    )
+                    self.last_backup_stats.update(await loop.run_in_executor(
+                        None, self._write_manifest, snapshot_path, manifest_path
+                    ))
+            finally:
+                snapshot_path.unlink(missing_ok=True)
+                
+            stats = self.last_backup_stats
+            logger.info(
+                f"Backup incremental creado en: {manifest_path} ({stats['chunks']} chunks, "
+                f"{stats['new_chunks']} nuevos, {stats['bytes_written'] / 2**20:.1f} MiB escritos)"
+            )
+            return manifest_path
+            
+        except Exception as e:
+            logger.error(f"Error creando backup incremental: {e}")
+            raise
+            
+    def _write_manifest(self, snapshot_path: Path, manifest_path: Path) -> Dict:
+        """Trocea la copia, guarda los chunks nuevos y escribe el manifiesto."""
+        start_time = time.perf_counter()
+        digest = hashlib.sha256()
+        chunks = []
+        stats = {"chunks": 0, "new_chunks": 0, "bytes_written": 0}
+        
+        with open(snapshot_path, "rb") as src:
+            for chunk in iter_chunks(src):
+                digest.update(chunk)
+                chunk_digest, written = self.chunk_store.put(chunk)
+                chunks.append([chunk_digest, len(chunk)])
+                stats["chunks"] += 1
+                stats["new_chunks"] += written > 0
+                stats["bytes_written"] += written
+        # La instantánea ya no hace falta: libera el disco antes de sincronizar
+        snapshot_path.unlink()
+        self.chunk_store.sync()
+        
+        manifest = {
+            "format": BACKUP_FORMAT_VERSION,
+            "created": datetime.now().isoformat(),
+            "codec": self.chunk_store.codec,
+            "size": sum(length for _, length in chunks),
+            "sha256": digest.hexdigest(),
+            "chunks": chunks
+        }
+        partial_path = _partial(manifest_path)
+        try:
+            partial_path.write_text(json.dumps(manifest))
+            _fsync_and_rename(partial_path, manifest_path)
+        finally:
+            partial_path.unlink(missing_ok=True)
+        
+        stats["size"] = manifest["size"]
+        stats["dedup_ratio"] = stats["size"] / stats["bytes_written"] if stats["bytes_written"] else float("inf")
+        stats["chunking_seconds"] = time.perf_counter() - start_time
+        return stats
+        
+    def _reassemble(self, manifest_path: Path, temp_path: Path) -> Path:
+        """
+        Reconstruye en ``temp_path`` la base de datos de un backup incremental.
+        
+        Raises:
+            BackupIntegrityError: Si falta un chunk o algún checksum no coincide
+        """
+        digest = hashlib.sha256()
+        
+        try:
+            manifest = json.loads(manifest_path.read_text())
+            with open(temp_path, "wb") as out:
+                for chunk_digest, length in manifest["chunks"]:
+                    chunk = self.chunk_store.get(chunk_digest, manifest["codec"])
+                    if len(chunk) != length:
+                        raise BackupIntegrityError(f"Tamaño del chunk no coincide: {chunk_digest}")
+                    digest.update(chunk)
+                    out.write(chunk)
+                    
+            if digest.hexdigest() != manifest["sha256"]:
+                raise BackupIntegrityError(f"Checksum del backup no coincide: {manifest_path}")
+            return temp_path
+            
+        except (OSError, ValueError, KeyError) + DECOMPRESSION_ERRORS as e:
+            temp_path.unlink(missing_ok=True)
+            raise BackupIntegrityError(f"Backup incremental dañado {manifest_path}: {e}") from e
+        except Exception:
+            temp_path.unlink(missing_ok=True)
+            raise
+            
+    def _copy_database(
+        self,
+        backup_path: Path,
+        progress: Optional[Callable[[Dict], None]] = None,
+        durable: bool = True
+    ) -> Dict:
+        """
+        Copia la base de datos al archivo de backup por pasos.
+        
+        Con ``durable`` la copia se escribe en ``.partial`` y se renombra
+        tras sincronizarla con el disco; sin él se escribe directamente y
+        sin sincronizar, para instantáneas temporales que se eliminan.
+        """
+        start_time = time.perf_counter()
+        state = {"steps": 0, "restarts": 0, "remaining": None, "total": 0}
+        
+        def _on_step(status: int, remaining: int, total: int):
+            # Una escritura de otra conexión reinicia la copia desde el
+            # principio y hace crecer las páginas restantes
+            if state["remaining"] is not None and remaining > state["remaining"]:
+                state["restarts"] += 1
+                if state["restarts"] > self.max_restarts:
+                    raise _TooManyRestarts()
+            state.update(steps=state["steps"] + 1, remaining=remaining, total=total)
+            
+            if progress:
+                progress({
+                    "pages_copied": total - remaining,
+                    "total_pages": total,
+                    "percent": 100.0 * (total - remaining) / total if total else 100.0
+                })
+            if remaining and self.step_sleep:
+                time.sleep(self.step_sleep)
+        
+        partial_path = _partial(backup_path) if durable else backup_path
+        try:
+            with connect(self.db_path) as src_conn:
+                page_size = src_conn.execute("PRAGMA page_size").fetchone()[0]
+                dest_conn = sqlite3.connect(str(partial_path))
+                try:
+                    try:
+                        src_conn.backup(dest_conn, pages=self.pages_per_step, progress=_on_step)
+                    except _TooManyRestarts:
+                        # Con WAL la copia en un paso lee una instantánea y
+                        # tampoco bloquea a los escritores
+                        logger.warning(
+                            f"Backup reiniciado {state['restarts']} veces por escrituras "
+                            "concurrentes; se completa en un único paso"
+                        )
                         src_conn.backup(dest_conn)
+                        state["total"] = dest_conn.execute("PRAGMA page_count").fetchone()[0]
+                finally:
+                    dest_conn.close()
+            if durable:
+                _fsync_and_rename(partial_path, backup_path)
+        except BaseException:
+            partial_path.unlink(missing_ok=True)
+            raise
+        
+        duration = time.perf_counter() - start_time
+        pages = state["total"]
+        return {
+            "pages": pages,
+            "bytes": pages * page_size,
+            "steps": state["steps"],
+            "restarts": state["restarts"],
+            "duration": duration,
+            "pages_per_second": pages / duration if duration else 0.0,
+            "bytes_per_second": pages * page_size / duration if duration else 0.0
+        }
+            
+    def _compress_snapshot(self, snapshot_path: Path, backup_path: Path) -> Dict:
+        """
+        Comprime la copia por bloques en un archivo ``.partial``.
+        
+        La cabecera guarda el códec, el SHA-256 y el tamaño de la base de
+        datos sin comprimir; se reescribe al terminar, antes de sincronizar
+        el archivo con el disco y renombrarlo a su nombre definitivo.
+        """
+        start_time = time.perf_counter()
+        partial_path = _partial(backup_path)
+        digest = hashlib.sha256()
+        size = 0
+        
+        try:
+            with open(partial_path, "wb") as raw:
+                raw.write(HEADER.pack(BACKUP_MAGIC, BACKUP_FORMAT_VERSION, CODECS[self.compression], bytes(32), 0))
+                with self._compressor(raw) as out, open(snapshot_path, "rb") as src:
+                    for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                        digest.update(chunk)
+                        size += len(chunk)
+                        out.write(chunk)
+                raw.seek(0)
+                raw.write(HEADER.pack(
+                    BACKUP_MAGIC, BACKUP_FORMAT_VERSION, CODECS[self.compression], digest.digest(), size
+                ))
+            _fsync_and_rename(partial_path, backup_path)
+        finally:
+            partial_path.unlink(missing_ok=True)
+        
+        compressed = backup_path.stat().st_size
+        return {
+            "codec": self.compression,
+            "compressed_bytes": compressed,
+            "compression_ratio": size / compressed if compressed else 0.0,
+            "compression_seconds": time.perf_counter() - start_time,
+            "sha256": digest.hexdigest()
+        }
+        
+    def _compressor(self, raw: BinaryIO) -> BinaryIO:
+        """Flujo de compresión sobre un archivo abierto que no cierra."""
+        if self.compression == "zstd":
+            compressor = zstandard.ZstdCompressor(
+                level=self.compression_level or 3,
+                threads=self.compression_threads
+            )
+            return compressor.stream_writer(raw, closefd=False)
+        return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=self.compression_level or 6)
+        
+    def _decompress(self, backup_path: Path, temp_path: Path) -> Path:
+        """
+        Descomprime un backup en ``temp_path`` verificando su checksum.
+        
+        Los backups ``.gz`` anteriores, sin cabecera, se descomprimen sin
+        verificación.
+        
+        Raises:
+            BackupIntegrityError: Si el tamaño o el checksum no coinciden
+        """
+        digest = hashlib.sha256()
+        size = 0
+        
+        try:
+            with open(backup_path, "rb") as raw, open(temp_path, "wb") as out:
+                header = raw.read(HEADER.size)
+                if header[:len(BACKUP_MAGIC)] != BACKUP_MAGIC:
+                    raw.seek(0)
+                    with gzip.GzipFile(fileobj=raw, mode="rb") as src:
+                        shutil.copyfileobj(src, out, CHUNK_SIZE)
+                    return temp_path
+                
+                _, version, codec, expected_digest, expected_size = HEADER.unpack(header)
+                if version != BACKUP_FORMAT_VERSION or codec not in CODEC_NAMES:
+                    raise BackupIntegrityError(f"Formato de backup desconocido: {backup_path}")
+                
+                if CODEC_NAMES[codec] == "zstd":
+                    if zstandard is None:
+                        raise BackupIntegrityError("El backup usa zstd y el módulo zstandard no está instalado")
+                    src = zstandard.ZstdDecompressor().stream_reader(raw, closefd=False)
+                else:
+                    src = gzip.GzipFile(fileobj=raw, mode="rb")
+                with src:
+                    for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                        digest.update(chunk)
+                        size += len(chunk)
+                        out.write(chunk)
                         
-                logger.info(f"Base de datos restaurada desde: {backup_path}")
+            if size != expected_size or digest.digest() != expected_digest:
+                raise BackupIntegrityError(f"Checksum del backup no coincide: {backup_path}")
+            return temp_path
+            
+        except DECOMPRESSION_ERRORS as e:
+            temp_path.unlink(missing_ok=True)
+            raise BackupIntegrityError(f"Backup dañado {backup_path}: {e}") from e
+        except Exception:
+            temp_path.unlink(missing_ok=True)
+            raise
+            
+    def _check_database(self, path: Path) -> None:
+        """Comprueba la integridad de una base de datos antes de restaurarla."""
+        conn = sqlite3.connect(str(path))
+        try:
+            result = conn.execute("PRAGMA quick_check").fetchone()[0]
+        except sqlite3.DatabaseError as e:
+            raise BackupIntegrityError(f"Backup no válido {path}: {e}") from e
+        finally:
+            conn.close()
+        if result != "ok":
+            raise BackupIntegrityError(f"Backup corrupto {path}: {result}")
+            
+    def _check_header(self, path: Path) -> None:
+        """Comprueba que un archivo empieza con la cabecera de SQLite."""
+        with open(path, "rb") as f:
+            header = f.read(len(SQLITE_HEADER))
+        if header != SQLITE_HEADER:
+            raise BackupIntegrityError(f"{path} no es una base de datos SQLite")
+            
+    async def restore_backup(self, backup_path: Path) -> bool:
+        """
+        Restaura la base de datos desde un backup.
+        
+        El backup se descomprime y se verifica (checksum e integridad) en una
+        copia preparada junto a la base de datos, que sustituye a la actual
+        con un renombrado atómico (ver ``_swap_database``).
+        
+        Raises:
+            BackupIntegrityError: Si el backup no supera la verificación
+        """
+        staged_path = self._staged_path()
+        try:
+            loop = asyncio.get_running_loop()
+            
+            # Descomprimir y verificar
+            if backup_path.suffix == MANIFEST_SUFFIX:
+                await loop.run_in_executor(None, self._reassemble, backup_path, staged_path)
+            elif backup_path.suffix in CODEC_SUFFIXES.values():
+                await loop.run_in_executor(None, self._decompress, backup_path, staged_path)
+            else:
+                await loop.run_in_executor(None, shutil.copyfile, backup_path, staged_path)
+            await loop.run_in_executor(None, self._check_database, staged_path)
+            
+            return await self._restore_file(staged_path, str(backup_path))
                 
-                # Limpiar archivo temporal si era comprimido
-                if backup_path != temp_path:
-                    temp_path.unlink()
-                    
-                return True
+        except Exception as e:
+            logger.error(f"Error en proceso de restauración: {e}")
+            raise
+            
+        finally:
+            staged_path.unlink(missing_ok=True)
+                
+    async def restore_to(self, timestamp: datetime) -> bool:
+        """
+        Restaura la base de datos al estado que tenía en ``timestamp``.
+        
+        Reconstruye el backup base de la cadena de WAL archivado más reciente
+        anterior a ``timestamp`` y le aplica los segmentos capturados hasta
+        ese instante. La precisión es el intervalo del archivador.
+        
+        Raises:
+            ValueError: Si no hay ningún backup base anterior a ``timestamp``
+            BackupIntegrityError: Si el resultado no supera la verificación
+        """
+        loop = asyncio.get_running_loop()
+        base, segments, page_size = recovery_plan(self.wal_dir, self.backup_dir, timestamp)
+        
+        staged_path = self._staged_path()
+        try:
+            await loop.run_in_executor(None, self._reassemble, base, staged_path)
+            transactions = await loop.run_in_executor(
+                None, replay_segments, staged_path, segments, page_size
+            )
+            await loop.run_in_executor(None, self._check_database, staged_path)
+            logger.info(
+                f"Aplicadas {transactions} transacciones de {len(segments)} segmentos de WAL "
+                f"sobre {base.name}"
+            )
+            return await self._restore_file(staged_path, f"{base.name} a {timestamp.isoformat()}")
+        finally:
+            staged_path.unlink(missing_ok=True)
+            
+    def _staged_path(self) -> Path:
+        """Copia preparada para restaurar, en el directorio de la base de datos."""
+        return self.db_path.with_name(self.db_path.name + STAGED_SUFFIX)
+            
+    async def _restore_file(self, staged_path: Path, description: str) -> bool:
+        """Sustituye la base de datos por una copia ya verificada."""
+        loop = asyncio.get_running_loop()
+        archiver = self._archiver
+        if archiver is None:
+            return await loop.run_in_executor(None, self._swap_database, staged_path, description)
+        
+        # La lectura que fija el WAL entre ciclos impediría el checkpoint
+        async with archiver.paused():
+            return await loop.run_in_executor(None, self._swap_database, staged_path, description)
+            
+    def _swap_database(self, staged_path: Path, description: str) -> bool:
+        """
+        Sustituye la base de datos por ``staged_path`` con dos renombrados.
+        
+        Con las conexiones detenidas, un checkpoint ``TRUNCATE`` deja todo el
+        contenido en el archivo principal; la base de datos actual se
+        renombra a ``.pre-restore`` y la copia preparada ocupa su lugar. La
+        copia ya superó ``quick_check`` fuera de la ventana; tras el
+        renombrado solo se comprueba su cabecera, y si falla, deshacer es
+        volver a renombrar la anterior. ``.pre-restore`` se conserva hasta
+        la siguiente restauración.
+        
+        Raises:
+            MemoryError: Si otra conexión impide el checkpoint
+            TimeoutError: Si las conexiones no se cierran a tiempo
+        """
+        previous_path = self.db_path.with_name(self.db_path.name + PRE_RESTORE_SUFFIX)
+        
+        with quiesce(self.db_path, self.quiesce_timeout):
+            had_previous = self.db_path.exists()
+            if had_previous:
+                conn = sqlite3.connect(str(self.db_path))
+                try:
+                    busy, _, _ = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+                finally:
+                    conn.close()
+                if busy:
+                    raise MemoryError(f"La base de datos sigue en uso, no se puede restaurar: {self.db_path}")
+                self._remove_sidecars()
+                os.replace(self.db_path, previous_path)
                 
+            try:
+                os.replace(staged_path, self.db_path)
+                _fsync_dir(self.db_path.parent)
+                self._check_header(self.db_path)
             except Exception as e:
-                # Restaurar backup temporal en caso de error
+                # Revertir con un segundo renombrado
                 logger.error(f"Error restaurando, revirtiendo cambios: {e}")
-                await self.restore_backup(temp_backup)
+                self._remove_sidecars()
+                if had_previous:
+                    os.replace(previous_path, self.db_path)
+                    _fsync_dir(self.db_path.parent)
                 return False
                 
-        except Exception as e:
-            logger.error(f"Error en proceso de restauración: {e}")
-            raise
+        logger.info(
+            f"Base de datos restaurada desde: {description}"
+            + (f" (anterior en {previous_path})" if had_previous else "")
+        )
+        return True
+        
+    def _remove_sidecars(self) -> None:
+        """Elimina los archivos -wal y -shm de la base de datos, ya sin conexiones."""
+        for suffix in SIDECAR_SUFFIXES:
+            Path(f"{self.db_path}{suffix}").unlink(missing_ok=True)
+            
+    async def archive_wal(
+        self,
+        interval_seconds: float = 1.0,
+        segment_bytes: int = 4 * 1024 * 1024,
+        base_interval_seconds: float = 24 * 3600
+    ):
+        """
+        Archiva el WAL de forma continua para ``restore_to``.
+        
+        Args:
+            interval_seconds: Segundos entre ciclos de archivado
+            segment_bytes: Tamaño del WAL a partir del cual se vacía
+            base_interval_seconds: Segundos entre backups base
+        """
+        self._archiver = WalArchiver(
+            self,
+            interval_seconds=interval_seconds,
+            segment_bytes=segment_bytes,
+            base_interval_seconds=base_interval_seconds
+        )
+        try:
+            await self._archiver.run()
+        finally:
+            self._archiver = None
             
-    async def schedule_backups(self, interval_hours: int = 24):
-        """Programa backups automáticos periódicos"""
+    async def schedule_backups(self, interval_hours: int = 24, incremental: bool = True):
+        """
+        Programa backups automáticos periódicos.
+        
+        Args:
+            interval_hours: Horas entre backups
+            incremental: Crear backups incrementales deduplicados en lugar
+                de copias completas
+        """
         while True:
             try:
-                await self.create_backup()
+                if incremental:
+                    await self.create_incremental_backup()
+                else:
+                    await self.create_backup()
                 # Limpiar backups antiguos (mantener últimos 7)
                 await self._cleanup_old_backups(keep=7)
                 await asyncio.sleep(interval_hours * 3600)
@@ -102,19 +688,73 @@ class MemoryBackup:
                 await asyncio.sleep(3600)  # Esperar 1 hora y reintentar
                 
     async def _cleanup_old_backups(self, keep: int = 7):
-        """Limpia backups antiguos manteniendo solo los más recientes"""
+        """
+        Limpia backups antiguos manteniendo solo los más recientes.
+        
+        Después elimina del almacén los chunks que ya no referencia ningún
+        manifiesto.
+        """
         try:
-            backups = sorted(
-                self.backup_dir.glob("memory_backup_*.db*"),
-                key=lambda x: x.stat().st_mtime,
-                reverse=True
-            )
-            
-            # Mantener solo los más recientes
-            for backup in backups[keep:]:
-                backup.unlink()
-                logger.info(f"Backup antiguo eliminado: {backup}")
+            async with self._chunk_lock:
+                # Los .partial son backups en curso
+                backups = sorted(
+                    (
+                        path for path in self.backup_dir.glob("memory_backup_*.db*")
+                        if not path.name.endswith(".partial")
+                    ),
+                    key=lambda x: x.stat().st_mtime,
+                    reverse=True
+                )
+                
+                # Mantener solo los más recientes y la base de la última
+                # cadena de WAL
+                protected = self._latest_chain_base()
+                for backup in backups[keep:]:
+                    if backup.name == protected:
+                        continue
+                    backup.unlink()
+                    logger.info(f"Backup antiguo eliminado: {backup}")
+                    
+                # Cadenas de WAL cuyo backup base ya no existe
+                for chain_dir in self.wal_dir.glob(CHAIN_PREFIX + "*"):
+                    chain_file = chain_dir / CHAIN_FILE
+                    if not chain_file.exists():
+                        continue
+                    base = json.loads(chain_file.read_text()).get("base")
+                    if base is not None and not (self.backup_dir / base).exists():
+                        shutil.rmtree(chain_dir)
+                        logger.info(f"Cadena de WAL eliminada: {chain_dir}")
+                    
+                gc_stats = await asyncio.get_running_loop().run_in_executor(
+                    None, self._collect_chunks
+                )
+                if gc_stats["chunks_deleted"]:
+                    logger.info(
+                        f"Eliminados {gc_stats['chunks_deleted']} chunks sin referencias "
+                        f"({gc_stats['bytes_deleted'] / 2**20:.1f} MiB)"
+                    )
                 
         except Exception as e:
             logger.error(f"Error limpiando backups antiguos: {e}")
             raise
+            
+    def _latest_chain_base(self) -> Optional[str]:
+        """Nombre del backup base de la cadena de WAL más reciente."""
+        for chain_dir in sorted(self.wal_dir.glob(CHAIN_PREFIX + "*"), reverse=True):
+            chain_file = chain_dir / CHAIN_FILE
+            if chain_file.exists():
+                base = json.loads(chain_file.read_text()).get("base")
+                if base is not None:
+                    return base
+        return None
+        
+    def _collect_chunks(self) -> Dict:
+        """Elimina los chunks que no referencia ningún manifiesto."""
+        referenced = set()
+        for manifest_path in self.backup_dir.glob(f"memory_backup_*.db{MANIFEST_SUFFIX}"):
+            manifest = json.loads(manifest_path.read_text())
+            referenced.update(
+                self.chunk_store.path(chunk_digest, manifest["codec"])
+                for chunk_digest, _ in manifest["chunks"]
+            )
+        return self.chunk_store.collect_garbage(referenced)
@@ -0,0 +1,289 @@
+"""
+Migración en línea de ids TEXT a claves INTEGER PRIMARY KEY.
+
+Las tablas creadas por versiones anteriores usan como clave primaria un id
+TEXT de 20 caracteres derivado de ``strftime("%Y%m%d%H%M%S%f")``. La
+migración copia cada tabla por lotes a una tabla sombra con clave entera
+mientras el sistema sigue escribiendo en la original; unos triggers
+replican en la sombra las actualizaciones y borrados de filas ya copiadas.
+Al final, en una única transacción corta, se copian las filas restantes y
+se intercambian las tablas.
+
+A cada id antiguo se le asigna un id snowflake con la fecha que codifica y
+el nodo reservado para migraciones, y la correspondencia se guarda en
+``memory_legacy_ids``. Los ids escritos como texto por versiones que ya
+generaban ids snowflake se convierten directamente a entero.
+"""
+import sqlite3
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from .memory_schema import apply_schema, create_memory_table, RELATIONS_TABLE
+from .migrations import Migration, MigrationRunner
+from .snowflake import MIGRATION_NODE_ID, SnowflakeIdGenerator
+
+logger = logging.getLogger(__name__)
+
+# Longitud de los ids TEXT anteriores (%Y%m%d%H%M%S%f)
+LEGACY_ID_LENGTH = 20
+LEGACY_ID_FORMAT = "%Y%m%d%H%M%S%f"
+
+SHADOW_PREFIX = "migrating_"
+
+MEMORY_FIELDS = (
+    "category", "content", "importance", "timestamp",
+    "last_accessed", "access_count", "embedding"
+)
+
+
+def is_legacy_id(memory_id: Union[int, str]) -> bool:
+    """Indica si un id tiene el formato TEXT anterior."""
+    return isinstance(memory_id, str) and len(memory_id) == LEGACY_ID_LENGTH
+
+
+def _mapped_id(column: str) -> str:
+    """Expresión SQL que traduce un id TEXT a su id entero."""
+    return (
+        f"CASE WHEN length({column}) = {LEGACY_ID_LENGTH} "
+        f"THEN (SELECT id FROM memory_legacy_ids WHERE legacy_id = {column}) "
+        f"ELSE CAST({column} AS INTEGER) END"
+    )
+
+
+def _column_type(conn: sqlite3.Connection, table: str, column: str) -> Optional[str]:
+    """Tipo declarado de una columna."""
+    for row in conn.execute(f"PRAGMA table_info({table})"):
+        if row[1] == column:
+            return row[2].upper()
+    return None
+
+
+def legacy_memory_tables(conn: sqlite3.Connection) -> List[str]:
+    """Tablas de memorias (principal y particiones) con ids TEXT."""
+    tables = [
+        row[0] for row in conn.execute(
+            """
+            SELECT name FROM sqlite_master
+            WHERE type = 'table' AND (name = 'memories' OR name LIKE 'memories\\_%' ESCAPE '\\')
+            ORDER BY name
+            """
+        )
+    ]
+    return [table for table in tables if _column_type(conn, table, "id") == "TEXT"]
+
+
+def needs_integer_id_migration(conn: sqlite3.Connection) -> bool:
+    """Indica si la base de datos conserva tablas con ids TEXT."""
+    return bool(legacy_memory_tables(conn)) or _column_type(conn, "memory_relations", "source_id") == "TEXT"
+
+
+class IntegerIdMigration(Migration):
+    """
+    Migración de ids TEXT a INTEGER PRIMARY KEY mediante tablas sombra.
+
+    La posición guarda la lista de tablas, la tabla actual y el último rowid
+    copiado de cada tabla. Las relaciones se copian al final, cuando todas
+    las memorias con id antiguo ya tienen su id entero.
+    """
+
+    version = 1
+    name = "integer_ids"
+    copies_tables = True
+
+    def __init__(self):
+        self.generator = SnowflakeIdGenerator(MIGRATION_NODE_ID)
+
+    def is_needed(self, conn: sqlite3.Connection) -> bool:
+        return needs_integer_id_migration(conn)
+
+    def tables(self, conn: sqlite3.Connection) -> List[str]:
+        tables = legacy_memory_tables(conn)
+        if _column_type(conn, "memory_relations", "source_id") == "TEXT":
+            tables.append("memory_relations")
+        return tables
+
+    def prepare(self, conn: sqlite3.Connection, position: Optional[Dict]) -> Dict:
+        """Crea las tablas sombra y los triggers que las mantienen al día."""
+        if position is None:
+            tables = self.tables(conn)
+            position = {"tables": tables, "index": 0, "cursors": {table: 0 for table in tables}}
+
+        apply_schema(conn)
+        for table in position["tables"]:
+            self._create_shadow(conn, table)
+
+        last_id = conn.execute("SELECT MAX(id) FROM memory_legacy_ids").fetchone()[0]
+        if last_id is not None:
+            self.generator.resume_from(last_id)
+        return position
+
+    def _create_shadow(self, conn: sqlite3.Connection, table: str) -> None:
+        """Crea la tabla sombra de una tabla y los triggers que la mantienen."""
+        shadow = SHADOW_PREFIX + table
+
+        if table == "memory_relations":
+            conn.execute(RELATIONS_TABLE.replace("memory_relations", shadow, 1))
+            key = (
+                f"source_id = {_mapped_id('OLD.source_id')} "
+                f"AND target_id = {_mapped_id('OLD.target_id')}"
+            )
+            assignments = "relation_type = NEW.relation_type, strength = NEW.strength"
+        else:
+            # Sin índices secundarios: se crean con su nombre definitivo
+            # tras el intercambio
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {shadow} (
+                    id INTEGER PRIMARY KEY,
+                    category TEXT,
+                    content BLOB,
+                    importance REAL,
+                    timestamp DATETIME,
+                    last_accessed DATETIME,
+                    access_count INTEGER,
+                    embedding BLOB
+                )
+            """)
+            key = f"id = {_mapped_id('OLD.id')}"
+            assignments = ", ".join(f"{field} = NEW.{field}" for field in MEMORY_FIELDS)
+
+        # Las filas aún no copiadas no existen en la sombra y los triggers no
+        # las afectan; se copiarán con su estado más reciente
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {shadow}_update AFTER UPDATE ON {table}
+            BEGIN
+                UPDATE {shadow} SET {assignments} WHERE {key};
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {shadow}_delete AFTER DELETE ON {table}
+            BEGIN
+                DELETE FROM {shadow} WHERE {key};
+            END
+        """)
+
+    def step(self, conn: sqlite3.Connection, position: Dict, batch_size: int) -> Tuple[int, Dict]:
+        """Copia el siguiente lote de la tabla actual a su sombra."""
+        index = position["index"]
+        while index < len(position["tables"]):
+            copied, position = self._copy_table(conn, position["tables"][index], position, batch_size)
+            if copied:
+                return copied, {**position, "index": index}
+            index += 1
+
+        return 0, {**position, "index": index}
+
+    def _copy_table(self, conn: sqlite3.Connection, table: str, position: Dict, batch_size: int):
+        """Copia un lote de una tabla desde su cursor."""
+        last_rowid = position["cursors"][table]
+        if table == "memory_relations":
+            copied, max_rowid = self._copy_relations(conn, last_rowid, batch_size)
+        else:
+            copied, max_rowid = self._copy_memories(conn, table, last_rowid, batch_size)
+        return copied, {**position, "cursors": {**position["cursors"], table: max_rowid}}
+
+    def _copy_memories(self, conn: sqlite3.Connection, table: str, last_rowid: int, batch_size: int):
+        """Copia un lote de memorias asignando ids enteros."""
+        rows = conn.execute(
+            f"""
+            SELECT rowid, id, {", ".join(MEMORY_FIELDS)} FROM {table}
+            WHERE rowid > ?
+            ORDER BY rowid
+            LIMIT ?
+            """,
+            (last_rowid, batch_size)
+        ).fetchall()
+        if not rows:
+            return 0, last_rowid
+
+        placeholders = ", ".join("?" * (len(MEMORY_FIELDS) + 1))
+        conn.executemany(
+            f"""
+            INSERT OR REPLACE INTO {SHADOW_PREFIX}{table} (id, {", ".join(MEMORY_FIELDS)})
+            VALUES ({placeholders})
+            """,
+            [(self._integer_id(conn, row[1]), *row[2:]) for row in rows]
+        )
+        return len(rows), rows[-1][0]
+
+    def _integer_id(self, conn: sqlite3.Connection, memory_id: Union[int, str]) -> int:
+        """Id entero de una memoria, asignándolo si tiene formato antiguo."""
+        if not is_legacy_id(memory_id):
+            return int(memory_id)
+
+        existing = conn.execute(
+            "SELECT id FROM memory_legacy_ids WHERE legacy_id = ?",
+            (memory_id,)
+        ).fetchone()
+        if existing:
+            return existing[0]
+
+        created = datetime.strptime(memory_id, LEGACY_ID_FORMAT)
+        new_id = self.generator.next_id_at(int(created.timestamp() * 1000))
+        conn.execute(
+            "INSERT INTO memory_legacy_ids (legacy_id, id) VALUES (?, ?)",
+            (memory_id, new_id)
+        )
+        return new_id
+
+    def _copy_relations(self, conn: sqlite3.Connection, last_rowid: int, batch_size: int):
+        """Copia un lote de relaciones traduciendo sus ids."""
+        bounds = conn.execute(
+            """
+            SELECT COUNT(*), MAX(rowid) FROM (
+                SELECT rowid FROM memory_relations
+                WHERE rowid > ?
+                ORDER BY rowid
+                LIMIT ?
+            )
+            """,
+            (last_rowid, batch_size)
+        ).fetchone()
+        if not bounds[0]:
+            return 0, last_rowid
+
+        # Las relaciones con memorias que ya no existen se descartan
+        conn.execute(
+            f"""
+            INSERT OR REPLACE INTO {SHADOW_PREFIX}memory_relations
+            (source_id, target_id, relation_type, strength)
+            SELECT source_id, target_id, relation_type, strength FROM (
+                SELECT {_mapped_id("source_id")} AS source_id,
+                {_mapped_id("target_id")} AS target_id,
+                relation_type, strength
+                FROM memory_relations
+                WHERE rowid > ? AND rowid <= ?
+            )
+            WHERE source_id IS NOT NULL AND target_id IS NOT NULL
+            """,
+            (last_rowid, bounds[1])
+        )
+        return bounds[0], bounds[1]
+
+    def finalize(self, conn: sqlite3.Connection, position: Dict, batch_size: int) -> None:
+        """Copia las filas escritas desde el último lote e intercambia las tablas."""
+        for table in position["tables"]:
+            copied = True
+            while copied:
+                copied, position = self._copy_table(conn, table, position, batch_size)
+
+        for table in position["tables"]:
+            shadow = SHADOW_PREFIX + table
+            conn.execute(f"DROP TRIGGER IF EXISTS {shadow}_update")
+            conn.execute(f"DROP TRIGGER IF EXISTS {shadow}_delete")
+            conn.execute(f"DROP TABLE {table}")
+            conn.execute(f"ALTER TABLE {shadow} RENAME TO {table}")
+            if table != "memory_relations":
+                create_memory_table(conn, table)
+
+        apply_schema(conn)
+
+
+# Migraciones de la base de datos de memoria, en orden de versión
+MEMORY_MIGRATIONS = [IntegerIdMigration]
+
+
+def memory_migration_runner(db_path: Path, **kwargs) -> MigrationRunner:
+    """Runner con todas las migraciones de la base de datos de memoria."""
+    return MigrationRunner(db_path, [migration() for migration in MEMORY_MIGRATIONS], **kwargs)
@@ -1,50 +1,41 @@
-import sqlite3
 from pathlib import Path
 import logging
-from typing import Dict, List, Optional
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional
 from datetime import datetime, timedelta
 
+from .memory_schema import HOT_QUERIES, apply_schema
+from .storage import connect
+
 logger = logging.getLogger(__name__)
 
+# Valores de PRAGMA auto_vacuum
+AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+
 class MemoryOptimizer:
     """Optimizador del sistema de memoria y base de datos"""
     
-    def __init__(self, db_path: Path):
+    def __init__(self, db_path: Path, fragmentation_threshold: float = 0.3):
+        """
+        Args:
+            db_path: Ruta de la base de datos de memoria
+            fragmentation_threshold: Fracción de páginas libres a partir de
+                la cual el mantenimiento programado ejecuta un VACUUM completo
+        """
         self.db_path = db_path
+        self.fragmentation_threshold = fragmentation_threshold
         self._create_indexes()
         
     def _create_indexes(self):
-        """Crea índices adicionales para optimizar consultas"""
-        with sqlite3.connect(str(self.db_path)) as conn:
-            # Índice compuesto para búsquedas por categoría y timestamp
-            conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_cat_time 
-                ON memories(category, timestamp)
-            """)
-            
-            # Índice compuesto para búsquedas por importancia y timestamp
-            conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_imp_time
-                ON memories(importance, timestamp) 
-            """)
-            
-            # Índice para búsquedas por last_accessed
-            conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_last_accessed
-                ON memories(last_accessed)
-            """)
-            
-            # Índice para relaciones
-            conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_relations
-                ON memory_relations(source_id, target_id, strength)
-            """)
-            
+        """Crea los índices del esquema de memoria y elimina los redundantes"""
+        with connect(self.db_path) as conn:
+            apply_schema(conn)
             logger.info("Índices de optimización creados")
             
     async def optimize_queries(self):
         """Optimiza la base de datos y recolecta estadísticas"""
-        with sqlite3.connect(str(self.db_path)) as conn:
+        with connect(self.db_path) as conn:
             # Analizar tablas
             conn.execute("ANALYZE memories")
             conn.execute("ANALYZE memory_relations")
@@ -56,38 +47,293 @@ class MemoryOptimizer:
             logger.info(f"Estadísticas de la base de datos actualizadas: {len(stats)} tablas analizadas")
             
     async def vacuum_database(self):
-        """Limpia y optimiza el espacio de la base de datos"""
-        with sqlite3.connect(str(self.db_path)) as conn:
+        """
+        Limpia y compacta la base de datos con un VACUUM completo.
+        
+        Reescribe todo el archivo con un lock exclusivo; fuera de ventanas de
+        mantenimiento es preferible ``schedule_maintenance``. Aprovecha la
+        reescritura para activar ``auto_vacuum=INCREMENTAL``.
+        """
+        with connect(self.db_path) as conn:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
             conn.execute("VACUUM")
             logger.info("Base de datos optimizada y compactada")
+    
+    def get_storage_stats(self) -> Dict:
+        """
+        Devuelve estadísticas de páginas libres y fragmentación.
+        
+        La fragmentación se mide como la fracción de páginas del archivo que
+        están en la lista de páginas libres.
+        """
+        with connect(self.db_path) as conn:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            freelist_count = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            
+        return {
+            "page_size": page_size,
+            "page_count": page_count,
+            "freelist_count": freelist_count,
+            "free_bytes": freelist_count * page_size,
+            "file_bytes": page_count * page_size,
+            "fragmentation": freelist_count / page_count if page_count else 0.0,
+            "auto_vacuum": AUTO_VACUUM_MODES.get(auto_vacuum, str(auto_vacuum))
+        }
+    
+    def run_maintenance_slice(
+        self,
+        budget_seconds: float = 0.5,
+        pages_per_step: int = 256
+    ) -> Dict:
+        """
+        Ejecuta una porción acotada en tiempo de mantenimiento.
+        
+        Libera páginas con ``PRAGMA incremental_vacuum(N)`` en pasos cortos,
+        cada uno en su propia transacción, hasta agotar la lista de páginas
+        libres o el presupuesto de tiempo. Si queda presupuesto ejecuta
+        ``PRAGMA optimize`` con un límite de análisis.
+        
+        Args:
+            budget_seconds: Tiempo máximo de la porción
+            pages_per_step: Páginas liberadas por paso
             
-    async def clean_old_memories(self, retention_days: int = 30):
-        """Elimina memorias antiguas basado en el período de retención"""
+        Returns:
+            Estadísticas de la porción y del almacenamiento resultante
+        """
+        start_time = time.perf_counter()
+        before = self.get_storage_stats()
+        optimized = False
+        
+        with connect(self.db_path) as conn:
+            if before["auto_vacuum"] == "incremental":
+                while time.perf_counter() - start_time < budget_seconds:
+                    freelist_count = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                    if freelist_count == 0:
+                        break
+                    conn.execute(f"PRAGMA incremental_vacuum({int(pages_per_step)})").fetchall()
+                    conn.commit()
+                    
+            if time.perf_counter() - start_time < budget_seconds:
+                conn.execute("PRAGMA analysis_limit = 400")
+                conn.execute("PRAGMA optimize")
+                optimized = True
+                
+        after = self.get_storage_stats()
+        stats = {
+            **after,
+            "pages_freed": before["freelist_count"] - after["freelist_count"],
+            "optimized": optimized,
+            "duration": time.perf_counter() - start_time
+        }
+        logger.debug(f"Porción de mantenimiento completada: {stats}")
+        return stats
+    
+    def vacuum_if_fragmented(self) -> bool:
+        """
+        Ejecuta un VACUUM completo solo si la fragmentación supera el umbral.
+        
+        Con ``auto_vacuum=INCREMENTAL`` las páginas libres se recuperan en las
+        porciones de mantenimiento, así que el VACUUM completo solo llega a
+        ejecutarse en bases de datos sin ese modo o muy fragmentadas.
+        """
+        stats = self.get_storage_stats()
+        if stats["fragmentation"] < self.fragmentation_threshold:
+            return False
+            
+        logger.info(
+            f"Fragmentación {stats['fragmentation']:.1%} supera el umbral "
+            f"{self.fragmentation_threshold:.1%}, ejecutando VACUUM completo"
+        )
+        with connect(self.db_path) as conn:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        return True
+    
+    async def schedule_maintenance(
+        self,
+        interval_seconds: int = 300,
+        budget_seconds: float = 0.5,
+        pages_per_step: int = 256,
+        is_idle: Optional[Callable[[], bool]] = None
+    ):
+        """
+        Programa el mantenimiento incremental de la base de datos.
+        
+        En cada intervalo, si ``is_idle`` indica baja carga (o no se
+        proporciona), ejecuta una porción acotada de mantenimiento en un
+        hilo aparte y, solo si la fragmentación supera el umbral, un VACUUM
+        completo.
+        
+        Args:
+            interval_seconds: Segundos entre porciones de mantenimiento
+            budget_seconds: Tiempo máximo de cada porción
+            pages_per_step: Páginas liberadas por paso de incremental_vacuum
+            is_idle: Función que indica si el sistema está en baja carga
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                if is_idle is None or is_idle():
+                    await loop.run_in_executor(
+                        None, self.run_maintenance_slice, budget_seconds, pages_per_step
+                    )
+                    await loop.run_in_executor(None, self.vacuum_if_fragmented)
+                await asyncio.sleep(interval_seconds)
+            except Exception as e:
+                logger.error(f"Error en mantenimiento programado: {e}")
+                await asyncio.sleep(interval_seconds)
+            
+    async def clean_old_memories(
+        self,
+        retention_days: int = 30,
+        chunk_size: int = 1000,
+        pause_seconds: float = 0.05,
+        importance_threshold: float = 0.8
+    ) -> Dict:
+        """
+        Elimina memorias antiguas basado en el período de retención.
+        
+        El borrado se hace en bloques de ``chunk_size`` filas, cada uno en su
+        propia transacción y con una pausa entre bloques para que otros
+        escritores puedan tomar el lock. Las filas de cada bloque se buscan
+        antes de tomar el lock de escritura, así que el lock solo cubre
+        ``chunk_size`` búsquedas por clave. Las relaciones de las memorias
+        eliminadas se borran en el mismo bloque.
+        
+        Args:
+            retention_days: Días de retención
+            chunk_size: Filas eliminadas por transacción
+            pause_seconds: Pausa entre bloques
+            importance_threshold: Las memorias con importancia igual o
+                superior se conservan
+            
+        Returns:
+            Estadísticas de filas eliminadas, filas por segundo y tiempo
+            de retención del lock
+        """
         try:
             cutoff_date = datetime.now() - timedelta(days=retention_days)
+            loop = asyncio.get_running_loop()
+            start_time = time.perf_counter()
+            stats = {
+                "deleted": 0,
+                "relations_deleted": 0,
+                "chunks": 0,
+                "lock_seconds": 0.0,
+                "max_lock_seconds": 0.0
+            }
             
-            with sqlite3.connect(str(self.db_path)) as conn:
-                # Eliminar memorias antiguas
-                cursor = conn.execute(
-                    """
-                    DELETE FROM memories 
-                    WHERE timestamp < ? AND importance < 0.8
-                    """, 
-                    (cutoff_date,)
+            while True:
+                chunk = await loop.run_in_executor(
+                    None,
+                    self._delete_expired_chunk,
+                    cutoff_date,
+                    importance_threshold,
+                    chunk_size
                 )
+                stats["lock_seconds"] += chunk["lock_seconds"]
+                stats["max_lock_seconds"] = max(stats["max_lock_seconds"], chunk["lock_seconds"])
+                if chunk["candidates"] == 0:
+                    break
+                    
+                stats["deleted"] += chunk["deleted"]
+                stats["relations_deleted"] += chunk["relations_deleted"]
+                stats["chunks"] += 1
                 
-                # Limpiar relaciones huérfanas
-                conn.execute(
-                    """
-                    DELETE FROM memory_relations
-                    WHERE source_id NOT IN (SELECT id FROM memories)
-                    OR target_id NOT IN (SELECT id FROM memories)
-                    """
+                elapsed = time.perf_counter() - start_time
+                logger.debug(
+                    f"Retención: {stats['deleted']} memorias eliminadas "
+                    f"({stats['deleted'] / elapsed:.0f} filas/s, lock "
+                    f"{chunk['lock_seconds'] * 1000:.1f} ms)"
                 )
+                await asyncio.sleep(pause_seconds)
                 
-                deleted_count = cursor.rowcount
-                logger.info(f"Eliminadas {deleted_count} memorias antiguas")
+            stats["duration"] = time.perf_counter() - start_time
+            stats["rows_per_second"] = (
+                stats["deleted"] / stats["duration"] if stats["duration"] else 0.0
+            )
+            logger.info(
+                f"Eliminadas {stats['deleted']} memorias antiguas en {stats['chunks']} "
+                f"bloques ({stats['rows_per_second']:.0f} filas/s, lock máximo "
+                f"{stats['max_lock_seconds'] * 1000:.1f} ms)"
+            )
+            return stats
                 
         except Exception as e:
             logger.error(f"Error limpiando memorias antiguas: {e}")
             raise
+            
+    def _delete_expired_chunk(
+        self,
+        cutoff_date: datetime,
+        importance_threshold: float,
+        chunk_size: int
+    ) -> Dict:
+        """Elimina un bloque de memorias expiradas y sus relaciones en una transacción"""
+        expired_sql, _ = HOT_QUERIES["expired_chunk"]
+        with connect(self.db_path, isolation_level=None) as conn:
+            conn.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS expired_chunk (
+                    rowid_ INTEGER PRIMARY KEY, id
+                )
+            """)
+            
+            # Candidatos fuera del lock de escritura: la búsqueda recorre
+            # también las memorias expiradas que se conservan por importancia
+            conn.execute("DELETE FROM temp.expired_chunk")
+            conn.execute(
+                f"INSERT INTO temp.expired_chunk (rowid_, id) {expired_sql}",
+                (cutoff_date, importance_threshold, chunk_size)
+            )
+            candidates = conn.execute("SELECT COUNT(*) FROM temp.expired_chunk").fetchone()[0]
+            if not candidates:
+                return {"candidates": 0, "deleted": 0, "relations_deleted": 0, "lock_seconds": 0.0}
+            
+            lock_start = time.perf_counter()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Otro escritor pudo cambiar o sustituir los candidatos
+                # desde la búsqueda; se comprueban por clave
+                conn.execute(
+                    """
+                    DELETE FROM temp.expired_chunk
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM memories m
+                        WHERE m.rowid = expired_chunk.rowid_
+                        AND m.id = expired_chunk.id
+                        AND m.timestamp < ? AND m.importance < ?
+                    )
+                    """,
+                    (cutoff_date, importance_threshold)
+                )
+                deleted = conn.execute("SELECT COUNT(*) FROM temp.expired_chunk").fetchone()[0]
+                
+                relations_deleted = 0
+                if deleted:
+                    # Dos sentencias para que cada una use su índice
+                    for column in ("source_id", "target_id"):
+                        relations_deleted += conn.execute(
+                            f"""
+                            DELETE FROM memory_relations
+                            WHERE {column} IN (SELECT id FROM temp.expired_chunk)
+                            """
+                        ).rowcount
+                    conn.execute(
+                        """
+                        DELETE FROM memories
+                        WHERE rowid IN (SELECT rowid_ FROM temp.expired_chunk)
+                        """
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+                
+            return {
+                "candidates": candidates,
+                "deleted": deleted,
+                "relations_deleted": relations_deleted,
+                "lock_seconds": time.perf_counter() - lock_start
+            }
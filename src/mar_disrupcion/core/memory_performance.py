@@ -1,18 +1,75 @@
-import asyncio
-import time
+import gc
+import inspect
+import json
 import logging
+import os
 import random
-from typing import Dict, List, Optional
-from pathlib import Path
+import threading
+import tracemalloc
 from datetime import datetime
-import numpy as np
-import json
+from typing import Any, Dict, List, Optional, Union
+from pathlib import Path
 
+from ..benchmarks.harness import build_report, save_report
+from ..benchmarks.suites import MEMORY_CATEGORIES, generate_memories, memory_suite
 from .memory_system import AdvancedMemorySystem
 from .memory_optimizer import MemoryOptimizer
 
 logger = logging.getLogger(__name__)
 
+# Intervalo por defecto del muestreo de RSS (segundos)
+RSS_SAMPLE_INTERVAL = 0.01
+
+# Asignaciones del propio perfilado que no se atribuyen al código medido
+ALLOCATION_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>")
+]
+
+
+class _RssSampler:
+    """Muestrea el RSS del proceso en un hilo para registrar el pico real."""
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL):
+        import psutil
+
+        self.interval = interval
+        self._process = psutil.Process(os.getpid())
+        self._stop = threading.Event()
+        self._thread = None
+        self.initial = 0
+        self.peak = 0
+        self.samples = 0
+
+    def _sample(self) -> int:
+        rss = self._process.memory_info().rss
+        self.peak = max(self.peak, rss)
+        self.samples += 1
+        return rss
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        self.initial = self._sample()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Dict[str, int]:
+        self._stop.set()
+        self._thread.join()
+        final = self._sample()
+        return {
+            "initial_memory": self.initial,
+            "peak_memory": self.peak,
+            "final_memory": final,
+            "rss_samples": self.samples
+        }
+
 class MemoryPerformanceTest:
     """Tests de rendimiento para el sistema de memoria"""
     
@@ -20,104 +77,60 @@ class MemoryPerformanceTest:
         self.memory_system = memory_system
         self.optimizer = MemoryOptimizer(memory_system.db_path)
         
-    async def run_performance_test(self, num_samples: int = 1000):
-        """Ejecuta una batería completa de tests de rendimiento"""
-        results = {
-            "write_speed": [],
-            "read_speed": [],
-            "query_speed": [],
-            "cache_hits": 0,
-            "cache_misses": 0
+    async def run_performance_test(
+        self,
+        num_samples: int = 1000,
+        warmup: Optional[int] = None,
+        output: Optional[Union[str, Path]] = None
+    ) -> Dict:
+        """
+        Ejecuta la suite de benchmarks de memoria.
+        
+        Cada operación se mide por separado con ``perf_counter_ns`` tras
+        unas rondas de calentamiento; las latencias se expresan en
+        nanosegundos con percentiles p50/p95/p99/p999.
+        
+        Args:
+            num_samples: Llamadas medidas por operación
+            warmup: Llamadas de calentamiento (por defecto el 10%)
+            output: Archivo JSON en el que guardar el informe
+        """
+        if warmup is None:
+            warmup = max(1, num_samples // 10)
+        results = await memory_suite(self.memory_system, rounds=num_samples, warmup=warmup).run()
+        
+        if output is not None:
+            save_report(build_report(results), output)
+        
+        return {
+            "write_speed": results["memory.store_memory"],
+            "read_speed": results["memory.retrieve_memories"],
+            "query_speed": results["memory.retrieve_with_context"],
+            "embedding_speed": results["memory.generate_embedding"],
+            "cache_performance": await self._cache_performance()
         }
         
-        # Generar datos de prueba
-        test_data = self._generate_test_data(num_samples)
+    def _generate_test_data(self, num_samples: int) -> List[Dict]:
+        """Genera datos sintéticos para pruebas"""
+        return generate_memories(num_samples, random.Random())
         
-        # Test de escritura
-        start_time = time.time()
-        for data in test_data:
-            memory_id = await self.memory_system.store_memory(
-                content=data["content"],
-                category=data["category"],
-                importance=data["importance"]
-            )
-            write_time = time.time() - start_time
-            results["write_speed"].append(write_time)
-            start_time = time.time()
-            
-        # Test de lectura
-        start_time = time.time()
-        categories = list(set(d["category"] for d in test_data))
-        for category in categories:
+    async def _cache_performance(self) -> Dict:
+        """Aciertos del caché de prioridad sobre las memorias de cada categoría"""
+        stats = {"hits": 0, "misses": 0}
+        for category in MEMORY_CATEGORIES:
             memories = await self.memory_system.retrieve_memories(
                 category=category,
                 limit=50,
                 min_importance=0.3
             )
-            read_time = time.time() - start_time
-            results["read_speed"].append(read_time)
-            start_time = time.time()
+            category_stats = self._analyze_cache_performance(memories)
+            stats["hits"] += category_stats["hits"]
+            stats["misses"] += category_stats["misses"]
             
-            # Contar hits/misses de caché
-            cache_stats = self._analyze_cache_performance(memories)
-            results["cache_hits"] += cache_stats["hits"]
-            results["cache_misses"] += cache_stats["misses"]
-            
-        # Test de consultas complejas
-        query_times = await self._test_complex_queries()
-        results["query_speed"] = query_times
-        
-        # Calcular estadísticas
-        stats = self._calculate_statistics(results)
-        
+        total = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / total if total else 0.0
         return stats
         
-    def _generate_test_data(self, num_samples: int) -> List[Dict]:
-        """Genera datos sintéticos para pruebas"""
-        categories = ["info", "error", "warning", "debug", "critical"]
-        test_data = []
-        
-        for _ in range(num_samples):
-            data = {
-                "category": random.choice(categories),
-                "content": {
-                    "timestamp": datetime.now().isoformat(),
-                    "message": f"Test message {random.randint(1, 1000)}",
-                    "value": random.random(),
-                    "nested": {
-                        "field1": random.randint(1, 100),
-                        "field2": "test"
-                    }
-                },
-                "importance": random.random()
-            }
-            test_data.append(data)
-            
-        return test_data
-        
-    async def _test_complex_queries(self) -> List[float]:
-        """Prueba consultas complejas y mide tiempos"""
-        query_times = []
-        
-        # Test de consultas con joins
-        start_time = time.time()
-        await self.memory_system.retrieve_memories(
-            category="info",
-            limit=100,
-            min_importance=0.7,
-            context_size=5
-        )
-        query_times.append(time.time() - start_time)
-        
-        # Test de búsqueda por embedding
-        start_time = time.time()
-        sample_content = self._generate_test_data(1)[0]["content"]
-        embedding = self.memory_system._generate_embedding(sample_content)
-        # TODO: Implementar búsqueda por similitud de embedding
-        query_times.append(time.time() - start_time)
-        
-        return query_times
-        
     def _analyze_cache_performance(self, memories: List[Dict]) -> Dict:
         """Analiza rendimiento del caché"""
         stats = {"hits": 0, "misses": 0}
@@ -130,52 +143,120 @@ class MemoryPerformanceTest:
                 
         return stats
         
-    def _calculate_statistics(self, results: Dict) -> Dict:
-        """Calcula estadísticas de rendimiento"""
-        stats = {
-            "write_speed": {
-                "mean": np.mean(results["write_speed"]),
-                "std": np.std(results["write_speed"]),
-                "min": min(results["write_speed"]),
-                "max": max(results["write_speed"])
-            },
-            "read_speed": {
-                "mean": np.mean(results["read_speed"]),
-                "std": np.std(results["read_speed"]),
-                "min": min(results["read_speed"]),
-                "max": max(results["read_speed"])
-            },
-            "query_speed": {
-                "mean": np.mean(results["query_speed"]),
-                "std": np.std(results["query_speed"]),
-                "min": min(results["query_speed"]),
-                "max": max(results["query_speed"])
-            },
-            "cache_performance": {
-                "hits": results["cache_hits"],
-                "misses": results["cache_misses"],
-                "hit_ratio": results["cache_hits"] / (results["cache_hits"] + results["cache_misses"])
-            }
-        }
+    async def benchmark_memory_usage(
+        self,
+        num_samples: int = 500,
+        profile: bool = False,
+        top: int = 10,
+        sample_interval: float = RSS_SAMPLE_INTERVAL,
+        output: Optional[Union[str, Path]] = None
+    ) -> Dict:
+        """
+        Monitorea uso de memoria durante operaciones.
         
-        return stats
+        Un hilo muestrea el RSS cada ``sample_interval`` segundos mientras
+        se ejecutan los benchmarks, de modo que ``peak_memory`` es el pico
+        observado y no una lectura final.
         
-    async def benchmark_memory_usage(self) -> Dict:
-        """Monitorea uso de memoria durante operaciones"""
-        import psutil
-        import os
+        Con ``profile`` se repite cada operación bajo tracemalloc, después
+        del muestreo de RSS para no inflarlo, y se añade ``allocations``
+        con, por operación, los bytes retenidos y el pico de bytes
+        asignados por llamada y por memoria guardada o recuperada, y los
+        ``top`` puntos del código que más memoria retienen.
         
-        process = psutil.Process(os.getpid())
-        stats = {
-            "initial_memory": process.memory_info().rss,
-            "peak_memory": 0,
-            "final_memory": 0
-        }
+        Args:
+            num_samples: Llamadas por operación
+            profile: Activa el perfilado de asignaciones
+            top: Puntos de asignación por operación en el perfilado
+            sample_interval: Intervalo del muestreo de RSS
+            output: Archivo JSON en el que guardar el resultado
+        """
+        sampler = _RssSampler(sample_interval)
+        sampler.start()
+        try:
+            await self.run_performance_test(num_samples=num_samples)
+        finally:
+            stats = sampler.stop()
         
-        # Ejecutar operaciones de prueba
-        await self.run_performance_test(num_samples=500)
+        if profile:
+            stats["allocations"] = await self._profile_allocations(num_samples, top)
         
-        stats["peak_memory"] = process.memory_info().rss
-        stats["final_memory"] = process.memory_info().rss
+        if output is not None:
+            path = Path(output)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(
+                {"created": datetime.now().isoformat(), "num_samples": num_samples, **stats},
+                indent=2,
+                sort_keys=True
+            ))
         
         return stats
+    
+    async def _profile_allocations(self, num_samples: int, top: int) -> Dict[str, Dict[str, Any]]:
+        """Asignaciones de cada operación de la suite de memoria bajo tracemalloc."""
+        suite = memory_suite(self.memory_system, rounds=num_samples, warmup=0)
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        
+        results = {}
+        try:
+            for benchmark in suite.benchmarks:
+                if benchmark.make_inputs is not None:
+                    calls = [(item,) for item in benchmark.make_inputs(num_samples)]
+                else:
+                    calls = [()] * num_samples
+                
+                gc.collect()
+                before = tracemalloc.take_snapshot().filter_traces(ALLOCATION_FILTERS)
+                start_bytes, _ = tracemalloc.get_traced_memory()
+                
+                peaks = []
+                memories = 0
+                for args in calls:
+                    current, _ = tracemalloc.get_traced_memory()
+                    tracemalloc.reset_peak()
+                    result = benchmark.operation(*args)
+                    if inspect.isawaitable(result):
+                        result = await result
+                    _, peak = tracemalloc.get_traced_memory()
+                    peaks.append(peak - current)
+                    # Las recuperaciones devuelven varias memorias por llamada
+                    memories += len(result) if isinstance(result, list) else 1
+                
+                gc.collect()
+                end_bytes, _ = tracemalloc.get_traced_memory()
+                after = tracemalloc.take_snapshot().filter_traces(ALLOCATION_FILTERS)
+                
+                # compare_to ordena por tamaño absoluto; solo interesa lo que crece
+                sites = [stat for stat in after.compare_to(before, "lineno") if stat.size_diff > 0]
+                retained = end_bytes - start_bytes
+                per_memory = max(memories, 1)
+                results[benchmark.name] = {
+                    "calls": len(calls),
+                    "memories": memories,
+                    "retained_bytes": retained,
+                    "retained_bytes_per_memory": retained / per_memory,
+                    "peak_bytes_per_call": sum(peaks) / len(peaks),
+                    "peak_bytes_per_memory": sum(peaks) / per_memory,
+                    "max_peak_bytes": max(peaks),
+                    "top_sites": [
+                        {
+                            "file": stat.traceback[0].filename,
+                            "line": stat.traceback[0].lineno,
+                            "size_diff": stat.size_diff,
+                            "count_diff": stat.count_diff
+                        }
+                        for stat in sites[:top]
+                    ]
+                }
+                logger.info(
+                    f"Asignaciones de {benchmark.name}: "
+                    f"{results[benchmark.name]['peak_bytes_per_memory']:.0f} bytes por memoria, "
+                    f"{retained} bytes retenidos"
+                )
+        finally:
+            if started:
+                tracemalloc.stop()
+        
+        return results
@@ -0,0 +1,167 @@
+"""
+Esquema único de la base de datos de memoria.
+
+Define las tablas, los índices y el catálogo de consultas calientes. Los
+índices se diseñan a partir de esas consultas; la suite de tests de planes
+de consulta comprueba que cada una de ellas usa un índice.
+"""
+import sqlite3
+import logging
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# id es un INTEGER PRIMARY KEY (alias del rowid) generado con
+# SnowflakeIdGenerator; las tablas creadas por versiones anteriores usan
+# ids TEXT hasta que se aplica IntegerIdMigration.
+MEMORY_COLUMNS = """
+    id INTEGER PRIMARY KEY,
+    category TEXT,
+    content BLOB,
+    importance REAL,
+    timestamp DATETIME,
+    last_accessed DATETIME,
+    access_count INTEGER,
+    embedding BLOB
+"""
+
+RELATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS memory_relations (
+        source_id INTEGER,
+        target_id INTEGER,
+        relation_type TEXT,
+        strength REAL,
+        PRIMARY KEY (source_id, target_id),
+        FOREIGN KEY (source_id) REFERENCES memories(id),
+        FOREIGN KEY (target_id) REFERENCES memories(id)
+    )
+"""
+
+# Correspondencia entre los ids TEXT anteriores y los ids enteros que les
+# asignó la migración, para que las búsquedas por id antiguo sigan funcionando
+LEGACY_IDS_TABLE = """
+    CREATE TABLE IF NOT EXISTS memory_legacy_ids (
+        legacy_id TEXT PRIMARY KEY,
+        id INTEGER NOT NULL
+    ) WITHOUT ROWID
+"""
+
+# Índices de cada tabla de memorias (principal y particiones diarias).
+# (category, importance, last_accessed) resuelve el filtro y el ORDER BY de
+# la recuperación por categoría recorriendo el índice hacia atrás; incluir
+# timestamp evita leer la fila para descartar las expiradas.
+# (timestamp, importance) cubre la búsqueda de memorias expiradas de la
+# retención, que recorre solo el rango anterior al corte.
+MEMORY_INDEXES: List[Tuple[str, str]] = [
+    ("cat_imp_access", "category, importance, last_accessed, timestamp"),
+    ("time_imp", "timestamp, importance"),
+]
+
+# Índices de relaciones: (source_id, strength, target_id) cubre las
+# relacionadas de una memoria ordenadas por fuerza; target_id permite
+# borrar las relaciones entrantes de una memoria eliminada.
+RELATION_INDEXES: List[Tuple[str, str]] = [
+    ("idx_relations_source_strength", "source_id, strength, target_id"),
+    ("idx_relations_target", "target_id"),
+]
+
+# Índices de versiones anteriores sustituidos por los de arriba
+REDUNDANT_INDEXES = [
+    "idx_category",
+    "idx_importance",
+    "idx_timestamp",
+    "idx_cat_time",
+    "idx_imp_time",
+    "idx_last_accessed",
+    "idx_relations",
+]
+
+# Consultas calientes del sistema de memoria con parámetros de ejemplo
+HOT_QUERIES: Dict[str, Tuple[str, tuple]] = {
+    "retrieve_by_category": (
+        """
+        SELECT id, content, importance, timestamp, access_count, embedding,
+        last_accessed
+        FROM memories
+        WHERE category = ?
+        AND importance >= ?
+        AND timestamp >= ?
+        ORDER BY importance DESC, last_accessed DESC
+        LIMIT ?
+        """,
+        ("security", 0.5, "2024-01-01 00:00:00", 10)
+    ),
+    "legacy_id_lookup": (
+        "SELECT id FROM memory_legacy_ids WHERE legacy_id = ?",
+        ("20240101000000000000",)
+    ),
+    "related_memories": (
+        """
+        SELECT m.* FROM memories m
+        JOIN memory_relations r ON m.id = r.target_id
+        WHERE r.source_id = ?
+        ORDER BY r.strength DESC
+        LIMIT ?
+        """,
+        (7142017433600000000, 5)
+    ),
+    "related_targets": (
+        """
+        SELECT target_id FROM memory_relations
+        WHERE source_id = ?
+        ORDER BY strength DESC
+        """,
+        (7142017433600000000,)
+    ),
+    "update_access": (
+        """
+        UPDATE memories
+        SET last_accessed = ?, access_count = access_count + 1
+        WHERE id = ?
+        """,
+        ("2024-01-01 00:00:00", 7142017433600000000)
+    ),
+    "expired_chunk": (
+        """
+        SELECT rowid, id FROM memories
+        WHERE timestamp < ? AND importance < ?
+        ORDER BY timestamp
+        LIMIT ?
+        """,
+        ("2024-01-01 00:00:00", 0.8, 1000)
+    ),
+    "delete_outgoing_relations": (
+        "DELETE FROM memory_relations WHERE source_id IN (?, ?)",
+        (1, 2)
+    ),
+    "delete_incoming_relations": (
+        "DELETE FROM memory_relations WHERE target_id IN (?, ?)",
+        (1, 2)
+    ),
+}
+
+def create_memory_table(conn: sqlite3.Connection, table: str = "memories") -> None:
+    """Crea una tabla de memorias y sus índices si no existen."""
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({MEMORY_COLUMNS})")
+    for suffix, columns in MEMORY_INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{suffix} ON {table}({columns})")
+
+def apply_schema(conn: sqlite3.Connection) -> None:
+    """
+    Crea las tablas e índices de memoria y elimina los índices redundantes.
+
+    Es idempotente y se aplica tanto a bases de datos nuevas como a las
+    creadas por versiones anteriores.
+    """
+    create_memory_table(conn)
+    conn.execute(RELATIONS_TABLE)
+    conn.execute(LEGACY_IDS_TABLE)
+
+    for index in REDUNDANT_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {index}")
+    for name, columns in RELATION_INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON memory_relations({columns})")
+
+def explain_query_plan(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> List[str]:
+    """Devuelve el detalle de EXPLAIN QUERY PLAN de una consulta."""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
@@ -1,16 +1,26 @@
 import numpy as np
 import torch
 import pickle
-from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
+import heapq
+from typing import Dict, List, Any, Optional, Union
+from datetime import date, datetime, timedelta
 import sqlite3
 from pathlib import Path
 import logging
 import time
 from cachetools import TTLCache
 
+from .memory_schema import apply_schema, create_memory_table
+from .memory_migration import is_legacy_id, memory_migration_runner, needs_integer_id_migration
+from .snowflake import SnowflakeIdGenerator, id_datetime
+from .storage import DEFAULT_PROFILE, configure_storage, connect
+
 logger = logging.getLogger(__name__)
 
+# Prefijo de las tablas de partición diaria (memories_YYYYMMDD)
+PARTITION_PREFIX = "memories_"
+PARTITION_DATE_FORMAT = "%Y%m%d"
+
 class AdvancedMemorySystem:
     def __init__(
         self,
@@ -35,6 +45,22 @@ class AdvancedMemorySystem:
         self.confidence_threshold = memory_config["confidence_threshold"]
         self.cache_size = memory_config["cache_size"]
         
+        # Particionado diario opcional: la retención elimina tablas completas
+        self.partition_by_day = memory_config.get("partition_by_day", False)
+        self._partitions = set()
+        self._schema_version = None
+        
+        # Ids enteros ordenados por tiempo; node_id distingue cada proceso
+        # que escribe en la misma base de datos
+        self.id_generator = SnowflakeIdGenerator(memory_config.get("node_id", 0))
+
+        # Perfil de almacenamiento de todas las conexiones SQLite (ver storage)
+        storage_config = config.get("storage", {})
+        configure_storage(
+            storage_config.get("profile", DEFAULT_PROFILE),
+            storage_config.get("profiles")
+        )
+
         # Configuración de la red neuronal
         self.learning_rate = neural_config["learning_rate"]
         self.lstm_hidden_size = neural_config["lstm_hidden_size"]
@@ -75,57 +101,228 @@ class AdvancedMemorySystem:
         )
         
         # Inicializar base de datos
-        self.db_path = Path("memory/system_memory.db")
-        self.db_path.parent.mkdir(exist_ok=True)
+        self.db_path = Path(db_path) if db_path else Path("memory/system_memory.db")
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self._init_database()
         
         logger.info("Sistema de memoria avanzado inicializado")
     
     def _init_database(self):
         """Inicializa la base de datos de memoria persistente."""
-        with sqlite3.connect(str(self.db_path)) as conn:
-            # Tabla principal de memorias
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS memories (
-                    id TEXT PRIMARY KEY,
-                    category TEXT,
-                    content BLOB,
-                    importance REAL,
-                    timestamp DATETIME,
-                    last_accessed DATETIME,
-                    access_count INTEGER,
-                    embedding BLOB
+        with connect(self.db_path) as conn:
+            # Solo surte efecto en bases de datos nuevas; las existentes se
+            # convierten en el siguiente VACUUM (ver MemoryOptimizer)
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            
+            # Tablas e índices (ver memory_schema)
+            apply_schema(conn)
+            
+            # Particiones existentes
+            self._load_partitions(conn)
+            
+            if needs_integer_id_migration(conn):
+                logger.warning(
+                    "La base de datos de memoria usa ids TEXT; ejecuta run_migrations() "
+                    "para migrar a claves enteras"
                 )
-            """)
+    
+    def _load_partitions(self, conn: sqlite3.Connection) -> None:
+        """
+        Relee las particiones si el esquema ha cambiado.
+        
+        Otras instancias o procesos sobre la misma base de datos pueden
+        crear o eliminar particiones; ``schema_version`` cambia con cada
+        cambio de esquema, así que basta una lectura para saberlo.
+        """
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        if version == self._schema_version:
+            return
+        self._partitions = {
+            row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ?",
+                (PARTITION_PREFIX + "%",)
+            )
+        }
+        self._schema_version = version
+    
+    def _partition_name(self, day: date) -> str:
+        """Nombre de la tabla de partición de un día."""
+        return PARTITION_PREFIX + day.strftime(PARTITION_DATE_FORMAT)
+    
+    def _partition_day(self, table: str) -> date:
+        """Día de una tabla de partición."""
+        return datetime.strptime(table[len(PARTITION_PREFIX):], PARTITION_DATE_FORMAT).date()
+    
+    def _ensure_partition(self, conn: sqlite3.Connection, day: date) -> str:
+        """Crea la partición de un día si no existe y devuelve su nombre."""
+        table = self._partition_name(day)
+        if table in self._partitions:
+            return table
             
-            # Tabla de relaciones entre memorias
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS memory_relations (
-                    source_id TEXT,
-                    target_id TEXT,
-                    relation_type TEXT,
-                    strength REAL,
-                    PRIMARY KEY (source_id, target_id),
-                    FOREIGN KEY (source_id) REFERENCES memories(id),
-                    FOREIGN KEY (target_id) REFERENCES memories(id)
+        create_memory_table(conn, table)
+        self._partitions.add(table)
+        logger.info(f"Partición de memoria creada: {table}")
+        return table
+    
+    def _tables_for(self, conn: sqlite3.Connection, memory_id: Union[int, str]) -> List[str]:
+        """
+        Tablas que pueden contener una memoria, en orden de búsqueda.
+        
+        Los ids codifican su fecha, así que primero va la partición de su
+        día; después ``memories``, donde siguen las memorias escritas antes
+        de activar el particionado o de crearse la partición.
+        """
+        if not self.partition_by_day:
+            return ["memories"]
+        self._load_partitions(conn)
+        if is_legacy_id(memory_id):
+            table = PARTITION_PREFIX + memory_id[:8]
+        else:
+            table = self._partition_name(id_datetime(int(memory_id)).date())
+        return [table, "memories"] if table in self._partitions else ["memories"]
+    
+    def _find_memory(
+        self,
+        conn: sqlite3.Connection,
+        memory_id: Union[int, str],
+        columns: str = "*"
+    ) -> Optional[tuple]:
+        """Fila de una memoria en la primera tabla que la contiene."""
+        for table in self._tables_for(conn, memory_id):
+            row = conn.execute(
+                f"SELECT {columns} FROM {table} WHERE id = ?",
+                (memory_id,)
+            ).fetchone()
+            if row is not None:
+                return row
+        return None
+    
+    def _resolve_id(self, conn: sqlite3.Connection, memory_id: Union[int, str]) -> Union[int, str]:
+        """
+        Traduce un id a la clave de la base de datos.
+        
+        Un id TEXT anterior se usa tal cual mientras siga en su tabla sin
+        migrar, incluso si la migración ya lo copió a la tabla sombra y le
+        asignó id entero; solo cuando las tablas se han intercambiado se
+        traduce a su id entero.
+        """
+        if is_legacy_id(memory_id):
+            if self._find_memory(conn, memory_id, "1"):
+                return memory_id
+            row = conn.execute(
+                "SELECT id FROM memory_legacy_ids WHERE legacy_id = ?",
+                (memory_id,)
+            ).fetchone()
+            return row[0] if row else memory_id
+        return int(memory_id)
+    
+    async def get_memory(self, memory_id: Union[int, str]) -> Optional[Dict]:
+        """Obtiene una memoria por su id, entero o TEXT anterior."""
+        try:
+            with connect(self.db_path) as conn:
+                key = self._resolve_id(conn, memory_id)
+                row = self._find_memory(
+                    conn, key, "id, category, content, importance, timestamp, access_count"
                 )
-            """)
+                
+            if row is None:
+                return None
+                
+            return {
+                "id": row[0],
+                "category": row[1],
+                "content": pickle.loads(row[2]),
+                "importance": row[3],
+                "timestamp": row[4],
+                "access_count": row[5]
+            }
             
-            # Índices para optimización
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_category ON memories(category)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_importance ON memories(importance)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_timestamp ON memories(timestamp)")
+        except Exception as e:
+            logger.error(f"Error obteniendo memoria {memory_id}: {e}")
+            raise
+    
+    async def run_migrations(
+        self,
+        dry_run: bool = False,
+        batch_size: int = 1000,
+        max_rows_per_second: Optional[float] = None,
+        pause_seconds: float = 0.01
+    ) -> List[Dict]:
+        """
+        Aplica en segundo plano las migraciones pendientes de la base de datos.
+        
+        El sistema puede seguir leyendo y escribiendo mientras las
+        migraciones reescriben los datos por lotes (ver MigrationRunner).
+        
+        Args:
+            dry_run: Solo estima duración y espacio adicional
+            batch_size: Filas por transacción
+            max_rows_per_second: Límite de filas por segundo
+            pause_seconds: Pausa entre lotes
+        """
+        runner = memory_migration_runner(
+            self.db_path,
+            batch_size=batch_size,
+            max_rows_per_second=max_rows_per_second,
+            pause_seconds=pause_seconds
+        )
+        return await runner.run_in_background(dry_run)
+    
+    def _partitions_since(self, conn: sqlite3.Connection, since: datetime) -> List[str]:
+        """Tablas cuyos datos pueden solaparse con la ventana desde ``since``."""
+        tables = ["memories"]
+        if self.partition_by_day:
+            self._load_partitions(conn)
+            tables.extend(
+                table for table in sorted(self._partitions)
+                if self._partition_day(table) >= since.date()
+            )
+        return tables
+    
+    async def drop_expired_partitions(self) -> List[str]:
+        """
+        Aplica la retención eliminando las particiones diarias expiradas.
+        
+        Una partición expira cuando el día completo queda fuera del período
+        de retención. Se borran también las relaciones de sus memorias.
+        
+        Returns:
+            Nombres de las particiones eliminadas
+        """
+        retention_limit = datetime.now() - timedelta(seconds=self.retention_period)
+        
+        try:
+            with connect(self.db_path) as conn:
+                self._load_partitions(conn)
+                expired = [
+                    table for table in sorted(self._partitions)
+                    if self._partition_day(table) < retention_limit.date()
+                ]
+                for table in expired:
+                    for column in ("source_id", "target_id"):
+                        conn.execute(
+                            f"DELETE FROM memory_relations WHERE {column} IN (SELECT id FROM {table})"
+                        )
+                    conn.execute(f"DROP TABLE IF EXISTS {table}")
+                    self._partitions.discard(table)
+                    logger.info(f"Partición de memoria expirada eliminada: {table}")
+                    
+            return expired
+            
+        except Exception as e:
+            logger.error(f"Error eliminando particiones expiradas: {e}")
+            raise
     
     async def store_memory(
         self,
         content: Any,
         category: str,
         importance: float = 0.5,
-        related_to: Optional[str] = None
-    ) -> str:
+        related_to: Optional[Union[int, str]] = None
+    ) -> int:
         """Almacena una nueva memoria con sistema de prioridad y relaciones."""
         try:
-            memory_id = datetime.now().strftime("%Y%m%d%H%M%S%f")
+            memory_id = self.id_generator.next_id()
             
             # Generar embedding para el contenido
             embedding = self._generate_embedding(content)
@@ -134,11 +331,19 @@ class AdvancedMemorySystem:
             encoded_content = pickle.dumps(content)
             encoded_embedding = pickle.dumps(embedding)
             
-            with sqlite3.connect(str(self.db_path)) as conn:
+            new_partition = False
+            with connect(self.db_path) as conn:
+                table = "memories"
+                if self.partition_by_day:
+                    self._load_partitions(conn)
+                    partitions = len(self._partitions)
+                    table = self._ensure_partition(conn, id_datetime(memory_id).date())
+                    new_partition = len(self._partitions) > partitions
+                    
                 # Almacenar memoria
                 conn.execute(
-                    """
-                    INSERT INTO memories 
+                    f"""
+                    INSERT INTO {table} 
                     (id, category, content, importance, timestamp, 
                     last_accessed, access_count, embedding)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
@@ -155,9 +360,13 @@ class AdvancedMemorySystem:
                         (source_id, target_id, relation_type, strength)
                         VALUES (?, ?, 'related', ?)
                         """,
-                        (memory_id, related_to, importance)
+                        (memory_id, self._resolve_id(conn, related_to), importance)
                     )
             
+            # El cambio de día es el momento de aplicar la retención
+            if new_partition:
+                await self.drop_expired_partitions()
+            
             # Actualizar caché si es importante
             if importance > self.confidence_threshold:
                 self._update_cache(memory_id, content, importance)
@@ -181,54 +390,53 @@ class AdvancedMemorySystem:
             retention_limit = current_time - timedelta(seconds=self.retention_period)
             context_size = context_size or self.context_depth
             
-            with sqlite3.connect(str(self.db_path)) as conn:
-                # Obtener memorias principales
-                cursor = conn.execute(
-                    """
-                    SELECT id, content, importance, timestamp, access_count, embedding
-                    FROM memories
-                    WHERE category = ? 
-                    AND importance >= ?
-                    AND timestamp >= ?
-                    ORDER BY importance DESC, last_accessed DESC
-                    LIMIT ?
-                    """,
-                    (category, min_importance, retention_limit, limit)
+            with connect(self.db_path) as conn:
+                # Obtener memorias principales de cada partición que se
+                # solapa con la ventana de retención; cada fila lleva su tabla
+                partial_results = [
+                    conn.execute(
+                        f"""
+                        SELECT id, content, importance, timestamp, access_count, embedding,
+                        last_accessed, ?
+                        FROM {table}
+                        WHERE category = ? 
+                        AND importance >= ?
+                        AND timestamp >= ?
+                        ORDER BY importance DESC, last_accessed DESC
+                        LIMIT ?
+                        """,
+                        (table, category, min_importance, retention_limit, limit)
+                    ).fetchall()
+                    for table in self._partitions_since(conn, retention_limit)
+                ]
+                rows = heapq.nlargest(
+                    limit,
+                    (row for rows in partial_results for row in rows),
+                    key=lambda row: (row[2], row[6] or "")
                 )
                 
                 memories = []
-                for row in cursor.fetchall():
-                    memory_id, content, importance, timestamp, access_count, embedding = row
+                for row in rows:
+                    memory_id, content, importance, timestamp, access_count, embedding, _, table = row
                     
                     # Decodificar contenido y embedding
                     decoded_content = pickle.loads(content)
                     decoded_embedding = pickle.loads(embedding)
                     
                     # Obtener memorias relacionadas
-                    related_cursor = conn.execute(
-                        """
-                        SELECT m.* FROM memories m
-                        JOIN memory_relations r ON m.id = r.target_id
-                        WHERE r.source_id = ?
-                        ORDER BY r.strength DESC
-                        LIMIT ?
-                        """,
-                        (memory_id, context_size)
-                    )
-                    
                     related_memories = [
                         {
                             "id": r[0],
                             "content": pickle.loads(r[2]),
                             "importance": r[3]
                         }
-                        for r in related_cursor.fetchall()
+                        for r in self._fetch_related(conn, memory_id, context_size)
                     ]
                     
                     # Actualizar estadísticas de acceso
                     conn.execute(
-                        """
-                        UPDATE memories 
+                        f"""
+                        UPDATE {table} 
                         SET last_accessed = ?, access_count = access_count + 1
                         WHERE id = ?
                         """,
@@ -251,7 +459,44 @@ class AdvancedMemorySystem:
             logger.error(f"Error recuperando memorias: {e}")
             raise
     
-    def _update_cache(self, memory_id: str, content: Any, importance: float):
+    def _fetch_related(
+        self,
+        conn: sqlite3.Connection,
+        memory_id: int,
+        context_size: int
+    ) -> List[tuple]:
+        """Obtiene las memorias relacionadas ordenadas por fuerza de relación."""
+        if not self.partition_by_day:
+            return conn.execute(
+                """
+                SELECT m.* FROM memories m
+                JOIN memory_relations r ON m.id = r.target_id
+                WHERE r.source_id = ?
+                ORDER BY r.strength DESC
+                LIMIT ?
+                """,
+                (memory_id, context_size)
+            ).fetchall()
+            
+        # Con particiones cada destino se busca en la tabla de su día o en memories
+        related = []
+        targets = conn.execute(
+            """
+            SELECT target_id FROM memory_relations
+            WHERE source_id = ?
+            ORDER BY strength DESC
+            """,
+            (memory_id,)
+        )
+        for (target_id,) in targets.fetchall():
+            row = self._find_memory(conn, target_id)
+            if row is not None:
+                related.append(row)
+                if len(related) >= context_size:
+                    break
+        return related
+    
+    def _update_cache(self, memory_id: int, content: Any, importance: float):
         """Actualiza el caché con sistema de prioridad y métricas"""
         try:
             if len(self.priority_cache) >= self.cache_size:
@@ -279,7 +524,7 @@ class AdvancedMemorySystem:
             logger.error(f"Error actualizando caché: {e}")
             raise
     
-    async def get_from_cache(self, memory_id: str) -> Optional[Any]:
+    async def get_from_cache(self, memory_id: int) -> Optional[Any]:
         """Intenta recuperar una memoria desde el caché"""
         try:
             if memory_id in self.priority_cache:
@@ -44,6 +44,18 @@ CACHE_MISSES = Counter(
     ['cache_type']
 )
 
+CIRCUIT_BREAKER_STATE = Gauge(
+    'circuit_breaker_state',
+    'Estado del circuit breaker (0=cerrado, 1=semiabierto, 2=abierto)',
+    ['breaker']
+)
+
+MEMORY_OPERATIONS = Counter(
+    'memory_operations_total',
+    'Total de operaciones sobre memoria y caché',
+    ['operation', 'status']
+)
+
 # Métricas de procesamiento
 PROCESSING_TIME = Histogram(
     'processing_time_seconds',
@@ -91,10 +103,14 @@ def record_api_error(api_name: str, error_type: str):
     """Registra un error de API"""
     API_ERRORS.labels(api_name=api_name, error_type=error_type).inc()
 
-def start_operation_timer(operation_type: str) -> Histogram.Timer:
+def start_operation_timer(operation_type: str) -> "Histogram.Timer":
     """Inicia un temporizador para una operación"""
     return PROCESSING_TIME.labels(operation_type=operation_type).time()
 
+def record_memory_operation(operation: str, status: str):
+    """Registra una operación de memoria o caché"""
+    MEMORY_OPERATIONS.labels(operation=operation, status=status).inc()
+
 def record_security_alert(severity: str, alert_type: str):
     """Registra una alerta de seguridad"""
     SECURITY_ALERTS.labels(severity=severity, type=alert_type).inc()
@@ -0,0 +1,421 @@
+"""
+Migraciones versionadas y en línea de la base de datos de memoria.
+
+Cada migración reescribe filas por lotes en transacciones cortas mientras el
+sistema sigue sirviendo peticiones. El ``MigrationRunner`` guarda la
+posición de cada migración en ``schema_migrations`` dentro de la misma
+transacción que cada lote, de modo que una migración interrumpida continúa
+donde se quedó. Cada lote abre su conexión con ``storage.connect``: una
+restauración (``storage.quiesce``) espera al lote en curso y no al resto de
+la migración. Un modo de simulación estima la duración y el espacio en
+disco adicional sin modificar la base de datos.
+"""
+import sqlite3
+import logging
+import asyncio
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .exceptions import MemoryError
+from .storage import connect, generation
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        status TEXT NOT NULL,
+        position TEXT,
+        rows_done INTEGER NOT NULL DEFAULT 0,
+        started_at DATETIME,
+        applied_at DATETIME
+    )
+"""
+
+STATUS_RUNNING = "running"
+STATUS_APPLIED = "applied"
+
+
+class Migration:
+    """
+    Migración de datos por lotes.
+
+    Las subclases definen ``version`` y ``name`` e implementan ``step``. El
+    runner llama a ``prepare``, ``step`` y ``finalize`` dentro de
+    transacciones propias; ninguno de estos métodos debe abrir ni cerrar
+    transacciones.
+    """
+
+    version: int = 0
+    name: str = ""
+
+    # Las migraciones que copian tablas completas necesitan espacio para la
+    # copia; las que reescriben en sitio, solo para el journal de un lote
+    copies_tables: bool = False
+
+    def is_needed(self, conn: sqlite3.Connection) -> bool:
+        """Indica si la base de datos necesita esta migración."""
+        return True
+
+    def tables(self, conn: sqlite3.Connection) -> List[str]:
+        """Tablas que reescribe la migración."""
+        return []
+
+    def estimate_rows(self, conn: sqlite3.Connection) -> int:
+        """Filas que procesará la migración."""
+        return sum(
+            conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in self.tables(conn)
+        )
+
+    def prepare(self, conn: sqlite3.Connection, position: Optional[Dict]) -> Dict:
+        """
+        Prepara la migración (tablas auxiliares, triggers...).
+
+        Args:
+            position: Posición guardada si la migración se está reanudando
+
+        Returns:
+            Posición inicial o la posición guardada
+        """
+        return position or {}
+
+    def step(self, conn: sqlite3.Connection, position: Dict, batch_size: int) -> Tuple[int, Dict]:
+        """
+        Procesa el siguiente lote.
+
+        Returns:
+            Filas procesadas (0 cuando no queda trabajo) y nueva posición
+        """
+        raise NotImplementedError
+
+    def finalize(self, conn: sqlite3.Connection, position: Dict, batch_size: int) -> None:
+        """Completa la migración una vez procesados todos los lotes."""
+
+
+class BatchRewriteMigration(Migration):
+    """
+    Migración que reescribe en sitio las filas de una tabla por rangos de rowid.
+
+    Sirve para cambios de codificación o para rellenar columnas nuevas: las
+    subclases definen ``table``, ``columns`` y ``transform``, y pueden
+    añadir columnas en ``prepare`` con ``add_column``.
+    """
+
+    table: str = "memories"
+    columns: Sequence[str] = ()
+
+    def tables(self, conn: sqlite3.Connection) -> List[str]:
+        return [self.table]
+
+    def transform(self, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Devuelve las columnas modificadas de una fila, o None si no cambia."""
+        raise NotImplementedError
+
+    def add_column(self, conn: sqlite3.Connection, definition: str) -> None:
+        """Añade una columna a la tabla si aún no existe."""
+        name = definition.split()[0]
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({self.table})")}
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {self.table} ADD COLUMN {definition}")
+
+    def step(self, conn: sqlite3.Connection, position: Dict, batch_size: int) -> Tuple[int, Dict]:
+        last_rowid = position.get("last_rowid", 0)
+        rows = conn.execute(
+            f"""
+            SELECT rowid, {", ".join(self.columns)} FROM {self.table}
+            WHERE rowid > ?
+            ORDER BY rowid
+            LIMIT ?
+            """,
+            (last_rowid, batch_size)
+        ).fetchall()
+        if not rows:
+            return 0, position
+
+        for row in rows:
+            changes = self.transform(dict(zip(self.columns, row[1:])))
+            if changes:
+                assignments = ", ".join(f"{column} = ?" for column in changes)
+                conn.execute(
+                    f"UPDATE {self.table} SET {assignments} WHERE rowid = ?",
+                    (*changes.values(), row[0])
+                )
+
+        return len(rows), {**position, "last_rowid": rows[-1][0]}
+
+
+class MigrationRunner:
+    """Aplica migraciones versionadas por lotes, de forma reanudable y regulada."""
+
+    def __init__(
+        self,
+        db_path: Path,
+        migrations: Sequence[Migration],
+        batch_size: int = 1000,
+        max_rows_per_second: Optional[float] = None,
+        pause_seconds: float = 0.0
+    ):
+        """
+        Args:
+            db_path: Ruta de la base de datos
+            migrations: Migraciones disponibles
+            batch_size: Filas por transacción
+            max_rows_per_second: Límite de filas por segundo (None sin límite)
+            pause_seconds: Pausa mínima entre lotes para ceder el lock
+        """
+        self.db_path = Path(db_path)
+        self.migrations = sorted(migrations, key=lambda m: m.version)
+        self.batch_size = batch_size
+        self.max_rows_per_second = max_rows_per_second
+        self.pause_seconds = pause_seconds
+
+        versions = [m.version for m in self.migrations]
+        if len(set(versions)) != len(versions):
+            raise ValueError(f"Versiones de migración duplicadas: {versions}")
+
+    def _connect(self) -> ContextManager[sqlite3.Connection]:
+        return connect(self.db_path, isolation_level=None)
+
+    @contextmanager
+    def _batch(self, migration: Migration, started: int) -> Iterator[sqlite3.Connection]:
+        """
+        Transacción de un lote en su propia conexión.
+
+        Raises:
+            MemoryError: Si la base de datos se sustituyó desde ``started``
+                (una restauración); la posición en memoria ya no vale
+        """
+        with self._connect() as conn:
+            if generation(self.db_path) != started:
+                raise MemoryError(
+                    f"La base de datos se sustituyó durante la migración {migration.name}; "
+                    "vuelve a ejecutar las migraciones para reanudarla"
+                )
+            with _transaction(conn):
+                yield conn
+
+    def _recorded(self, conn: sqlite3.Connection) -> Dict[int, tuple]:
+        """Filas de schema_migrations por versión (vacío si aún no existe)."""
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_migrations'"
+        ).fetchone()
+        if not exists:
+            return {}
+        return {
+            row[0]: row for row in conn.execute(
+                "SELECT version, status, position, rows_done, applied_at FROM schema_migrations"
+            )
+        }
+
+    def status(self) -> List[Dict]:
+        """Estado de cada migración conocida."""
+        with self._connect() as conn:
+            recorded = self._recorded(conn)
+            return [
+                {
+                    "version": m.version,
+                    "name": m.name,
+                    "status": recorded[m.version][1] if m.version in recorded else "pending",
+                    "rows_done": recorded[m.version][3] if m.version in recorded else 0,
+                    "applied_at": recorded[m.version][4] if m.version in recorded else None
+                }
+                for m in self.migrations
+            ]
+
+    def run(self, dry_run: bool = False) -> List[Dict]:
+        """
+        Aplica las migraciones pendientes en orden de versión.
+
+        Args:
+            dry_run: Solo estima duración y espacio adicional, sin cambios
+
+        Returns:
+            Estadísticas (o estimaciones) de cada migración pendiente
+        """
+        with self._connect() as conn:
+            if not dry_run:
+                conn.execute(MIGRATIONS_TABLE)
+            recorded = self._recorded(conn)
+
+        results = []
+        for migration in self.migrations:
+            row = recorded.get(migration.version)
+            if row and row[1] == STATUS_APPLIED:
+                continue
+
+            if row is None:
+                with self._connect() as conn:
+                    needed = migration.is_needed(conn)
+                    if not needed and not dry_run:
+                        self._record_applied(conn, migration, rows_done=0)
+                if not needed:
+                    continue
+
+            if dry_run:
+                with self._connect() as conn:
+                    results.append(self._estimate(conn, migration))
+            else:
+                position = json.loads(row[2]) if row and row[2] else None
+                results.append(self._apply(migration, position))
+        return results
+
+    async def run_in_background(self, dry_run: bool = False) -> List[Dict]:
+        """Ejecuta ``run`` en un hilo aparte sin bloquear el event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.run, dry_run)
+
+    def _record_applied(self, conn: sqlite3.Connection, migration: Migration, rows_done: int) -> None:
+        conn.execute(
+            """
+            INSERT INTO schema_migrations (version, name, status, rows_done, started_at, applied_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(version) DO UPDATE SET
+                status = excluded.status, position = NULL, applied_at = excluded.applied_at
+            """,
+            (migration.version, migration.name, STATUS_APPLIED, rows_done,
+             datetime.now(), datetime.now())
+        )
+
+    def _apply(self, migration: Migration, position: Optional[Dict]) -> Dict:
+        """Aplica una migración desde su posición guardada."""
+        start_time = time.perf_counter()
+        started = generation(self.db_path)
+        logger.info(f"Aplicando migración {migration.version}: {migration.name}")
+
+        with self._batch(migration, started) as conn:
+            position = migration.prepare(conn, position)
+            conn.execute(
+                """
+                INSERT INTO schema_migrations (version, name, status, position, started_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(version) DO UPDATE SET position = excluded.position
+                """,
+                (migration.version, migration.name, STATUS_RUNNING,
+                 json.dumps(position), datetime.now())
+            )
+
+        rows_done = 0
+        batches = 0
+        while True:
+            batch_start = time.perf_counter()
+            with self._batch(migration, started) as conn:
+                rows, position = migration.step(conn, position, self.batch_size)
+                if rows:
+                    conn.execute(
+                        """
+                        UPDATE schema_migrations
+                        SET position = ?, rows_done = rows_done + ?
+                        WHERE version = ?
+                        """,
+                        (json.dumps(position), rows, migration.version)
+                    )
+            if not rows:
+                break
+
+            rows_done += rows
+            batches += 1
+            self._throttle(rows, time.perf_counter() - batch_start)
+
+        with self._batch(migration, started) as conn:
+            migration.finalize(conn, position, self.batch_size)
+            total = conn.execute(
+                "SELECT rows_done FROM schema_migrations WHERE version = ?",
+                (migration.version,)
+            ).fetchone()[0]
+            self._record_applied(conn, migration, rows_done=total)
+
+        stats = {
+            "version": migration.version,
+            "name": migration.name,
+            "rows": rows_done,
+            "batches": batches,
+            "duration": time.perf_counter() - start_time
+        }
+        logger.info(f"Migración {migration.version} aplicada: {stats}")
+        return stats
+
+    def _throttle(self, rows: int, elapsed: float) -> None:
+        """Espera lo necesario para respetar el límite de filas por segundo."""
+        delay = self.pause_seconds
+        if self.max_rows_per_second:
+            delay = max(delay, rows / self.max_rows_per_second - elapsed)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _estimate(self, conn: sqlite3.Connection, migration: Migration) -> Dict:
+        """
+        Estima duración y espacio adicional de una migración.
+
+        Procesa un lote de muestra dentro de una transacción que se
+        deshace para medir el ritmo real sobre esta base de datos.
+        """
+        total_rows = migration.estimate_rows(conn)
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            sample_start = time.perf_counter()
+            position = migration.prepare(conn, None)
+            sample_rows, _ = migration.step(conn, position, self.batch_size)
+            sample_seconds = time.perf_counter() - sample_start
+        finally:
+            conn.execute("ROLLBACK")
+
+        rate = sample_rows / sample_seconds if sample_rows and sample_seconds else None
+        if rate and self.max_rows_per_second:
+            rate = min(rate, self.max_rows_per_second)
+
+        batches = -(-total_rows // self.batch_size) if total_rows else 0
+        duration = total_rows / rate if rate else 0.0
+        duration += batches * self.pause_seconds
+
+        table_bytes = sum(_table_bytes(conn, table) for table in migration.tables(conn))
+        if migration.copies_tables:
+            overhead = table_bytes
+        else:
+            # Journal de un lote reescrito
+            overhead = table_bytes * min(self.batch_size / total_rows, 1.0) if total_rows else 0
+
+        return {
+            "version": migration.version,
+            "name": migration.name,
+            "rows": total_rows,
+            "batches": batches,
+            "rows_per_second": rate,
+            "estimated_seconds": duration,
+            "estimated_disk_overhead_bytes": int(overhead)
+        }
+
+
+@contextmanager
+def _transaction(conn: sqlite3.Connection):
+    """Transacción BEGIN IMMEDIATE que se deshace si hay una excepción."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _table_bytes(conn: sqlite3.Connection, table: str) -> int:
+    """Bytes que ocupan una tabla y sus índices."""
+    try:
+        return conn.execute(
+            """
+            SELECT COALESCE(SUM(pgsize), 0) FROM dbstat
+            WHERE name IN (SELECT name FROM sqlite_master WHERE tbl_name = ?)
+            """,
+            (table,)
+        ).fetchone()[0]
+    except sqlite3.OperationalError:
+        # SQLite compilado sin dbstat: cota superior con el archivo completo
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        return page_size * page_count
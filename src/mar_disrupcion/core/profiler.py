@@ -0,0 +1,271 @@
+"""
+Perfilador por muestreo activable en caliente.
+
+Mientras está activo, un hilo toma cada ``interval`` segundos las pilas de
+los hilos de interés con ``sys._current_frames()``: los hilos de los bucles
+de eventos registrados y los trabajadores de los ``ThreadPoolExecutor``
+(incluido el executor por defecto de asyncio). Al terminar la ventana
+escribe las pilas en formato colapsado (``marco;marco;marco N``), que
+``flamegraph.pl`` o speedscope convierten en un flamegraph.
+
+Inactivo no hay muestreo ni hook de trazado: como mucho queda un hilo
+bloqueado a la espera de la señal. Se activa con ``SIGUSR2`` (una segunda
+señal lo detiene antes de tiempo) o arrancando el proceso con
+``MAR_PROFILE=<segundos>``; ``MAR_PROFILE_DIR`` elige el directorio de
+salida.
+"""
+import logging
+import os
+import re
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Set, Union
+
+logger = logging.getLogger(__name__)
+
+ENV_VAR = "MAR_PROFILE"
+ENV_DIR = "MAR_PROFILE_DIR"
+
+DEFAULT_INTERVAL = 0.005
+DEFAULT_DURATION = 30.0
+DEFAULT_OUTPUT_DIR = "profiles"
+
+# SIGUSR2 no existe en Windows; allí solo sirve la variable de entorno
+DEFAULT_SIGNAL = getattr(signal, "SIGUSR2", None)
+
+# ThreadPoolExecutor sin prefijo nombra sus hilos "ThreadPoolExecutor-N_M";
+# el executor por defecto de asyncio, "asyncio_M"
+DEFAULT_THREAD_PREFIXES = ("ThreadPoolExecutor", "asyncio_")
+
+# Cada cuántos segundos se buscan hilos nuevos (los executors los crean a demanda)
+THREAD_REFRESH_SECONDS = 0.1
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    path = Path(code.co_filename)
+    return f"{code.co_name} ({path.parent.name}/{path.name}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame) -> str:
+    """Pila de un marco en formato colapsado, de la raíz al marco."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def _thread_label(name: str) -> str:
+    # Los trabajadores de un mismo executor se agrupan en una sola raíz
+    return re.sub(r"_\d+$", "", name).replace(";", ":")
+
+
+class SamplingProfiler:
+    """Muestrea las pilas de los hilos del sistema durante una ventana de tiempo."""
+
+    def __init__(
+        self,
+        output_dir: Union[str, Path] = DEFAULT_OUTPUT_DIR,
+        interval: float = DEFAULT_INTERVAL,
+        duration: float = DEFAULT_DURATION,
+        thread_prefixes: Iterable[str] = DEFAULT_THREAD_PREFIXES
+    ):
+        """
+        Args:
+            output_dir: Directorio de los archivos de pilas colapsadas
+            interval: Segundos entre muestras
+            duration: Ventana por defecto de cada perfilado
+            thread_prefixes: Prefijos de nombre de los hilos de executors a muestrear
+        """
+        self.output_dir = Path(output_dir)
+        self.interval = interval
+        self.duration = duration
+        self.thread_prefixes = tuple(thread_prefixes)
+        self.last_result: Optional[Dict[str, Any]] = None
+        self._loop_threads: Set[int] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._toggle_requested = threading.Event()
+        self._listener: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def add_thread(self, thread: Optional[threading.Thread] = None) -> None:
+        """Registra el hilo de un bucle de eventos (por defecto el actual)."""
+        self._loop_threads.add((thread or threading.current_thread()).ident)
+
+    def start(self, duration: Optional[float] = None) -> bool:
+        """
+        Empieza a muestrear durante ``duration`` segundos.
+
+        Returns:
+            False si ya había un perfilado en curso
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(self.duration if duration is None else duration,),
+                name="sampling-profiler",
+                daemon=True
+            )
+            self._thread.start()
+        return True
+
+    def stop(self) -> Optional[Dict[str, Any]]:
+        """Detiene el perfilado en curso, espera a que se escriba y devuelve su resultado."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        return self.last_result
+
+    def toggle(self) -> None:
+        """Arranca el perfilado o detiene el que está en curso sin esperar a que se escriba."""
+        if self.running:
+            self._stop.set()
+        else:
+            self.start()
+
+    def listen(self) -> None:
+        """
+        Arranca el hilo que atiende ``request_toggle``.
+
+        Debe llamarse antes de instalar el manejador de señales: el
+        manejador solo marca la petición y este hilo la ejecuta.
+        """
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(
+                target=self._listen,
+                name="sampling-profiler-trigger",
+                daemon=True
+            )
+            self._listener.start()
+
+    def request_toggle(self) -> None:
+        """Pide alternar el perfilado; solo marca un evento, así que sirve en un manejador de señales."""
+        self._toggle_requested.set()
+
+    def _listen(self) -> None:
+        while True:
+            self._toggle_requested.wait()
+            self._toggle_requested.clear()
+            self.toggle()
+
+    def _targets(self) -> Dict[int, str]:
+        """Hilos a muestrear y la raíz de sus pilas."""
+        own = threading.get_ident()
+        return {
+            thread.ident: _thread_label(thread.name)
+            for thread in threading.enumerate()
+            if thread.ident != own and (
+                thread.ident in self._loop_threads or thread.name.startswith(self.thread_prefixes)
+            )
+        }
+
+    def _run(self, duration: float) -> None:
+        started = time.monotonic()
+        deadline = started + duration
+        counts: Counter = Counter()
+        samples = 0
+        targets = self._targets()
+        refreshed = started
+        logger.info(f"Perfilado por muestreo iniciado ({duration:.0f} s, {len(targets)} hilos)")
+
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            now = time.monotonic()
+            if now - refreshed >= THREAD_REFRESH_SECONDS:
+                targets = self._targets()
+                refreshed = now
+            frames = sys._current_frames()
+            for ident, label in targets.items():
+                frame = frames.get(ident)
+                if frame is not None:
+                    counts[f"{label};{collapse_stack(frame)}"] += 1
+            # Sin referencias a los marcos entre muestras
+            frames = frame = None
+            samples += 1
+
+        try:
+            self.last_result = self._write(counts, samples, time.monotonic() - started)
+        except OSError as e:
+            logger.error(f"Error escribiendo el perfil: {e}")
+            self.last_result = None
+
+    def _write(self, counts: Counter, samples: int, elapsed: float) -> Dict[str, Any]:
+        """Escribe las pilas colapsadas, de la más frecuente a la menos."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / f"profile-{datetime.now():%Y%m%d-%H%M%S-%f}-{os.getpid()}.folded"
+        path.write_text("".join(f"{stack} {count}\n" for stack, count in counts.most_common()))
+        logger.info(f"Perfil escrito en {path}: {samples} muestras en {elapsed:.1f} s")
+        return {
+            "path": str(path),
+            "samples": samples,
+            "stacks": len(counts),
+            "elapsed": elapsed,
+            "threads": sorted({stack.split(";", 1)[0] for stack in counts})
+        }
+
+
+def install_profiler(
+    loop_thread: Optional[threading.Thread] = None,
+    output_dir: Optional[Union[str, Path]] = None,
+    signum: Optional[int] = DEFAULT_SIGNAL,
+    environ: Optional[Dict[str, str]] = None,
+    **options
+) -> SamplingProfiler:
+    """
+    Crea el perfilador del proceso y sus disparadores.
+
+    Con ``signum`` la señal alterna el perfilado (solo puede instalarse
+    desde el hilo principal): el manejador marca la petición y un hilo en
+    espera arranca o detiene el muestreo. Si ``MAR_PROFILE`` está definida, el
+    perfilado empieza ya con esa duración en segundos (``1``/``true`` usa la
+    duración por defecto).
+
+    Args:
+        loop_thread: Hilo del bucle de eventos (por defecto el actual)
+        output_dir: Directorio de salida (por defecto ``MAR_PROFILE_DIR`` o ``profiles``)
+        signum: Señal que alterna el perfilado (None para no instalarla)
+        environ: Variables de entorno (por defecto las del proceso)
+        **options: Argumentos adicionales de ``SamplingProfiler``
+    """
+    environ = os.environ if environ is None else environ
+    profiler = SamplingProfiler(
+        output_dir=output_dir or environ.get(ENV_DIR, DEFAULT_OUTPUT_DIR),
+        **options
+    )
+    profiler.add_thread(loop_thread)
+
+    if signum is not None:
+        if threading.current_thread() is threading.main_thread():
+            profiler.listen()
+            signal.signal(signum, lambda received, frame: profiler.request_toggle())
+            logger.info(f"Perfilador por muestreo disponible con la señal {signal.Signals(signum).name}")
+        else:
+            logger.warning("El perfilador solo instala su señal desde el hilo principal")
+
+    value = environ.get(ENV_VAR, "").strip().lower()
+    if value and value not in ("0", "false", "no", "off"):
+        duration = None
+        if value not in ("1", "true", "yes", "on"):
+            try:
+                duration = float(value)
+            except ValueError:
+                logger.warning(f"{ENV_VAR}={value!r} no es una duración; se usa {profiler.duration} s")
+        profiler.start(duration)
+
+    return profiler
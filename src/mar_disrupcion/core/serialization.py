@@ -0,0 +1,106 @@
+"""
+Serialización binaria de valores para el caché distribuido.
+"""
+import json
+import zlib
+from typing import Any
+
+import msgpack
+import numpy as np
+
+# Cabecera de cada valor: byte de versión seguido de un byte de flags.
+# Los valores JSON heredados empiezan por un carácter imprimible, nunca
+# por el byte de versión, lo que permite leerlos durante la migración.
+FORMAT_VERSION = 0x01
+FLAG_ZLIB = 0x01
+
+# Código de tipo extendido de msgpack para arrays de NumPy
+EXT_NDARRAY = 1
+
+
+def _encode_ext(obj: Any) -> Any:
+    """Codifica tipos no nativos de msgpack."""
+    if isinstance(obj, np.ndarray):
+        array = np.ascontiguousarray(obj)
+        return msgpack.ExtType(
+            EXT_NDARRAY,
+            msgpack.packb(
+                (array.dtype.str, array.shape, array.tobytes()),
+                use_bin_type=True
+            )
+        )
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Tipo no serializable: {type(obj).__name__}")
+
+
+def _decode_ext(code: int, data: bytes) -> Any:
+    """Decodifica tipos extendidos de msgpack."""
+    if code == EXT_NDARRAY:
+        dtype, shape, buffer = msgpack.unpackb(data, raw=False)
+        return np.frombuffer(buffer, dtype=np.dtype(dtype)).reshape(shape).copy()
+    return msgpack.ExtType(code, data)
+
+
+class CacheSerializer:
+    """Interfaz de serialización de valores del caché."""
+
+    def dumps(self, value: Any) -> bytes:
+        """Serializa un valor a bytes."""
+        raise NotImplementedError
+
+    def loads(self, data: bytes) -> Any:
+        """Deserializa un valor desde bytes."""
+        raise NotImplementedError
+
+
+class MsgpackSerializer(CacheSerializer):
+    """
+    Serializador msgpack con compresión y soporte de arrays de NumPy.
+
+    Los valores se guardan como bytes crudos con una cabecera de versión.
+    Las cargas útiles mayores que ``compress_threshold`` se comprimen con
+    zlib cuando eso reduce su tamaño. Los valores sin cabecera se
+    interpretan como JSON heredado.
+    """
+
+    def __init__(self, compress_threshold: int = 1024, compression_level: int = 1):
+        """
+        Inicializa el serializador.
+
+        Args:
+            compress_threshold: Tamaño en bytes a partir del cual se comprime
+            compression_level: Nivel de compresión zlib (1-9)
+        """
+        self.compress_threshold = compress_threshold
+        self.compression_level = compression_level
+
+    def dumps(self, value: Any) -> bytes:
+        """Serializa un valor a bytes con cabecera de versión."""
+        payload = msgpack.packb(value, default=_encode_ext, use_bin_type=True)
+        flags = 0
+
+        if len(payload) >= self.compress_threshold:
+            compressed = zlib.compress(payload, self.compression_level)
+            if len(compressed) < len(payload):
+                payload = compressed
+                flags |= FLAG_ZLIB
+
+        return bytes((FORMAT_VERSION, flags)) + payload
+
+    def loads(self, data: bytes) -> Any:
+        """Deserializa un valor, aceptando también JSON heredado."""
+        if not data or data[0] != FORMAT_VERSION:
+            return json.loads(data)
+
+        flags = data[1]
+        payload = memoryview(data)[2:]
+        if flags & FLAG_ZLIB:
+            payload = zlib.decompress(payload)
+
+        return msgpack.unpackb(
+            payload,
+            ext_hook=_decode_ext,
+            raw=False,
+            strict_map_key=False
+        )
@@ -0,0 +1,374 @@
+"""
+Conexiones SQLite con perfiles de ajuste de almacenamiento.
+
+Todos los subsistemas de memoria abren sus conexiones con ``connect``, que
+aplica los PRAGMA del perfil activo (``journal_mode``, ``synchronous``,
+``cache_size``, ``mmap_size``, ``temp_store``) y cierra la conexión al
+salir del bloque ``with``. ``quiesce`` detiene esas conexiones mientras se
+sustituye el archivo de la base de datos (restauraciones); los dueños de
+conexiones largas de ``open_connection`` trabajan dentro de ``gated``.
+
+Perfiles incluidos:
+
+- ``durable``: WAL con ``synchronous=FULL``; ninguna transacción confirmada
+  se pierde aunque se corte la alimentación.
+- ``balanced``: WAL con ``synchronous=NORMAL``; resiste caídas del proceso,
+  y un corte de alimentación solo puede perder las últimas transacciones.
+- ``throughput``: WAL sin sincronización y cachés grandes; para cargas
+  reconstruibles o entornos con respaldo continuo.
+
+``python -m src.mar_disrupcion.core.storage --dir <directorio>`` mide los
+perfiles en el disco de destino (ver ``autotune``).
+"""
+import os
+import sqlite3
+import logging
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# cache_size negativo se expresa en KiB; mmap_size en bytes
+STORAGE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "durable": {
+        "journal_mode": "wal",
+        "synchronous": "full",
+        "cache_size": -16384,
+        "mmap_size": 0,
+        "temp_store": "default",
+        "busy_timeout": 5000
+    },
+    "balanced": {
+        "journal_mode": "wal",
+        "synchronous": "normal",
+        "cache_size": -65536,
+        "mmap_size": 268435456,
+        "temp_store": "memory",
+        "busy_timeout": 5000
+    },
+    "throughput": {
+        "journal_mode": "wal",
+        "synchronous": "off",
+        "cache_size": -262144,
+        "mmap_size": 1073741824,
+        "temp_store": "memory",
+        "busy_timeout": 5000
+    }
+}
+
+DEFAULT_PROFILE = "balanced"
+
+# busy_timeout se aplica primero para que el cambio de journal_mode espere
+# a otras conexiones en lugar de fallar
+PRAGMA_ORDER = ("busy_timeout", "journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store")
+
+_active_profile: Dict[str, Any] = dict(STORAGE_PROFILES[DEFAULT_PROFILE], name=DEFAULT_PROFILE)
+
+
+def configure_storage(
+    profile: str = DEFAULT_PROFILE,
+    profiles: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Selecciona el perfil de almacenamiento de todas las conexiones nuevas.
+
+    Args:
+        profile: Nombre del perfil
+        profiles: Perfiles definidos en la configuración; sus valores
+            sustituyen a los de los perfiles incluidos con el mismo nombre
+
+    Returns:
+        Ajustes del perfil activo
+    """
+    global _active_profile
+
+    settings = resolve_profile(profile, profiles)
+    _active_profile = settings
+    logger.info(f"Perfil de almacenamiento activo: {settings}")
+    return dict(settings)
+
+
+def resolve_profile(
+    profile: str,
+    profiles: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """Ajustes de un perfil combinando los incluidos con los configurados."""
+    settings = dict(STORAGE_PROFILES.get(profile, {}))
+    settings.update((profiles or {}).get(profile, {}))
+    if not settings:
+        raise ValueError(f"Perfil de almacenamiento desconocido: {profile}")
+    settings["name"] = profile
+    return settings
+
+
+class _ConnectionGate:
+    """Cuenta las conexiones de ``connect`` a una base de datos y puede detener las nuevas."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._active = 0
+        self._closed = False
+        # Cambia cada vez que se reabre tras ``quiesce``
+        self.generation = 0
+
+    def enter(self) -> None:
+        with self._condition:
+            self._condition.wait_for(lambda: not self._closed)
+            self._active += 1
+
+    def exit(self) -> None:
+        with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+    def close(self, timeout: float) -> None:
+        with self._condition:
+            self._condition.wait_for(lambda: not self._closed)
+            self._closed = True
+            if not self._condition.wait_for(lambda: self._active == 0, timeout):
+                self._closed = False
+                self._condition.notify_all()
+                raise TimeoutError(f"{self._active} conexiones siguen abiertas tras {timeout} s")
+
+    def open(self) -> None:
+        with self._condition:
+            self._closed = False
+            self.generation += 1
+            self._condition.notify_all()
+
+
+_gates: Dict[str, _ConnectionGate] = {}
+_gates_lock = threading.Lock()
+
+
+def _gate(db_path: Union[str, Path]) -> _ConnectionGate:
+    """Control de conexiones de una base de datos, por ruta absoluta."""
+    key = os.path.realpath(str(db_path))
+    with _gates_lock:
+        return _gates.setdefault(key, _ConnectionGate())
+
+
+def active_profile() -> Dict[str, Any]:
+    """Ajustes del perfil activo."""
+    return dict(_active_profile)
+
+
+def apply_pragmas(conn: sqlite3.Connection, profile: Optional[Dict[str, Any]] = None) -> None:
+    """Aplica los PRAGMA de un perfil (por defecto el activo) a una conexión."""
+    settings = profile or _active_profile
+    for pragma in PRAGMA_ORDER:
+        if pragma in settings:
+            conn.execute(f"PRAGMA {pragma} = {settings[pragma]}").fetchall()
+
+
+def open_connection(
+    db_path: Union[str, Path],
+    profile: Optional[Dict[str, Any]] = None,
+    **kwargs
+) -> sqlite3.Connection:
+    """Abre una conexión con los PRAGMA del perfil aplicados; el llamador la cierra."""
+    conn = sqlite3.connect(str(db_path), **kwargs)
+    try:
+        apply_pragmas(conn, profile)
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+
+@contextmanager
+def connect(
+    db_path: Union[str, Path],
+    profile: Optional[Dict[str, Any]] = None,
+    **kwargs
+) -> Iterator[sqlite3.Connection]:
+    """
+    Conexión con el perfil de almacenamiento para usar en un bloque ``with``.
+
+    Igual que ``with sqlite3.connect(...)``, confirma la transacción al
+    salir del bloque o la deshace si hay una excepción, y además cierra la
+    conexión.
+    """
+    gate = _gate(db_path)
+    gate.enter()
+    try:
+        conn = open_connection(db_path, profile, **kwargs)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    finally:
+        gate.exit()
+
+
+def generation(db_path: Union[str, Path]) -> int:
+    """Número de veces que se ha detenido la base de datos con ``quiesce``."""
+    return _gate(db_path).generation
+
+
+@contextmanager
+def gated(db_path: Union[str, Path]) -> Iterator[int]:
+    """
+    Bloque de trabajo con conexiones de ``open_connection`` que ``quiesce`` espera.
+
+    Cuenta como una conexión de ``connect`` mientras dura el bloque. Una
+    conexión que sigue abierta tras ``quiesce`` puede apuntar al archivo
+    sustituido: el valor del bloque es la generación actual (ver
+    ``generation``), y si difiere de la de su apertura el dueño debe
+    reabrirla.
+    """
+    gate = _gate(db_path)
+    gate.enter()
+    try:
+        yield gate.generation
+    finally:
+        gate.exit()
+
+
+@contextmanager
+def quiesce(db_path: Union[str, Path], timeout: float = 30.0) -> Iterator[None]:
+    """
+    Detiene las conexiones a una base de datos durante el bloque ``with``.
+
+    Las llamadas nuevas a ``connect`` y ``gated`` esperan hasta salir del
+    bloque, y al entrar se espera a que terminen las abiertas. Las
+    conexiones de ``open_connection`` usadas fuera de ``gated`` no se
+    cuentan. Dentro del bloque el llamador debe usar ``open_connection`` o
+    ``sqlite3``.
+
+    Raises:
+        TimeoutError: Si las conexiones abiertas no se cierran en ``timeout``
+    """
+    gate = _gate(db_path)
+    gate.close(timeout)
+    try:
+        yield
+    finally:
+        gate.open()
+
+
+def _benchmark_profile(db_path: Path, settings: Dict[str, Any], rows: int, batch_size: int) -> Dict[str, Any]:
+    """Ejecuta la carga de prueba de autotune con un perfil."""
+    from .memory_schema import apply_schema, HOT_QUERIES
+
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+
+    payload = os.urandom(512)
+    categories = ["security", "network", "analysis", "system"]
+    commit_latencies: List[float] = []
+    read_latencies: List[float] = []
+    retrieve_sql, _ = HOT_QUERIES["retrieve_by_category"]
+
+    conn = open_connection(db_path, settings, isolation_level=None)
+    try:
+        apply_schema(conn)
+        start = time.perf_counter()
+        for i in range(rows):
+            now = datetime.now()
+            # Inserción individual, como store_memory
+            t0 = time.perf_counter()
+            conn.execute("BEGIN")
+            conn.execute(
+                """
+                INSERT INTO memories
+                (category, content, importance, timestamp, last_accessed, access_count, embedding)
+                VALUES (?, ?, ?, ?, ?, 0, ?)
+                """,
+                (categories[i % len(categories)], payload, (i % 100) / 100, now, now, payload)
+            )
+            conn.execute("COMMIT")
+            commit_latencies.append(time.perf_counter() - t0)
+
+            # Una lectura por cada lote de escrituras
+            if i % batch_size == 0:
+                t0 = time.perf_counter()
+                conn.execute(retrieve_sql, (categories[i % len(categories)], 0.5, "1970-01-01", 10)).fetchall()
+                read_latencies.append(time.perf_counter() - t0)
+
+        duration = time.perf_counter() - start
+    finally:
+        conn.close()
+
+    commit_latencies.sort()
+    return {
+        "profile": settings["name"],
+        "rows": rows,
+        "duration": duration,
+        "rows_per_second": rows / duration if duration else 0.0,
+        "commit_p50_ms": commit_latencies[len(commit_latencies) // 2] * 1000,
+        "commit_p99_ms": commit_latencies[int(len(commit_latencies) * 0.99)] * 1000,
+        "read_avg_ms": sum(read_latencies) / len(read_latencies) * 1000 if read_latencies else 0.0,
+        "file_bytes": db_path.stat().st_size
+    }
+
+
+def autotune(
+    directory: Union[str, Path],
+    profiles: Optional[Dict[str, Dict[str, Any]]] = None,
+    rows: int = 5000,
+    batch_size: int = 100
+) -> List[Dict[str, Any]]:
+    """
+    Mide cada perfil de almacenamiento en el disco de destino.
+
+    Ejecuta en ``directory`` una carga de escrituras individuales con
+    lecturas intercaladas, parecida a la del sistema de memoria, sobre una
+    base de datos temporal que se elimina al terminar.
+
+    Args:
+        directory: Directorio en el disco donde vivirá la base de datos
+        profiles: Perfiles definidos en la configuración
+        rows: Memorias escritas por perfil
+        batch_size: Escrituras entre cada lectura
+
+    Returns:
+        Resultados por perfil, del más rápido al más lento
+    """
+    names = list(dict.fromkeys([*STORAGE_PROFILES, *(profiles or {})]))
+    results = []
+    with tempfile.TemporaryDirectory(dir=str(directory), prefix="storage_autotune_") as tmp:
+        for name in names:
+            settings = resolve_profile(name, profiles)
+            result = _benchmark_profile(Path(tmp) / f"{name}.db", settings, rows, batch_size)
+            logger.info(f"Autotune {name}: {result['rows_per_second']:.0f} filas/s")
+            results.append(result)
+
+    return sorted(results, key=lambda r: r["rows_per_second"], reverse=True)
+
+
+def format_autotune(results: List[Dict[str, Any]]) -> str:
+    """Tabla de texto con los resultados de autotune."""
+    lines = [
+        f"{'perfil':<12}{'filas/s':>10}{'commit p50 ms':>15}{'commit p99 ms':>15}{'lectura ms':>12}"
+    ]
+    for r in results:
+        lines.append(
+            f"{r['profile']:<12}{r['rows_per_second']:>10.0f}{r['commit_p50_ms']:>15.3f}"
+            f"{r['commit_p99_ms']:>15.3f}{r['read_avg_ms']:>12.3f}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mide los perfiles de almacenamiento SQLite en un disco")
+    parser.add_argument("--dir", default="memory", help="Directorio del disco a medir")
+    parser.add_argument("--rows", type=int, default=5000, help="Memorias escritas por perfil")
+    parser.add_argument("--config", default=None, help="config.toml con perfiles [storage.profiles]")
+    args = parser.parse_args()
+
+    configured = None
+    if args.config:
+        import toml
+        configured = toml.load(args.config).get("storage", {}).get("profiles")
+
+    Path(args.dir).mkdir(parents=True, exist_ok=True)
+    print(format_autotune(autotune(args.dir, configured, rows=args.rows)))
@@ -0,0 +1,619 @@
+"""
+Archivado continuo del WAL para recuperación a un instante dado.
+
+El archivador mantiene abierta una transacción de lectura que impide que
+SQLite reinicie el WAL, y en cada ciclo copia al archivo los frames
+confirmados desde el ciclo anterior como un segmento. Cuando el WAL supera
+``segment_bytes`` lo vacía: con el bloqueo de escritura copia los últimos
+frames y hace un checkpoint, y después una escritura propia en
+``wal_archive_state`` reinicia el WAL sin que quede ningún frame por copiar.
+
+Los frames se aceptan solo si sus salts son los de la cabecera y su
+checksum acumulado coincide (el mismo que comprueba SQLite al recuperar el
+WAL), así que un commit escrito a medias nunca llega al archivo.
+
+Si otra conexión reinicia el WAL, la nueva generación es continua cuando el
+primer salt avanzó en uno (SQLite lo incrementa en cada reinicio) y la
+generación anterior no creció más allá de lo archivado: su siguiente frame
+no sigue en el archivo con los salts antiguos.
+
+Los segmentos se agrupan en cadenas. Cada cadena empieza con un backup base
+incremental; los segmentos de la cadena contienen todas las páginas
+escritas desde antes de empezar el backup base. Si se detecta un reinicio
+del WAL que no hizo el archivador, la cadena se cierra y se empieza otra
+con un nuevo backup base.
+
+Reaplicar los frames de un segmento es reescribir páginas completas, así
+que reproducir los segmentos desde el inicio de la cadena sobre el backup
+base da el estado de la base de datos al final del último segmento
+aplicado, siempre que ese final sea posterior al backup base.
+"""
+import asyncio
+import json
+import logging
+import os
+import struct
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .storage import gated, open_connection
+
+logger = logging.getLogger(__name__)
+
+# Cabecera del WAL: magic, versión, tamaño de página, secuencia de
+# checkpoint, salts y checksum
+WAL_HEADER = struct.Struct(">8I")
+# Cabecera de cada frame: página, tamaño de la base de datos tras el commit
+# (0 si no es un commit), salts y checksum
+FRAME_HEADER = struct.Struct(">6I")
+
+# Magic del WAL con checksums en little-endian; el bit bajo a 1 indica big-endian
+WAL_MAGIC = 0x377F0682
+
+# Bytes de la cabecera del WAL y de cada frame que cubre el checksum
+WAL_HEADER_CHECKSUMMED = 24
+FRAME_HEADER_CHECKSUMMED = 8
+
+# Frames cuyo checksum se calcula de una vez
+CHECKSUM_BLOCK_FRAMES = 256
+
+_MASK = 0xFFFFFFFF
+
+CHAIN_PREFIX = "chain_"
+CHAIN_FILE = "chain.json"
+SEGMENT_SUFFIX = ".walseg"
+
+# Tabla en la que el archivador escribe para reiniciar el WAL
+STATE_TABLE = "wal_archive_state"
+
+
+def wal_checksum(data: bytes, checksum: Tuple[int, int], big_endian: bool) -> Tuple[int, int]:
+    """
+    Checksum de SQLite de ``data`` a partir de un checksum anterior.
+
+    Suma las palabras de 32 bits de dos en dos, en el orden de bytes que
+    indica el magic de la cabecera del WAL.
+    """
+    s0, s1 = checksum
+    words = struct.unpack(f"{'>' if big_endian else '<'}{len(data) // 4}I", data)
+    for x, y in zip(words[::2], words[1::2]):
+        s0 = (s0 + x + s1) & _MASK
+        s1 = (s1 + y + s0) & _MASK
+    return s0, s1
+
+
+@lru_cache(maxsize=8)
+def _frame_coefficients(page_size: int) -> Tuple[np.ndarray, Tuple[Tuple[int, int], Tuple[int, int]]]:
+    """
+    Coeficientes del checksum de un frame.
+
+    Cada par de palabras (x, y) transforma el checksum (s0, s1) de forma
+    lineal: ``(s0, s1) -> M (s0, s1) + N (x, y)`` con M = [[1, 1], [1, 2]]
+    y N = [[1, 0], [1, 1]]. El checksum tras un frame de n pares es
+    ``M^n s + Σ M^(n-1-k) N u_k``; los coeficientes solo dependen del
+    tamaño de página. Las operaciones en uint64 desbordan módulo 2^64, que
+    es compatible con el módulo 2^32 del checksum.
+
+    Returns:
+        (coeficientes de cada par, M^n)
+    """
+    pairs = (FRAME_HEADER_CHECKSUMMED + page_size) // 8
+    step = np.array([[1, 1], [1, 2]], dtype=np.uint64)
+    inputs = np.array([[1, 0], [1, 1]], dtype=np.uint64)
+    coefficients = np.empty((pairs, 2, 2), dtype=np.uint64)
+    power = np.eye(2, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for k in range(pairs - 1, -1, -1):
+            coefficients[k] = power @ inputs
+            power = power @ step
+    power = power & _MASK
+    return coefficients, ((int(power[0, 0]), int(power[0, 1])), (int(power[1, 0]), int(power[1, 1])))
+
+
+def _frame_terms(frames: np.ndarray, page_size: int, big_endian: bool) -> np.ndarray:
+    """Aportación de las palabras de cada frame a su checksum, sin el checksum anterior."""
+    covered = np.concatenate(
+        [frames[:, :FRAME_HEADER_CHECKSUMMED], frames[:, FRAME_HEADER.size:]],
+        axis=1
+    )
+    words = covered.view(">u4" if big_endian else "<u4").astype(np.uint64)
+    coefficients, _ = _frame_coefficients(page_size)
+    with np.errstate(over="ignore"):
+        terms = np.einsum("kij,fkj->fi", coefficients, words.reshape(len(frames), -1, 2))
+    return terms & _MASK
+
+
+def read_wal_header(wal_path: Path) -> Optional[Dict]:
+    """Cabecera del WAL, o None si no existe, está vacío o no es válida."""
+    try:
+        with open(wal_path, "rb") as f:
+            raw = f.read(WAL_HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(raw) < WAL_HEADER.size:
+        return None
+    magic, _, page_size, ckpt_seq, salt1, salt2, checksum1, checksum2 = WAL_HEADER.unpack(raw)
+    if magic & ~1 != WAL_MAGIC:
+        return None
+    big_endian = bool(magic & 1)
+    checksum = (checksum1, checksum2)
+    if wal_checksum(raw[:WAL_HEADER_CHECKSUMMED], (0, 0), big_endian) != checksum:
+        return None
+    return {
+        "page_size": page_size,
+        "ckpt_seq": ckpt_seq,
+        "salts": (salt1, salt2),
+        "checksum": checksum,
+        "big_endian": big_endian
+    }
+
+
+def scan_frames(
+    data: bytes,
+    page_size: int,
+    salts: Tuple[int, int],
+    checksum: Tuple[int, int],
+    big_endian: bool
+) -> Tuple[int, int, Tuple[int, int]]:
+    """
+    Recorre los frames de una generación del WAL.
+
+    Se detiene en el primer frame incompleto, con salts de otra generación
+    (restos de un WAL anterior más largo) o cuyo checksum acumulado no
+    coincide (escrito a medias).
+
+    Args:
+        data: Frames desde una posición de la generación
+        page_size: Tamaño de página
+        salts: Salts de la generación
+        checksum: Checksum acumulado hasta esa posición (el de la cabecera
+            para el primer frame)
+        big_endian: Orden de bytes del checksum según el magic
+
+    Returns:
+        (bytes de frames de la generación, bytes hasta su último commit,
+        checksum acumulado hasta ese commit)
+    """
+    frame_size = FRAME_HEADER.size + page_size
+    count = len(data) // frame_size
+    extent = committed = 0
+    committed_checksum = checksum
+    s0, s1 = checksum
+    (m00, m01), (m10, m11) = _frame_coefficients(page_size)[1]
+    for first in range(0, count, CHECKSUM_BLOCK_FRAMES):
+        block = min(CHECKSUM_BLOCK_FRAMES, count - first)
+        frames = np.frombuffer(data, np.uint8, block * frame_size, first * frame_size).reshape(block, frame_size)
+        terms = _frame_terms(frames, page_size, big_endian).tolist()
+        for index, (t0, t1) in enumerate(terms):
+            offset = (first + index) * frame_size
+            _, db_size, salt1, salt2, checksum1, checksum2 = FRAME_HEADER.unpack_from(data, offset)
+            if (salt1, salt2) != salts:
+                return extent, committed, committed_checksum
+            s0, s1 = (m00 * s0 + m01 * s1 + t0) & _MASK, (m10 * s0 + m11 * s1 + t1) & _MASK
+            if (s0, s1) != (checksum1, checksum2):
+                return extent, committed, committed_checksum
+            extent = offset + frame_size
+            if db_size:
+                committed = extent
+                committed_checksum = (s0, s1)
+    return extent, committed, committed_checksum
+
+
+def replay_segments(db_path: Path, segments: List[Path], page_size: int) -> int:
+    """
+    Aplica los frames de los segmentos a un archivo de base de datos.
+
+    Las páginas de cada transacción se escriben al llegar a su frame de
+    commit, que además fija el tamaño del archivo.
+
+    Returns:
+        Transacciones aplicadas
+    """
+    frame_size = FRAME_HEADER.size + page_size
+    transactions = 0
+    with open(db_path, "r+b") as db:
+        for segment in segments:
+            data = segment.read_bytes()
+            pending = []
+            for offset in range(0, len(data) - frame_size + 1, frame_size):
+                pgno, db_size, _, _, _, _ = FRAME_HEADER.unpack_from(data, offset)
+                pending.append((pgno, offset + FRAME_HEADER.size))
+                if db_size:
+                    for page, start in pending:
+                        db.seek((page - 1) * page_size)
+                        db.write(data[start:start + page_size])
+                    db.truncate(db_size * page_size)
+                    pending = []
+                    transactions += 1
+        db.flush()
+        os.fsync(db.fileno())
+    return transactions
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Escribe un archivo en ``.partial``, lo sincroniza y lo renombra."""
+    partial = path.with_name(path.name + ".partial")
+    with open(partial, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(partial, path)
+
+
+def recovery_plan(archive_dir: Path, backup_dir: Path, timestamp: datetime) -> Tuple[Path, List[Path], int]:
+    """
+    Backup base y segmentos con los que reconstruir la base de datos.
+
+    Elige la cadena más reciente cuyo backup base terminó antes de
+    ``timestamp`` y los segmentos capturados hasta ``timestamp``; como
+    mínimo, los necesarios para pasar el final del backup base.
+
+    Returns:
+        (manifiesto del backup base, segmentos en orden, tamaño de página)
+
+    Raises:
+        ValueError: Si no hay ningún backup base anterior a ``timestamp``
+    """
+    target_ms = int(timestamp.timestamp() * 1000)
+    for chain_dir in sorted(archive_dir.glob(CHAIN_PREFIX + "*"), reverse=True):
+        chain_file = chain_dir / CHAIN_FILE
+        if not chain_file.exists():
+            continue
+        chain = json.loads(chain_file.read_text())
+        if chain.get("base") is None or chain["base_completed_ms"] > target_ms:
+            continue
+
+        segments = []
+        for segment in sorted(chain_dir.glob("*" + SEGMENT_SUFFIX)):
+            index, captured_ms = (int(part) for part in segment.stem.split("_"))
+            if index > chain["base_segment"] and captured_ms > target_ms:
+                break
+            segments.append(segment)
+        return backup_dir / chain["base"], segments, chain["page_size"]
+
+    raise ValueError(f"No hay backup base anterior a {timestamp.isoformat()}")
+
+
+class WalArchiver:
+    """
+    Archivador continuo de segmentos del WAL de la base de datos de memoria.
+
+    Usa dos conexiones persistentes con ``wal_autocheckpoint=0``: una
+    mantiene la transacción de lectura que fija el WAL y hace los
+    checkpoints, y la otra toma el bloqueo de escritura al vaciarlo.
+
+    Cada ciclo trabaja dentro de ``storage.gated``, así que una restauración
+    espera al ciclo en curso. Entre ciclos la lectura fijada impide el
+    checkpoint de la restauración, que falla sin sustituir nada salvo que
+    pause antes el archivador (``MemoryBackup`` pausa el suyo). Si aun así
+    la base de datos se sustituye, el siguiente ciclo reabre las conexiones
+    y empieza otra cadena.
+    """
+
+    def __init__(
+        self,
+        backup,
+        interval_seconds: float = 1.0,
+        segment_bytes: int = 4 * 1024 * 1024,
+        base_interval_seconds: float = 24 * 3600
+    ):
+        """
+        Args:
+            backup: MemoryBackup con el que se crean los backups base
+            interval_seconds: Segundos entre ciclos de archivado; es la
+                granularidad de la recuperación a un instante
+            segment_bytes: Tamaño del WAL a partir del cual se vacía
+            base_interval_seconds: Segundos tras los que se empieza una
+                cadena nueva con otro backup base
+        """
+        self.backup = backup
+        self.db_path = Path(backup.db_path)
+        self.wal_path = Path(f"{self.db_path}-wal")
+        self.archive_dir = Path(backup.wal_dir)
+        self.interval_seconds = interval_seconds
+        self.segment_bytes = segment_bytes
+        self.base_interval_seconds = base_interval_seconds
+
+        self._reader = None
+        self._writer = None
+        self._generation: Optional[int] = None
+        self._position: Optional[Dict] = None
+        self.chain_dir: Optional[Path] = None
+        self._chain: Dict = {}
+        self._next_segment = 0
+        self._lock = asyncio.Lock()
+        self.stats = {"segments": 0, "bytes": 0, "rotations": 0, "chains": 0, "gaps": 0}
+
+    async def start(self) -> None:
+        """Abre las conexiones y empieza una cadena con su backup base."""
+        async with self._lock:
+            await asyncio.get_running_loop().run_in_executor(None, self._open)
+            await self._start_chain()
+
+    async def archive_once(self) -> None:
+        """Ejecuta un ciclo de archivado; empieza otra cadena si hay un hueco."""
+        async with self._lock:
+            if self.chain_dir is None:
+                await self._start_chain()
+                return
+
+            continuous = await asyncio.get_running_loop().run_in_executor(None, self._archive)
+            chain_age = time.time() - self._chain["started_ms"] / 1000
+            if not continuous or chain_age > self.base_interval_seconds:
+                await self._start_chain()
+
+    @asynccontextmanager
+    async def paused(self) -> AsyncIterator[None]:
+        """
+        Cierra las conexiones del archivador durante el bloque ``async with``.
+
+        Antes de cerrar archiva los últimos frames de la cadena actual. Al
+        reanudar, el siguiente ciclo empieza una cadena nueva: la base de
+        datos puede haber sido sustituida por una restauración.
+        """
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            if self.chain_dir is not None:
+                await loop.run_in_executor(None, self._archive)
+            await loop.run_in_executor(None, self._close)
+            try:
+                yield
+            finally:
+                await loop.run_in_executor(None, self._open)
+                self.chain_dir = None
+
+    async def run(self) -> None:
+        """Archiva el WAL de forma continua hasta que se cancela la tarea."""
+        try:
+            await self.start()
+            while True:
+                await asyncio.sleep(self.interval_seconds)
+                try:
+                    await self.archive_once()
+                except Exception as e:
+                    logger.error(f"Error archivando WAL: {e}")
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """Cierra las conexiones del archivador."""
+        await asyncio.get_running_loop().run_in_executor(None, self._close)
+
+    def _open(self) -> None:
+        """Abre las conexiones persistentes."""
+        with gated(self.db_path) as current:
+            self._connect(current)
+
+    def _connect(self, current: int) -> None:
+        self._reader = open_connection(self.db_path, isolation_level=None, check_same_thread=False)
+        self._writer = open_connection(self.db_path, isolation_level=None, check_same_thread=False)
+        for conn in (self._reader, self._writer):
+            conn.execute("PRAGMA wal_autocheckpoint = 0")
+        self._writer.execute(
+            f"CREATE TABLE IF NOT EXISTS {STATE_TABLE} (id INTEGER PRIMARY KEY, rotated_ms INTEGER)"
+        )
+        self._generation = current
+
+    def _reopen_if_replaced(self, current: int) -> bool:
+        """Reabre las conexiones si la base de datos se sustituyó desde que se abrieron."""
+        if current == self._generation:
+            return False
+        logger.warning("La base de datos se sustituyó; el archivador reabre sus conexiones")
+        self._close()
+        self._connect(current)
+        return True
+
+    def _close(self) -> None:
+        for conn in (self._reader, self._writer):
+            if conn is not None:
+                conn.close()
+        self._reader = self._writer = None
+
+    def _pin(self) -> None:
+        """
+        Renueva la transacción de lectura que impide reiniciar el WAL.
+
+        Mientras la lectura apunta a un frame del WAL, los checkpoints
+        pueden pasar páginas a la base de datos pero ningún escritor puede
+        reiniciar el WAL.
+        """
+        if self._reader.in_transaction:
+            self._reader.execute("COMMIT")
+        self._reader.execute("BEGIN")
+        self._reader.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+
+    async def _start_chain(self) -> None:
+        """
+        Empieza una cadena nueva y crea su backup base.
+
+        El archivado continúa mientras se crea el backup base, de modo que
+        la cadena contiene todas las páginas escritas desde su inicio.
+        """
+        loop = asyncio.get_running_loop()
+        started_ms = int(time.time() * 1000)
+        chain_dir = self.archive_dir / f"{CHAIN_PREFIX}{started_ms}"
+        chain_dir.mkdir(parents=True, exist_ok=True)
+
+        await loop.run_in_executor(None, self._reset_position)
+        self.chain_dir = chain_dir
+        self._next_segment = 0
+        self._chain = {"page_size": self._position["page_size"], "started_ms": started_ms, "base": None}
+        _write_atomic(chain_dir / CHAIN_FILE, json.dumps(self._chain).encode())
+        self.stats["chains"] += 1
+
+        base_task = asyncio.ensure_future(self.backup.create_incremental_backup())
+        try:
+            while not base_task.done():
+                await asyncio.wait({base_task}, timeout=self.interval_seconds)
+                if not await loop.run_in_executor(None, self._archive):
+                    raise RuntimeError("El WAL se reinició durante el backup base")
+            manifest = base_task.result()
+
+            # Capturar las escrituras confirmadas antes de terminar el backup
+            completed_ms = int(time.time() * 1000)
+            if not await loop.run_in_executor(None, self._archive):
+                raise RuntimeError("El WAL se reinició durante el backup base")
+        except BaseException:
+            base_task.cancel()
+            self.chain_dir = None
+            raise
+
+        self._chain.update(
+            base=manifest.name,
+            base_started_ms=started_ms,
+            base_completed_ms=completed_ms,
+            base_segment=self._next_segment - 1
+        )
+        _write_atomic(chain_dir / CHAIN_FILE, json.dumps(self._chain).encode())
+        logger.info(f"Cadena de WAL iniciada en {chain_dir} con backup base {manifest.name}")
+
+    def _reset_position(self) -> None:
+        """Sitúa el archivado al final de los frames confirmados del WAL."""
+        with gated(self.db_path) as current:
+            self._reopen_if_replaced(current)
+            self._pin()
+            header = read_wal_header(self.wal_path)
+            if header is None:
+                # WAL vacío: se acepta la primera generación desde su inicio
+                page_size = self._reader.execute("PRAGMA page_size").fetchone()[0]
+                self._position = {
+                    "page_size": page_size, "ckpt_seq": None, "salts": None,
+                    "checksum": None, "big_endian": None, "offset": WAL_HEADER.size
+                }
+                return
+
+            with open(self.wal_path, "rb") as f:
+                f.seek(WAL_HEADER.size)
+                _, committed, checksum = scan_frames(
+                    f.read(), header["page_size"], header["salts"], header["checksum"], header["big_endian"]
+                )
+            self._position = {**header, "checksum": checksum, "offset": WAL_HEADER.size + committed}
+
+    def _archive(self) -> bool:
+        """
+        Copia los frames nuevos y vacía el WAL si ha crecido demasiado.
+
+        Returns:
+            False si el WAL se reinició perdiendo frames sin archivar o si
+            la base de datos se sustituyó
+        """
+        with gated(self.db_path) as current:
+            if self._reopen_if_replaced(current):
+                return False
+            if not self._copy_frames():
+                return False
+            if self._position["offset"] >= self.segment_bytes:
+                return self._rotate()
+            self._pin()
+            return True
+
+    def _copy_frames(self) -> bool:
+        """Guarda en un segmento los frames confirmados desde el último ciclo."""
+        header = read_wal_header(self.wal_path)
+        if header is None:
+            return True
+
+        position = self._position
+        if header["salts"] != position["salts"]:
+            if not self._continues(header):
+                self.stats["gaps"] += 1
+                logger.warning("El WAL se reinició con frames sin archivar; se empieza otra cadena")
+                return False
+            position = self._position = {**header, "offset": WAL_HEADER.size}
+
+        with open(self.wal_path, "rb") as f:
+            f.seek(position["offset"])
+            data = f.read()
+        _, length, checksum = scan_frames(
+            data, position["page_size"], position["salts"], position["checksum"], position["big_endian"]
+        )
+        if length:
+            name = f"{self._next_segment:08d}_{int(time.time() * 1000)}{SEGMENT_SUFFIX}"
+            _write_atomic(self.chain_dir / name, data[:length])
+            self._next_segment += 1
+            self.stats["segments"] += 1
+            self.stats["bytes"] += length
+            position["offset"] += length
+            position["checksum"] = checksum
+        return True
+
+    def _continues(self, header: Dict) -> bool:
+        """Indica si una nueva generación del WAL sigue a la archivada sin huecos."""
+        position = self._position
+        if position["salts"] is None:
+            return True
+        if header["salts"][0] != (position["salts"][0] + 1) & 0xFFFFFFFF:
+            return False
+
+        with open(self.wal_path, "rb") as f:
+            f.seek(WAL_HEADER.size)
+            extent, _, _ = scan_frames(
+                f.read(), header["page_size"], header["salts"], header["checksum"], header["big_endian"]
+            )
+            if WAL_HEADER.size + extent > position["offset"]:
+                # La nueva generación ya ocupa la posición archivada
+                return False
+            f.seek(position["offset"])
+            raw = f.read(FRAME_HEADER.size)
+        return len(raw) < FRAME_HEADER.size or FRAME_HEADER.unpack(raw)[2:4] != position["salts"]
+
+    def _rotate(self) -> bool:
+        """
+        Vacía el WAL sin perder frames.
+
+        Con el bloqueo de escritura se copian los últimos frames y el
+        checkpoint pasa todas las páginas a la base de datos. Después, una
+        transacción de escritura propia que empieza a leer con el WAL ya
+        volcado lo reinicia con su primer frame. Si otra lectura impide el
+        checkpoint o el reinicio, el WAL sigue en la misma generación y se
+        vuelve a intentar en el siguiente ciclo.
+
+        Returns:
+            False si el WAL se reinició perdiendo frames sin archivar
+        """
+        checkpointed = False
+        self._writer.execute("BEGIN IMMEDIATE")
+        try:
+            if not self._copy_frames():
+                return False
+            self._reader.execute("COMMIT")
+            busy, log, done = self._reader.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+            checkpointed = not busy and log == done
+        finally:
+            self._writer.execute("COMMIT")
+            if not checkpointed:
+                self._pin()
+
+        if not checkpointed:
+            return True
+
+        try:
+            self._writer.execute("BEGIN IMMEDIATE")
+            # Frames que otro escritor añadiera tras el checkpoint
+            if not self._copy_frames():
+                self._writer.execute("ROLLBACK")
+                return False
+            salts = self._position["salts"]
+            self._writer.execute(
+                f"INSERT OR REPLACE INTO {STATE_TABLE} (id, rotated_ms) VALUES (1, ?)",
+                (int(time.time() * 1000),)
+            )
+            self._writer.execute("COMMIT")
+        except BaseException:
+            if self._writer.in_transaction:
+                self._writer.execute("ROLLBACK")
+            raise
+        finally:
+            self._pin()
+
+        header = read_wal_header(self.wal_path)
+        if header["salts"] != salts:
+            self._position = {**header, "offset": WAL_HEADER.size}
+            self.stats["rotations"] += 1
+        return True
@@ -0,0 +1,415 @@
+import pytest
+import asyncio
+import json
+import sqlite3
+import time
+from datetime import datetime
+
+import numpy as np
+
+from src.mar_disrupcion.benchmarks.harness import (
+    Benchmark,
+    BenchmarkSuite,
+    build_report,
+    compare_reports,
+    format_comparison,
+    load_report,
+    save_report,
+    summarize
+)
+from src.mar_disrupcion.benchmarks.dataset import DATASET_CATEGORIES, build_dataset
+from src.mar_disrupcion.benchmarks.load import LoadGenerator, classify_error, saturation_sweep
+from src.mar_disrupcion.benchmarks.vector_search import (
+    ExactSearch,
+    IvfSearch,
+    benchmark_strategy,
+    clustered_embeddings,
+    format_pareto_table,
+    ground_truth,
+    load_embeddings,
+    make_queries,
+    pareto_front
+)
+from src.mar_disrupcion.core.storage import connect
+
+
+def test_summarize_percentiles():
+    """Test de percentiles y ritmo a partir de latencias en nanosegundos"""
+    stats = summarize(list(range(1, 10001)))
+
+    assert stats["count"] == 10000
+    assert stats["min"] == 1 and stats["max"] == 10000
+    assert stats["p50"] == pytest.approx(5000.5)
+    assert stats["p99"] == pytest.approx(9900.01)
+    assert stats["p50"] < stats["p95"] < stats["p99"] < stats["p999"] <= stats["max"]
+    assert stats["ops_per_second"] == pytest.approx(1e9 / 5000.5)
+
+
+@pytest.mark.asyncio
+async def test_benchmark_excludes_warmup_and_inputs():
+    """Test de que la generación de entradas y el calentamiento no se miden"""
+    calls = []
+
+    def make_inputs(count):
+        time.sleep(0.05)
+        return [0.02 if i < 3 else 0.0 for i in range(count)]
+
+    async def operation(delay):
+        calls.append(delay)
+        await asyncio.sleep(delay)
+
+    stats = await Benchmark("sleep", operation, make_inputs, rounds=20, warmup=3).run()
+
+    assert len(calls) == 23
+    assert stats["count"] == 20
+    assert stats["warmup"] == 3
+    # Ni las rondas lentas de calentamiento ni make_inputs cuentan
+    assert stats["max"] < 10e6
+
+
+@pytest.mark.asyncio
+async def test_suite_results_and_cleanup():
+    """Test de resultados por <suite>.<benchmark> y cierre de recursos"""
+    closed = []
+    suite = BenchmarkSuite("demo", rounds=5, warmup=1)
+    suite.add("sync", lambda: sum(range(100)))
+    suite.add("async", asyncio.sleep, lambda count: [0] * count, rounds=3)
+    suite.add_cleanup(lambda: closed.append("sync"))
+
+    async def close_async():
+        closed.append("async")
+
+    suite.add_cleanup(close_async)
+
+    results = await suite.run()
+    await suite.close()
+
+    assert set(results) == {"demo.sync", "demo.async"}
+    assert results["demo.sync"]["count"] == 5
+    assert results["demo.async"]["count"] == 3
+    assert closed == ["async", "sync"]
+    assert set(await suite.run(only=["sync"])) == {"demo.sync"}
+
+
+def test_compare_flags_regressions_beyond_threshold(tmp_path):
+    """Test de comparación con referencia: regresiones, mejoras y ruido"""
+    def stats(p50, p99):
+        return {**summarize([p50] * 10), "p50": p50, "p99": p99}
+
+    baseline = build_report({
+        "memory.store": stats(100_000, 200_000),
+        "memory.read": stats(50_000, 90_000),
+        "cache.get": stats(10_000, 20_000)
+    })
+    save_report(baseline, tmp_path / "baseline.json")
+    current = build_report({
+        "memory.store": stats(105_000, 260_000),
+        "memory.read": stats(40_000, 91_000),
+        "parallel.cpu": stats(1_000, 2_000)
+    })
+
+    rows = compare_reports(load_report(tmp_path / "baseline.json"), current, threshold=0.10)
+    status = {(r["benchmark"], r["metric"]): r["status"] for r in rows}
+
+    assert status[("memory.store", "p50")] == "unchanged"
+    assert status[("memory.store", "p99")] == "regression"
+    assert status[("memory.read", "p50")] == "improvement"
+    assert status[("memory.read", "p99")] == "unchanged"
+    assert status[("cache.get", None)] == "missing"
+    assert status[("parallel.cpu", None)] == "new"
+    assert "regression" in format_comparison(rows)
+
+    # Con un umbral mayor la regresión se considera ruido
+    rows = compare_reports(baseline, current, threshold=0.5)
+    assert not any(r["status"] == "regression" for r in rows)
+
+
+def test_classify_sqlite_errors(tmp_path):
+    """Test de clasificación de errores de SQLite ocupado y bloqueado"""
+    db_path = tmp_path / "busy.db"
+    holder = sqlite3.connect(str(db_path))
+    holder.execute("CREATE TABLE t (x INTEGER)")
+    holder.execute("BEGIN IMMEDIATE")
+    
+    other = sqlite3.connect(str(db_path), timeout=0)
+    with pytest.raises(sqlite3.OperationalError) as busy:
+        other.execute("INSERT INTO t VALUES (1)")
+    holder.rollback()
+    holder.close()
+    other.close()
+    
+    assert classify_error(busy.value) == "busy"
+    assert classify_error(sqlite3.OperationalError("database table is locked")) == "locked"
+    assert classify_error(ValueError("otro")) == "other"
+
+
+def test_dataset_is_reproducible_and_skewed(tmp_path):
+    """Test de dataset determinista por semilla y con distribuciones sesgadas"""
+    end = datetime(2025, 6, 1)
+    options = {"rows": 5000, "seed": 7, "end": end, "embedding_dim": 16}
+    build_dataset(tmp_path / "a.db", batch_size=1000, workers=0, **options)
+    build_dataset(tmp_path / "b.db", batch_size=3000, workers=1, **options)
+    
+    def dump(path):
+        with sqlite3.connect(str(path)) as conn:
+            return (
+                conn.execute("SELECT * FROM memories ORDER BY id").fetchall(),
+                conn.execute("SELECT * FROM memory_relations ORDER BY source_id, target_id").fetchall()
+            )
+    
+    memories, relations = dump(tmp_path / "a.db")
+    assert (memories, relations) == dump(tmp_path / "b.db")
+    
+    ids = [row[0] for row in memories]
+    assert len(set(ids)) == 5000
+    assert max(row[4] for row in memories) <= end.isoformat(" ")
+    
+    # Zipf: la primera categoría es la más frecuente; Beta(2, 5): media 2/7
+    counts = {category: 0 for category in DATASET_CATEGORIES}
+    for row in memories:
+        counts[row[1]] += 1
+    ranked = list(DATASET_CATEGORIES)
+    assert counts[ranked[0]] > counts[ranked[1]] > counts[ranked[-1]]
+    assert sum(row[3] for row in memories) / 5000 == pytest.approx(2 / 7, abs=0.02)
+    
+    # Las relaciones apuntan a memorias anteriores existentes
+    known = set(ids)
+    assert all(target in known and target < source for source, target, *_ in relations)
+
+
+def test_vector_search_recall_and_pareto(tmp_path):
+    """Test de recall@k frente a la verdad exacta y del frente de Pareto"""
+    base = clustered_embeddings(4000, 32, clusters=40, seed=1)
+    queries = make_queries(base, 100, seed=2)
+    truth = ground_truth(base, queries, k=10)
+    
+    exact = benchmark_strategy(ExactSearch(), base, queries, truth, k=10)
+    assert exact[0]["recall"] == 1.0
+    
+    ivf = benchmark_strategy(IvfSearch(64, nprobes=[1, 8, 64]), base, queries, truth, k=10)
+    recalls = [row["recall"] for row in ivf]
+    assert [row["params"]["nprobe"] for row in ivf] == [1, 8, 64]
+    assert recalls[0] < 1.0
+    assert recalls == sorted(recalls)
+    # Explorar todas las listas equivale a la búsqueda exacta
+    assert recalls[-1] == 1.0
+    assert all(row["p99_ms"] >= row["p50_ms"] > 0 and row["qps"] > 0 for row in ivf)
+    
+    rows = pareto_front(exact + ivf)
+    front = [row for row in rows if row["pareto"]]
+    assert max(row["recall"] for row in front) == 1.0
+    for row in front:
+        assert not any(
+            other["recall"] >= row["recall"] and other["qps"] > row["qps"] for other in rows
+        )
+    assert "*" in format_pareto_table(rows)
+    
+    # Embeddings leídos de una base de datos de memoria
+    build_dataset(tmp_path / "memory.db", rows=300, embedding_dim=16, workers=0)
+    stored = load_embeddings(tmp_path / "memory.db", limit=200)
+    assert stored.shape == (200, 16)
+    assert np.allclose(np.linalg.norm(stored, axis=1), 1.0, atol=1e-5)
+
+
+@pytest.mark.asyncio
+async def test_cache_suite_runs_on_fake_redis():
+    """Test de la suite de caché sobre un Redis en memoria"""
+    fakeredis = pytest.importorskip("fakeredis")
+    from src.mar_disrupcion.benchmarks.suites import cache_suite
+    from src.mar_disrupcion.core.cache import DistributedCache
+
+    server = fakeredis.FakeServer()
+    cache = DistributedCache(
+        hosts=["localhost"],
+        namespace="benchmark_test",
+        client_factory=lambda host: fakeredis.FakeRedis(server=server)
+    )
+    suite = cache_suite(cache, rounds=10, warmup=2, batch=10)
+    results = await suite.run()
+
+    assert set(results) == {
+        "cache.set", "cache.get_hit", "cache.get_miss", "cache.set_many", "cache.get_many"
+    }
+    assert all(r["count"] == 10 for r in results.values())
+    assert await cache.get("benchmark:0") is not None
+
+
+def make_memory_system(db_path):
+    """Sistema de memoria sobre una base de datos temporal (necesita torch)"""
+    pytest.importorskip("torch")
+    from src.mar_disrupcion.core.memory_system import AdvancedMemorySystem
+
+    return AdvancedMemorySystem({
+        "memory": {
+            "retention_period": 3600,
+            "context_depth": 5,
+            "confidence_threshold": 0.7,
+            "cache_size": 1024
+        },
+        "neural": {
+            "learning_rate": 0.001,
+            "lstm_hidden_size": 256,
+            "lstm_num_layers": 2,
+            "dropout_rate": 0.2
+        }
+    }, db_path=str(db_path))
+
+
+@pytest.mark.asyncio
+async def test_memory_suite_runs_one_round(tmp_path):
+    """Test de una ronda de la suite de memoria sobre una base de datos temporal"""
+    from src.mar_disrupcion.benchmarks.suites import FEATURE_SIZE, generate_memories, memory_suite
+
+    system = make_memory_system(tmp_path / "memory.db")
+    results = await memory_suite(system, rounds=1, warmup=0).run()
+
+    assert set(results) == {
+        "memory.store_memory", "memory.retrieve_memories",
+        "memory.retrieve_with_context", "memory.generate_embedding"
+    }
+    assert all(r["count"] == 1 for r in results.values())
+
+    stored = generate_memories(1)[0]
+    assert len(stored["content"]["features"]) == FEATURE_SIZE
+    memory_id = await system.store_memory(stored["content"], stored["category"], importance=0.9)
+    assert (await system.get_memory(memory_id))["content"] == stored["content"]
+
+
+@pytest.mark.asyncio
+async def test_load_generator_mixed_workload(tmp_path):
+    """Test de carga concurrente con hilos: ventanas, operaciones y retraso del bucle"""
+    system = make_memory_system(tmp_path / "load.db")
+
+    report = await LoadGenerator(
+        system, concurrency=4, threads=2, duration=1.0, window=0.25
+    ).run()
+    totals = report["totals"]
+
+    assert report["config"]["mode"] == "closed"
+    assert totals["ops"] > 0
+    assert set(totals["operations"]) == {"store", "retrieve", "cache_read"}
+    assert sum(totals["errors"].values()) == 0
+    assert totals["loop_lag"]["count"] > 0
+    assert len(report["windows"]) >= 4
+    assert sum(w["ops"] for w in report["windows"]) == totals["ops"]
+
+    # Cada escritura medida queda en la base de datos
+    stores = totals["operations"]["store"]["count"]
+    assert stores > 0
+    with connect(tmp_path / "load.db") as conn:
+        assert conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0] == stores
+
+
+@pytest.mark.asyncio
+async def test_open_loop_saturation_sweep(tmp_path):
+    """Test de llegadas de Poisson y detección del punto de saturación"""
+    system = make_memory_system(tmp_path / "load.db")
+
+    report = await LoadGenerator(system, rate=100, duration=1.0, mix={"retrieve": 1.0}).run()
+    assert report["config"]["mode"] == "open"
+    assert 50 <= report["totals"]["ops"] <= 160
+
+    # Un ritmo imposible de atender satura: descarta llegadas por encima
+    # de max_in_flight o no alcanza el rendimiento pedido
+    sweep = await saturation_sweep(
+        system, rates=[20, 1_000_000], duration=0.5, max_in_flight=8
+    )
+    assert [step["saturated"] for step in sweep["steps"]] == [False, True]
+    assert sweep["saturation_rate"] == 1_000_000
+
+
+@pytest.mark.asyncio
+async def test_synthetic_dataset_is_usable(tmp_path):
+    """Test de que el sistema de memoria trabaja sobre un dataset generado en bloque"""
+    db_path = tmp_path / "system_memory.db"
+    result = build_dataset(
+        db_path, rows=3000, days=1 / 48, embedding_dim=256,
+        relations_per_memory=2.0, batch_size=1000, workers=0
+    )
+    assert result["rows"] == 3000
+    assert result["relations"] > 3000
+
+    system = make_memory_system(db_path)
+    memories = await system.retrieve_memories(category="security", limit=5, min_importance=0.3)
+
+    assert len(memories) == 5
+    assert memories[0]["importance"] >= memories[-1]["importance"]
+    assert "severity" in memories[0]["content"]
+    assert memories[0]["embedding"].shape == (1, 256)
+    assert abs(float((memories[0]["embedding"] ** 2).sum()) - 1.0) < 1e-4
+    assert any(memory["related_memories"] for memory in memories)
+
+    # Los embeddings generados tienen la forma y el tipo de los del LSTM
+    content = {"features": [0.1] * 512}
+    embedding = system._generate_embedding(content)
+    assert embedding.shape == memories[0]["embedding"].shape
+    assert embedding.dtype == memories[0]["embedding"].dtype
+
+    # La ruta de contexto decodifica las memorias relacionadas
+    with_context = await system.retrieve_memories(
+        category="security", limit=20, min_importance=0.3, context_size=1
+    )
+    related = [r for memory in with_context for r in memory["related_memories"]]
+    assert related
+    assert all(len(memory["related_memories"]) <= 1 for memory in with_context)
+    assert all(isinstance(r["content"], dict) and "timestamp" in r["content"] for r in related)
+
+    # Los ids nuevos no chocan con los generados
+    memory_id = await system.store_memory(content, "security", importance=1.0)
+    stored = await system.get_memory(memory_id)
+    assert stored["content"] == content
+    assert memory_id not in {memory["id"] for memory in with_context}
+    newest = await system.retrieve_memories(category="security", limit=1, min_importance=1.0)
+    assert newest[0]["content"] == content
+    assert newest[0]["embedding"].shape == memories[0]["embedding"].shape
+
+    with pytest.raises(FileExistsError):
+        build_dataset(db_path, rows=10, workers=0)
+
+
+@pytest.mark.asyncio
+async def test_allocation_profiling(tmp_path):
+    """Test del pico real de RSS y de las asignaciones por operación"""
+    system = make_memory_system(tmp_path / "profile.db")
+    from src.mar_disrupcion.core.memory_performance import MemoryPerformanceTest
+
+    perf_test = MemoryPerformanceTest(system)
+
+    stats = await perf_test.benchmark_memory_usage(
+        num_samples=20, profile=True, top=5, sample_interval=0.001, output=tmp_path / "memory.json"
+    )
+
+    assert stats["rss_samples"] >= 2
+    assert stats["peak_memory"] >= max(stats["initial_memory"], stats["final_memory"])
+
+    allocations = stats["allocations"]
+    assert set(allocations) == {
+        "store_memory", "retrieve_memories", "retrieve_with_context", "generate_embedding"
+    }
+    store = allocations["store_memory"]
+    assert store["calls"] == store["memories"] == 20
+    # Al menos el contenido serializado: 512 características por memoria
+    assert store["peak_bytes_per_memory"] > 512 * 8
+    assert store["max_peak_bytes"] >= store["peak_bytes_per_call"]
+    assert allocations["generate_embedding"]["memories"] == 20
+
+    # Las recuperaciones cuentan las memorias devueltas, no las llamadas
+    retrieve = allocations["retrieve_memories"]
+    with_context = allocations["retrieve_with_context"]
+    assert 0 < retrieve["memories"] <= 20 * 50
+    assert with_context["memories"] <= retrieve["memories"]
+    assert retrieve["peak_bytes_per_memory"] == pytest.approx(
+        retrieve["peak_bytes_per_call"] * retrieve["calls"] / retrieve["memories"]
+    )
+    for operation in allocations.values():
+        assert operation["calls"] == 20
+        assert len(operation["top_sites"]) <= 5
+        assert all(site["size_diff"] > 0 and site["line"] > 0 for site in operation["top_sites"])
+
+    saved = json.loads((tmp_path / "memory.json").read_text())
+    assert saved["num_samples"] == 20
+    assert saved["allocations"]["store_memory"]["memories"] == 20
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,347 @@
+import pytest
+import asyncio
+import logging
+import json
+import numpy as np
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from src.mar_disrupcion.core import cache as cache_module
+from src.mar_disrupcion.core.cache import CLUSTER_NODE, DistributedCache
+from src.mar_disrupcion.core.circuit_breaker import CircuitBreaker
+from src.mar_disrupcion.core.hash_ring import ConsistentHashRing
+
+logger = logging.getLogger(__name__)
+
+def fake_redis_factory():
+    """Crea una factoría de clientes con un Redis en memoria por host"""
+    servers = {}
+
+    def factory(host):
+        server = servers.setdefault(host, fakeredis.FakeServer())
+        return fakeredis.FakeRedis(server=server, decode_responses=False)
+
+    factory.servers = servers
+    return factory
+
+class FakeCluster:
+    """Sustituto mínimo de RedisCluster: dos primarios en memoria con SCAN por nodo"""
+
+    def __init__(self, **kwargs):
+        self.nodes = {
+            "node-1:6379": fakeredis.FakeRedis(decode_responses=False),
+            "node-2:6379": fakeredis.FakeRedis(decode_responses=False)
+        }
+
+    def _node(self, key):
+        key = key.encode() if isinstance(key, str) else key
+        return list(self.nodes.values())[sum(key) % len(self.nodes)]
+
+    def set(self, key, value):
+        return self._node(key).set(key, value)
+
+    def get(self, key):
+        return self._node(key).get(key)
+
+    def unlink(self, *keys):
+        return sum(self._node(key).unlink(key) for key in keys)
+
+    def get_node(self, node_name):
+        return node_name
+
+    def scan(self, cursor=0, match=None, count=None, target_nodes=None):
+        # Como RedisCluster: un cursor por nodo y las claves de todos ellos
+        names = [target_nodes] if target_nodes else list(self.nodes)
+        cursors, keys = {}, []
+        for name in names:
+            cursors[name], found = self.nodes[name].scan(cursor, match=match, count=count)
+            keys.extend(found)
+        return cursors, keys
+
+    def register_script(self, script):
+        return None
+
+@pytest.fixture
+def cache():
+    """Fixture para un caché distribuido sobre un Redis en memoria"""
+    cache = DistributedCache(
+        hosts=["localhost"],
+        batch_size=64,
+        client_factory=fake_redis_factory()
+    )
+
+    yield cache
+
+    cache.clients["localhost"].flushall()
+
+@pytest.fixture
+def sharded_cache():
+    """Fixture para un caché repartido entre varios Redis en memoria"""
+    cache = DistributedCache(
+        hosts=["redis-a", "redis-b", "redis-c"],
+        batch_size=64,
+        client_factory=fake_redis_factory()
+    )
+
+    yield cache
+
+    for client in cache.clients.values():
+        client.flushall()
+
+@pytest.mark.asyncio
+async def test_set_many_get_many_roundtrip(cache):
+    """Test de escritura y lectura en lote"""
+    items = {f"key:{i}": {"value": i} for i in range(200)}
+    assert await cache.set_many(items, ttl=60)
+
+    keys = list(items)
+    values = await cache.get_many(keys)
+    assert values == [items[k] for k in keys]
+
+@pytest.mark.asyncio
+async def test_get_many_preserves_order_with_misses(cache):
+    """Test de orden de resultados con claves inexistentes"""
+    await cache.set_many({"a": 1, "c": 3})
+
+    values = await cache.get_many(["c", "missing", "a", "c"])
+    assert values == [3, None, 1, 3]
+
+@pytest.mark.asyncio
+async def test_get_many_round_trips(cache):
+    """Test de que una lectura de 1000 claves usa un solo pipeline"""
+    await cache.set_many({f"k{i}": i for i in range(1000)})
+
+    executions = []
+    original_pipeline = cache.clients["localhost"].pipeline
+
+    def counting_pipeline(*args, **kwargs):
+        pipe = original_pipeline(*args, **kwargs)
+        original_execute = pipe.execute
+
+        def execute(*a, **kw):
+            executions.append(len(pipe.command_stack))
+            return original_execute(*a, **kw)
+
+        pipe.execute = execute
+        return pipe
+
+    cache.clients["localhost"].pipeline = counting_pipeline
+    values = await cache.get_many([f"k{i}" for i in range(1000)])
+
+    assert values == list(range(1000))
+    assert executions == [16]  # 1000 claves en lotes de 64
+
+@pytest.mark.asyncio
+async def test_binary_values_and_numpy(cache):
+    """Test de serialización de bytes, arrays de NumPy y compresión"""
+    array = np.arange(10000, dtype=np.float32).reshape(100, 100)
+    await cache.set("array", {"weights": array, "raw": b"\x00\xff"})
+
+    value = await cache.get("array")
+    assert value["raw"] == b"\x00\xff"
+    np.testing.assert_array_equal(value["weights"], array)
+    assert value["weights"].dtype == np.float32
+
+    stored = cache.clients["localhost"].get(cache._key("array"))
+    assert len(stored) < array.nbytes
+
+@pytest.mark.asyncio
+async def test_reads_legacy_json_values():
+    """Test de lectura de valores JSON escritos por versiones anteriores"""
+    cache = DistributedCache(hosts=["localhost"], client_factory=fake_redis_factory(), legacy_keys=True)
+    # Antes del espacio de nombres las claves se guardaban sin prefijo
+    cache.clients["localhost"].setex("legacy", 120, json.dumps({"score": 0.9}))
+
+    assert await cache.get("legacy") == {"score": 0.9}
+    # La clave se copia al formato nuevo conservando su TTL
+    assert 0 < cache.clients["localhost"].ttl(cache._key("legacy")) <= 120
+    assert await cache.get("missing") is None
+
+@pytest.mark.asyncio
+async def test_reads_legacy_keys_in_batch():
+    """Test de lectura en lote de claves anteriores al reparto en shards"""
+    sharded_cache = DistributedCache(
+        hosts=["redis-a", "redis-b", "redis-c"],
+        batch_size=64,
+        client_factory=fake_redis_factory(),
+        legacy_keys=True
+    )
+    legacy_client = sharded_cache.clients["redis-a"]
+    legacy_client.set("old:1", json.dumps([1, 2]))
+    legacy_client.set("old:2", json.dumps({"a": 1}))
+    await sharded_cache.set("new", 3)
+
+    values = await sharded_cache.get_many(["old:1", "new", "missing", "old:2"])
+    assert values == [[1, 2], 3, None, {"a": 1}]
+
+    # Ya copiadas, no dependen de las claves antiguas
+    legacy_client.delete("old:1", "old:2")
+    assert await sharded_cache.get_many(["old:1", "old:2"]) == [[1, 2], {"a": 1}]
+
+def test_legacy_keys_are_opt_in():
+    """Test de que la lectura de claves anteriores solo se hace si se activa"""
+    factory = fake_redis_factory()
+    cache = DistributedCache(hosts=["localhost"], client_factory=factory)
+    cache.clients["localhost"].set("legacy", json.dumps(1))
+
+    assert cache.legacy_node is None
+    assert asyncio.run(cache.get("legacy")) is None
+
+    migrating = DistributedCache(hosts=["localhost"], client_factory=factory, legacy_keys=True)
+    assert migrating.legacy_node == "localhost"
+    assert asyncio.run(migrating.get("legacy")) == 1
+
+@pytest.mark.asyncio
+async def test_get_or_compute_single_flight(cache):
+    """Test de que llamadas concurrentes calculan el valor una sola vez"""
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.2)
+        return {"feed": "vulnerabilities"}
+
+    results = await asyncio.gather(*[
+        cache.get_or_compute("feed", loader, ttl=60) for _ in range(10)
+    ])
+
+    assert len(calls) == 1
+    assert all(r == {"feed": "vulnerabilities"} for r in results)
+
+@pytest.mark.asyncio
+async def test_get_or_compute_serves_stale_while_locked(cache):
+    """Test de que se sirve el valor antiguo mientras otro lo recalcula"""
+    await cache.get_or_compute("quote", lambda: 100, ttl=1)
+    await asyncio.sleep(1.1)
+
+    cache.clients["localhost"].set(cache._key("quote:lock"), "other-worker", px=5000)
+    value = await cache.get_or_compute("quote", lambda: 200, ttl=1)
+    assert value == 100
+
+    cache.clients["localhost"].delete(cache._key("quote:lock"))
+    value = await cache.get_or_compute("quote", lambda: 200, ttl=1)
+    assert value == 200
+
+@pytest.mark.asyncio
+async def test_invalidate_tag(cache):
+    """Test de invalidación por etiqueta"""
+    await cache.set_many({f"cve:{i}": i for i in range(150)}, ttl=60, tags=["vulnerability_db"])
+    await cache.set("quote:AAPL", 190.5, ttl=60, tags=["market_data"])
+
+    removed = await cache.invalidate_tag("vulnerability_db")
+
+    assert removed == 150
+    assert await cache.get_many(["cve:0", "cve:149"]) == [None, None]
+    assert await cache.get("quote:AAPL") == 190.5
+
+@pytest.mark.asyncio
+async def test_flush_keeps_other_namespaces(cache):
+    """Test de que flush solo elimina las claves de su namespace"""
+    cache.clients["localhost"].set("other-tenant:key", b"keep")
+    await cache.set_many({f"k{i}": i for i in range(300)})
+
+    assert await cache.flush()
+
+    assert await cache.get("k0") is None
+    assert cache.clients["localhost"].get("other-tenant:key") == b"keep"
+
+def test_flush_scans_every_cluster_node(monkeypatch):
+    """Test de flush en modo cluster, con un cursor de SCAN por nodo"""
+    monkeypatch.setattr(cache_module, "RedisCluster", FakeCluster)
+    cache = DistributedCache(hosts=["node-1", "node-2"], cluster_mode=True, batch_size=16)
+    cluster = cache.clients[CLUSTER_NODE]
+    for i in range(200):
+        cluster.set(cache._key(f"k{i}"), b"x")
+    cluster.set("other-tenant:key", b"keep")
+    assert all(node.dbsize() > 16 for node in cluster.nodes.values())
+
+    assert asyncio.run(cache.flush())
+
+    assert sum(node.dbsize() for node in cluster.nodes.values()) == 1
+    assert cluster.get("other-tenant:key") == b"keep"
+
+def test_hash_ring_minimal_remapping():
+    """Test de que añadir un nodo solo reasigna una fracción mínima de claves"""
+    ring = ConsistentHashRing(["a", "b", "c", "d"])
+    keys = [f"key:{i}" for i in range(20000)]
+    before = {k: ring.get_node(k) for k in keys}
+
+    ring.add_node("e")
+    moved = [k for k in keys if ring.get_node(k) != before[k]]
+
+    # Idealmente se mueve 1/5 de las claves, y todas hacia el nodo nuevo
+    assert 0.15 < len(moved) / len(keys) < 0.25
+    assert all(ring.get_node(k) == "e" for k in moved)
+
+    ring.remove_node("e")
+    assert all(ring.get_node(k) == before[k] for k in keys)
+
+@pytest.mark.asyncio
+async def test_sharded_bulk_operations(sharded_cache):
+    """Test de operaciones en lote repartidas entre shards"""
+    items = {f"asset:{i}": {"price": i} for i in range(900)}
+    assert await sharded_cache.set_many(items, ttl=60, tags=["market_data"])
+
+    sizes = [client.dbsize() for client in sharded_cache.clients.values()]
+    assert all(size > 200 for size in sizes)
+
+    keys = list(items)
+    assert await sharded_cache.get_many(keys) == [items[k] for k in keys]
+
+    assert await sharded_cache.invalidate_tag("market_data") == 900
+    assert await sharded_cache.get_many(keys[:10]) == [None] * 10
+
+@pytest.mark.asyncio
+async def test_add_node_keeps_most_keys(sharded_cache):
+    """Test de que añadir un shard conserva la mayoría de aciertos"""
+    items = {f"k{i}": i for i in range(2000)}
+    await sharded_cache.set_many(items)
+
+    sharded_cache.add_node("redis-d")
+    values = await sharded_cache.get_many(list(items))
+
+    hit_ratio = sum(v is not None for v in values) / len(values)
+    assert hit_ratio > 0.65
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_serves_local_fallback():
+    """Test de apertura del circuito y respaldo local durante una caída"""
+    factory = fake_redis_factory()
+    cache = DistributedCache(
+        hosts=["localhost"],
+        client_factory=factory,
+        failure_threshold=2,
+        reset_timeout=0.2
+    )
+    breaker = cache.breakers["localhost"]
+
+    assert await cache.set("quote:MSFT", 410.2)
+    factory.servers["localhost"].connected = False
+
+    # Los errores abren el circuito y se sirve el respaldo local
+    assert await cache.get("quote:MSFT") == 410.2
+    assert await cache.get("quote:MSFT") == 410.2
+    assert breaker.state == CircuitBreaker.OPEN
+    assert await cache.get("quote:MSFT") == 410.2
+    assert await cache.get("unknown") is None
+
+    # Tras el tiempo de apertura una sonda correcta cierra el circuito
+    factory.servers["localhost"].connected = True
+    await asyncio.sleep(0.25)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert await cache.get("quote:MSFT") == 410.2
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_circuit_breaker_latency_threshold():
+    """Test de que las llamadas lentas cuentan como fallos"""
+    breaker = CircuitBreaker("test-latency", failure_threshold=3, latency_threshold=0.1)
+
+    for _ in range(3):
+        assert breaker.allow_request()
+        breaker.record_success(duration=0.5)
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
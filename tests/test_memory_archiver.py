@@ -0,0 +1,95 @@
+import pytest
+import pickle
+import sqlite3
+import logging
+from datetime import datetime, timedelta
+
+pa = pytest.importorskip("pyarrow")
+pc = pytest.importorskip("pyarrow.compute")
+
+from src.mar_disrupcion.core.memory_archiver import MemoryArchiver
+
+logger = logging.getLogger(__name__)
+
+@pytest.fixture
+def aged_db(tmp_path):
+    """Fixture para una base de datos con memorias recientes y antiguas"""
+    db_path = tmp_path / "memory.db"
+    now = datetime.now()
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.execute("""
+            CREATE TABLE memories (
+                id TEXT PRIMARY KEY, category TEXT, content BLOB,
+                importance REAL, timestamp DATETIME, last_accessed DATETIME,
+                access_count INTEGER, embedding BLOB
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE memory_relations (
+                source_id TEXT, target_id TEXT, relation_type TEXT,
+                strength REAL, PRIMARY KEY (source_id, target_id)
+            )
+        """)
+        rows = []
+        for i in range(300):
+            timestamp = now - timedelta(days=40 + i % 90)
+            category = ["security", "finance"][i % 2]
+            rows.append((f"old-{i}", category, pickle.dumps({"n": i}), i / 300, timestamp, timestamp, 1, b""))
+        for i in range(20):
+            rows.append((f"new-{i}", "security", pickle.dumps({"n": i}), 0.5, now, now, 0, b""))
+        conn.executemany("INSERT INTO memories VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.executemany(
+            "INSERT INTO memory_relations (source_id, target_id, strength) VALUES (?, ?, ?)",
+            [("new-0", "old-0", 0.5), ("new-1", "new-2", 0.5)]
+        )
+    
+    return db_path
+
+@pytest.mark.asyncio
+async def test_archive_moves_aged_rows(aged_db, tmp_path):
+    """Test de movimiento de memorias antiguas al archivo Parquet"""
+    archiver = MemoryArchiver(aged_db, tmp_path / "archive", batch_size=64)
+    
+    stats = await archiver.archive_old_memories(retention_days=30)
+    assert stats["archived"] == 300
+    assert stats["batches"] == 5
+    
+    with sqlite3.connect(str(aged_db)) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0] == 20
+        assert conn.execute("SELECT COUNT(*) FROM memory_relations").fetchone()[0] == 1
+    
+    # Directorios de partición por categoría y mes
+    partitions = {p.parent.parent.name for p in (tmp_path / "archive").rglob("*.parquet")}
+    assert partitions == {"category=security", "category=finance"}
+    
+    table = await archiver.query()
+    assert table.num_rows == 300
+    assert pickle.loads(table.filter(pc.equal(table["id"], "old-7"))["content"][0].as_py()) == {"n": 7}
+
+@pytest.mark.asyncio
+async def test_archive_query_filters(aged_db, tmp_path):
+    """Test de consultas al archivo con filtros de partición y de columnas"""
+    archiver = MemoryArchiver(aged_db, tmp_path / "archive", batch_size=64)
+    await archiver.archive_old_memories(retention_days=30)
+    
+    start = datetime.now() - timedelta(days=70)
+    end = datetime.now() - timedelta(days=50)
+    table = await archiver.query(
+        category="finance",
+        start=start,
+        end=end,
+        min_importance=0.5,
+        columns=["id", "importance", "timestamp"]
+    )
+    
+    assert table.num_rows > 0
+    assert table.column_names == ["id", "importance", "timestamp"]
+    assert all(v >= 0.5 for v in table["importance"].to_pylist())
+    assert all(start <= t < end for t in table["timestamp"].to_pylist())
+    assert all(int(i.split("-")[1]) % 2 == 1 for i in table["id"].to_pylist())
+    
+    limited = await archiver.query(category="security", limit=10)
+    assert limited.num_rows == 10
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
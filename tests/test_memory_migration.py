@@ -0,0 +1,334 @@
+import pytest
+import sqlite3
+import shutil
+import logging
+import pickle
+import threading
+import time
+from datetime import datetime, timedelta
+
+from src.mar_disrupcion.core.exceptions import MemoryError
+from src.mar_disrupcion.core.memory_migration import (
+    IntegerIdMigration,
+    legacy_memory_tables,
+    memory_migration_runner,
+    needs_integer_id_migration
+)
+from src.mar_disrupcion.core.memory_system import AdvancedMemorySystem
+from src.mar_disrupcion.core.migrations import BatchRewriteMigration, MigrationRunner
+from src.mar_disrupcion.core.storage import quiesce
+from src.mar_disrupcion.core.snowflake import (
+    MIGRATION_NODE_ID,
+    SnowflakeIdGenerator,
+    id_datetime,
+    id_node
+)
+
+logger = logging.getLogger(__name__)
+
+LEGACY_FORMAT = "%Y%m%d%H%M%S%f"
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    """Fixture para una base de datos con el esquema de ids TEXT anterior"""
+    db_path = tmp_path / "legacy.db"
+    start = datetime(2025, 3, 1, 12, 0, 0)
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.execute("""
+            CREATE TABLE memories (
+                id TEXT PRIMARY KEY, category TEXT, content BLOB,
+                importance REAL, timestamp DATETIME, last_accessed DATETIME,
+                access_count INTEGER, embedding BLOB
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE memory_relations (
+                source_id TEXT, target_id TEXT, relation_type TEXT,
+                strength REAL, PRIMARY KEY (source_id, target_id)
+            )
+        """)
+        ids = [(start + timedelta(milliseconds=i // 3)).strftime(LEGACY_FORMAT) for i in range(500)]
+        # Ids distintos dentro del mismo milisegundo
+        ids = [f"{legacy[:-3]}{i % 1000:03d}" for i, legacy in enumerate(ids)]
+        conn.executemany(
+            "INSERT INTO memories VALUES (?, 'test', ?, 0.5, ?, ?, 0, ?)",
+            [(legacy, b"content", start, start, b"") for legacy in ids]
+        )
+        conn.executemany(
+            "INSERT INTO memory_relations VALUES (?, ?, 'related', 0.5)",
+            [(ids[i], ids[i + 1], ) for i in range(0, 499, 2)]
+            + [(ids[0], "20990101000000000000")]
+        )
+    
+    return db_path, ids
+
+
+def _dump(db_path):
+    """Esquema y filas de la base de datos como sentencias SQL."""
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return list(conn.iterdump())
+    finally:
+        conn.close()
+
+def test_snowflake_ids_unique_and_ordered():
+    """Test de ids únicos y monótonos con varios hilos"""
+    generator = SnowflakeIdGenerator(node_id=7)
+    results = []
+    
+    def worker():
+        results.append([generator.next_id() for _ in range(5000)])
+    
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    ids = [i for chunk in results for i in chunk]
+    assert len(set(ids)) == 20000
+    assert all(chunk == sorted(chunk) for chunk in results)
+    assert all(i < 2 ** 63 for i in ids)
+    assert id_node(ids[0]) == 7
+    assert abs((id_datetime(ids[0]) - datetime.now()).total_seconds()) < 5
+
+def test_snowflake_nodes_never_collide():
+    """Test de que distintos nodos en el mismo milisegundo no colisionan"""
+    a = SnowflakeIdGenerator(node_id=1)
+    b = SnowflakeIdGenerator(node_id=2)
+    instant = 1_750_000_000_000
+    
+    ids_a = {a.next_id_at(instant) for _ in range(5000)}
+    ids_b = {b.next_id_at(instant) for _ in range(5000)}
+    
+    assert len(ids_a) == len(ids_b) == 5000
+    assert not ids_a & ids_b
+
+def test_migration_to_integer_ids(legacy_db):
+    """Test de migración completa con traducción de relaciones"""
+    db_path, ids = legacy_db
+    
+    results = memory_migration_runner(db_path, batch_size=64).run()
+    assert results[0]["name"] == "integer_ids"
+    assert results[0]["rows"] == 751  # 500 memorias y 251 relaciones
+    
+    with sqlite3.connect(str(db_path)) as conn:
+        assert not needs_integer_id_migration(conn)
+        assert conn.execute("SELECT typeof(id) FROM memories LIMIT 1").fetchone()[0] == "integer"
+        
+        mapping = dict(conn.execute("SELECT legacy_id, id FROM memory_legacy_ids"))
+        assert len(mapping) == 500
+        
+        # Los ids conservan el orden temporal y la fecha
+        assert [mapping[legacy] for legacy in ids] == sorted(mapping.values())
+        assert id_datetime(mapping[ids[0]]).date() == datetime(2025, 3, 1).date()
+        assert id_node(mapping[ids[0]]) == MIGRATION_NODE_ID
+        
+        # La relación con una memoria inexistente se descarta
+        relations = conn.execute("SELECT source_id, target_id FROM memory_relations").fetchall()
+        assert len(relations) == 250
+        assert (mapping[ids[0]], mapping[ids[1]]) in relations
+        
+        assert conn.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE name LIKE 'migrating_%'"
+        ).fetchone()[0] == 0
+
+def test_migration_is_online_and_resumable(legacy_db):
+    """Test de escrituras concurrentes durante la migración y reanudación"""
+    db_path, ids = legacy_db
+    runner = memory_migration_runner(db_path, batch_size=100)
+    
+    # Simula una caída después de copiar dos lotes
+    original_step = IntegerIdMigration.step
+    calls = []
+    
+    def failing_step(self, conn, position, batch_size):
+        if len(calls) == 2:
+            raise RuntimeError("caída simulada")
+        calls.append(1)
+        return original_step(self, conn, position, batch_size)
+    
+    IntegerIdMigration.step = failing_step
+    try:
+        with pytest.raises(RuntimeError):
+            runner.run()
+    finally:
+        IntegerIdMigration.step = original_step
+    
+    assert runner.status()[0]["status"] == "running"
+    assert runner.status()[0]["rows_done"] == 200
+    
+    # Escrituras del sistema durante la migración sobre filas ya copiadas
+    # y pendientes, y una memoria nueva con id entero
+    new_id = SnowflakeIdGenerator(node_id=3).next_id()
+    with sqlite3.connect(str(db_path)) as writer:
+        writer.execute("UPDATE memories SET access_count = 9 WHERE id = ?", (ids[10],))
+        writer.execute("UPDATE memories SET access_count = 8 WHERE id = ?", (ids[400],))
+        writer.execute("DELETE FROM memories WHERE id = ?", (ids[20],))
+        writer.execute(
+            "INSERT INTO memories VALUES (?, 'test', ?, 0.9, ?, ?, 0, ?)",
+            (new_id, b"new", datetime.now(), datetime.now(), b"")
+        )
+        writer.execute("INSERT INTO memory_relations VALUES (?, ?, 'related', 0.9)", (new_id, ids[10]))
+    
+    # Un proceso nuevo reanuda la migración desde la posición guardada
+    results = memory_migration_runner(db_path, batch_size=100).run()
+    assert results[0]["rows"] < 751
+    assert memory_migration_runner(db_path).status()[0]["status"] == "applied"
+    
+    with sqlite3.connect(str(db_path)) as conn:
+        assert legacy_memory_tables(conn) == []
+        mapping = dict(conn.execute("SELECT legacy_id, id FROM memory_legacy_ids"))
+        
+        def access_count(memory_id):
+            return conn.execute("SELECT access_count FROM memories WHERE id = ?", (memory_id,)).fetchone()[0]
+        
+        assert access_count(mapping[ids[10]]) == 9
+        assert access_count(mapping[ids[400]]) == 8
+        assert conn.execute("SELECT COUNT(*) FROM memories WHERE id = ?", (mapping[ids[20]],)).fetchone()[0] == 0
+        assert access_count(new_id) == 0
+        assert conn.execute(
+            "SELECT COUNT(*) FROM memory_relations WHERE source_id = ? AND target_id = ?",
+            (new_id, mapping[ids[10]])
+        ).fetchone()[0] == 1
+        assert conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0] == 500
+
+@pytest.mark.asyncio
+async def test_legacy_ids_resolve_during_migration(legacy_db):
+    """Test de lectura por id antiguo entre lotes y tras el intercambio"""
+    db_path, ids = legacy_db
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.execute("UPDATE memories SET content = ?", (pickle.dumps({"value": 1}),))
+    
+    system = AdvancedMemorySystem({
+        "memory": {
+            "retention_period": 3600,
+            "context_depth": 5,
+            "confidence_threshold": 0.7,
+            "cache_size": 1024
+        },
+        "neural": {
+            "learning_rate": 0.001,
+            "lstm_hidden_size": 256,
+            "lstm_num_layers": 2,
+            "dropout_rate": 0.2
+        }
+    }, db_path=str(db_path))
+    
+    # Un lote copiado: sus ids ya tienen correspondencia, pero la tabla viva
+    # sigue siendo la de ids TEXT
+    migration = IntegerIdMigration()
+    with sqlite3.connect(str(db_path)) as conn:
+        position = migration.prepare(conn, None)
+        copied, position = migration.step(conn, position, 2)
+    assert copied == 2
+    
+    for legacy in (ids[0], ids[1], ids[250]):
+        memory = await system.get_memory(legacy)
+        assert memory["id"] == legacy
+        assert memory["content"] == {"value": 1}
+    
+    with sqlite3.connect(str(db_path)) as conn:
+        migration.finalize(conn, position, 200)
+        mapping = dict(conn.execute("SELECT legacy_id, id FROM memory_legacy_ids"))
+    
+    for legacy in (ids[0], ids[250]):
+        memory = await system.get_memory(legacy)
+        assert memory["id"] == mapping[legacy]
+        assert memory["content"] == {"value": 1}
+
+def test_migration_stops_when_database_is_replaced(legacy_db):
+    """Test de una restauración entre lotes de la migración"""
+    db_path, ids = legacy_db
+    runner = memory_migration_runner(db_path, batch_size=100)
+    
+    # La restauración espera al lote en curso y se hace entre dos lotes
+    restored = []
+    
+    def restore_between_batches(rows, elapsed):
+        if not restored:
+            with quiesce(db_path, timeout=1):
+                restored.append(True)
+    
+    runner._throttle = restore_between_batches
+    with pytest.raises(MemoryError):
+        runner.run()
+    assert runner.status()[0]["rows_done"] == 100
+    
+    # Una ejecución nueva reanuda desde la posición guardada
+    results = memory_migration_runner(db_path, batch_size=100).run()
+    assert results[0]["rows"] == 651
+    with sqlite3.connect(str(db_path)) as conn:
+        assert not needs_integer_id_migration(conn)
+
+class ImportanceScaleMigration(BatchRewriteMigration):
+    """Migración de ejemplo: añade una columna y la rellena por lotes"""
+    
+    version = 2
+    name = "importance_pct"
+    columns = ("importance",)
+    
+    def prepare(self, conn, position):
+        self.add_column(conn, "importance_pct INTEGER")
+        return super().prepare(conn, position)
+    
+    def transform(self, row):
+        return {"importance_pct": round(row["importance"] * 100)}
+
+def test_batch_rewrite_on_database_copy(legacy_db, tmp_path):
+    """Test de migración por lotes sobre una copia desechable de la base de datos"""
+    db_path, _ = legacy_db
+    copy_path = tmp_path / "copy.db"
+    shutil.copy(db_path, copy_path)
+    
+    runner = MigrationRunner(copy_path, [ImportanceScaleMigration()], batch_size=50)
+    results = runner.run()
+    
+    assert results == [{**results[0], "rows": 500, "batches": 10}]
+    with sqlite3.connect(str(copy_path)) as conn:
+        assert conn.execute("SELECT DISTINCT importance_pct FROM memories").fetchall() == [(50,)]
+    
+    # Ya aplicada: no vuelve a ejecutarse
+    assert runner.run() == []
+    
+    # La base de datos original no se modificó
+    with sqlite3.connect(str(db_path)) as conn:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(memories)")]
+        assert "importance_pct" not in columns
+
+def test_dry_run_estimates_without_changes(legacy_db):
+    """Test de estimación de duración y espacio sin modificar la base de datos"""
+    db_path, _ = legacy_db
+    before = _dump(db_path)
+    
+    runner = MigrationRunner(
+        db_path,
+        [IntegerIdMigration(), ImportanceScaleMigration()],
+        batch_size=100,
+        max_rows_per_second=1000
+    )
+    estimates = runner.run(dry_run=True)
+    
+    assert [e["name"] for e in estimates] == ["integer_ids", "importance_pct"]
+    copy, rewrite = estimates
+    assert copy["rows"] == 751
+    assert copy["batches"] == 8
+    assert 0 < copy["rows_per_second"] <= 1000
+    assert copy["estimated_seconds"] >= 0.75
+    assert copy["estimated_disk_overhead_bytes"] > rewrite["estimated_disk_overhead_bytes"] > 0
+    
+    assert _dump(db_path) == before
+    assert runner.status()[0]["status"] == "pending"
+
+def test_runner_throttle(legacy_db):
+    """Test del límite de filas por segundo"""
+    db_path, _ = legacy_db
+    runner = MigrationRunner(db_path, [ImportanceScaleMigration()], batch_size=100, max_rows_per_second=1000)
+    
+    start = time.perf_counter()
+    runner.run()
+    
+    assert time.perf_counter() - start >= 0.45
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -3,19 +3,31 @@ import asyncio
 import logging
 from pathlib import Path
 from datetime import datetime, timedelta
+import io
+import os
 import shutil
+import sqlite3
+import pickle
+import random
+import threading
+import time
+from contextlib import contextmanager
 
+from src.mar_disrupcion.core import memory_backup, memory_optimizer
 from src.mar_disrupcion.core.memory_system import AdvancedMemorySystem
 from src.mar_disrupcion.core.memory_optimizer import MemoryOptimizer
 from src.mar_disrupcion.core.memory_backup import MemoryBackup
+from src.mar_disrupcion.core.chunk_store import MAX_CHUNK_SIZE, MIN_CHUNK_SIZE, iter_chunks
+from src.mar_disrupcion.core.exceptions import BackupIntegrityError
+from src.mar_disrupcion.core.storage import connect, quiesce
+from src.mar_disrupcion.core.wal_archiver import FRAME_HEADER, WAL_HEADER, WalArchiver, read_wal_header, scan_frames
 from src.mar_disrupcion.core.memory_performance import MemoryPerformanceTest
 
 logger = logging.getLogger(__name__)
 
-@pytest.fixture
-async def memory_system():
-    """Fixture para el sistema de memoria de prueba"""
-    config = {
+def memory_system_config():
+    """Configuración mínima del sistema de memoria para pruebas"""
+    return {
         "memory": {
             "retention_period": 3600,
             "context_depth": 5,
@@ -29,6 +41,11 @@ async def memory_system():
             "dropout_rate": 0.2
         }
     }
+
+@pytest.fixture
+async def memory_system():
+    """Fixture para el sistema de memoria de prueba"""
+    config = memory_system_config()
     
     # Usar base de datos temporal para pruebas
     test_db = Path("test_memory.db")
@@ -40,6 +57,33 @@ async def memory_system():
     if test_db.exists():
         test_db.unlink()
 
+@pytest.fixture
+def fragmented_db(tmp_path):
+    """Fixture para una base de datos con páginas libres tras un borrado masivo"""
+    db_path = tmp_path / "fragmented.db"
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("""
+            CREATE TABLE memories (
+                id TEXT PRIMARY KEY, category TEXT, content BLOB,
+                importance REAL, timestamp DATETIME, last_accessed DATETIME,
+                access_count INTEGER, embedding BLOB
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE memory_relations (
+                source_id TEXT, target_id TEXT, relation_type TEXT,
+                strength REAL, PRIMARY KEY (source_id, target_id)
+            )
+        """)
+        conn.executemany(
+            "INSERT INTO memories (id, category, content, importance) VALUES (?, ?, ?, ?)",
+            [(str(i), "test", b"x" * 2000, 0.5) for i in range(2000)]
+        )
+        conn.execute("DELETE FROM memories WHERE CAST(id AS INTEGER) % 4 != 0")
+    
+    return db_path
+
 @pytest.mark.asyncio
 async def test_memory_optimization(memory_system):
     """Test de optimización del sistema de memoria"""
@@ -56,6 +100,602 @@ async def test_memory_optimization(memory_system):
     # Probar limpieza de memorias antiguas
     await optimizer.clean_old_memories(retention_days=1)
 
+def test_budgeted_maintenance_slices(fragmented_db):
+    """Test de mantenimiento incremental acotado en tiempo"""
+    optimizer = MemoryOptimizer(fragmented_db, fragmentation_threshold=0.9)
+    
+    stats = optimizer.get_storage_stats()
+    assert stats["auto_vacuum"] == "incremental"
+    assert stats["freelist_count"] > 0
+    assert 0 < stats["fragmentation"] < 1
+    
+    # Una porción con pasos pequeños libera páginas sin vaciar la lista
+    partial = optimizer.run_maintenance_slice(budget_seconds=0, pages_per_step=8)
+    assert partial["pages_freed"] <= 8
+    assert not partial["optimized"]
+    
+    full = optimizer.run_maintenance_slice(budget_seconds=5, pages_per_step=64)
+    assert full["freelist_count"] == 0
+    assert full["optimized"]
+    assert full["file_bytes"] < stats["file_bytes"]
+    
+    # Sin fragmentación no se ejecuta el VACUUM completo
+    assert not optimizer.vacuum_if_fragmented()
+
+def test_full_vacuum_above_threshold(tmp_path):
+    """Test de VACUUM completo solo al superar el umbral de fragmentación"""
+    db_path = tmp_path / "legacy.db"
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.execute("CREATE TABLE memories (id TEXT PRIMARY KEY, category TEXT, importance REAL, timestamp DATETIME, last_accessed DATETIME)")
+        conn.execute("CREATE TABLE memory_relations (source_id TEXT, target_id TEXT, strength REAL)")
+        conn.executemany(
+            "INSERT INTO memories (id, category) VALUES (?, ?)",
+            [(str(i), "x" * 500) for i in range(2000)]
+        )
+        conn.execute("DELETE FROM memories")
+    
+    optimizer = MemoryOptimizer(db_path, fragmentation_threshold=0.3)
+    assert optimizer.get_storage_stats()["auto_vacuum"] == "none"
+    
+    assert optimizer.vacuum_if_fragmented()
+    stats = optimizer.get_storage_stats()
+    assert stats["freelist_count"] == 0
+    assert stats["auto_vacuum"] == "incremental"
+
+@pytest.mark.asyncio
+async def test_chunked_retention_deletes(fragmented_db):
+    """Test de borrado por bloques de memorias expiradas y sus relaciones"""
+    old = datetime.now() - timedelta(days=60)
+    recent = datetime.now()
+    with sqlite3.connect(str(fragmented_db)) as conn:
+        conn.execute("DELETE FROM memories")
+        conn.executemany(
+            "INSERT INTO memories (id, category, importance, timestamp) VALUES (?, ?, ?, ?)",
+            [(f"old-{i}", "test", 0.5, old) for i in range(250)]
+            + [(f"vital-{i}", "test", 0.9, old) for i in range(10)]
+            + [(f"new-{i}", "test", 0.5, recent) for i in range(20)]
+        )
+        conn.executemany(
+            "INSERT INTO memory_relations (source_id, target_id, strength) VALUES (?, ?, ?)",
+            [(f"old-{i}", f"new-{i % 20}", 0.5) for i in range(50)]
+            + [(f"new-{i}", f"old-{i}", 0.5) for i in range(20)]
+            + [("new-0", "vital-0", 0.5)]
+        )
+    
+    optimizer = MemoryOptimizer(fragmented_db)
+    stats = await optimizer.clean_old_memories(retention_days=30, chunk_size=100, pause_seconds=0)
+    
+    assert stats["deleted"] == 250
+    assert stats["relations_deleted"] == 70
+    assert stats["chunks"] == 3
+    assert stats["rows_per_second"] > 0
+    assert 0 < stats["max_lock_seconds"] <= stats["lock_seconds"]
+    
+    with sqlite3.connect(str(fragmented_db)) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0] == 30
+        assert conn.execute("SELECT COUNT(*) FROM memory_relations").fetchone()[0] == 1
+
+@pytest.mark.asyncio
+async def test_retention_searches_outside_write_lock(fragmented_db, monkeypatch):
+    """Test de que la búsqueda de memorias expiradas no se hace con el lock de escritura"""
+    old = datetime.now() - timedelta(days=60)
+    with sqlite3.connect(str(fragmented_db)) as conn:
+        conn.execute("DELETE FROM memories")
+        conn.executemany(
+            "INSERT INTO memories (id, category, importance, timestamp) VALUES (?, ?, ?, ?)",
+            [(f"old-{i}", "test", 0.5, old) for i in range(250)]
+        )
+    
+    statements = []
+    traced_connect = memory_optimizer.connect
+    
+    @contextmanager
+    def connect(*args, **kwargs):
+        with traced_connect(*args, **kwargs) as conn:
+            conn.set_trace_callback(statements.append)
+            yield conn
+    
+    monkeypatch.setattr(memory_optimizer, "connect", connect)
+    optimizer = MemoryOptimizer(fragmented_db)
+    stats = await optimizer.clean_old_memories(retention_days=30, chunk_size=100, pause_seconds=0)
+    
+    assert stats["deleted"] == 250
+    begins = [i for i, sql in enumerate(statements) if sql == "BEGIN IMMEDIATE"]
+    searches = [i for i, sql in enumerate(statements) if "ORDER BY timestamp" in sql]
+    # Una búsqueda antes de cada bloque y una final sin candidatos ni lock
+    assert len(begins) == stats["chunks"] == 3
+    assert len(searches) == 4
+    assert all(search < begin for search, begin in zip(searches, begins))
+    for begin in begins:
+        commit = statements.index("COMMIT", begin)
+        assert not any("ORDER BY timestamp" in sql for sql in statements[begin:commit])
+
+@pytest.mark.asyncio
+async def test_partitioned_retention(tmp_path, monkeypatch):
+    """Test de particionado diario y retención por eliminación de particiones"""
+    monkeypatch.chdir(tmp_path)
+    config = {
+        "memory": {
+            "retention_period": 86400,
+            "context_depth": 5,
+            "confidence_threshold": 0.7,
+            "cache_size": 1024,
+            "partition_by_day": True
+        },
+        "neural": {
+            "learning_rate": 0.001,
+            "lstm_hidden_size": 256,
+            "lstm_num_layers": 2,
+            "dropout_rate": 0.2
+        }
+    }
+    system = AdvancedMemorySystem(config)
+    
+    # Partición antigua fuera del período de retención
+    old_day = datetime.now() - timedelta(days=3)
+    with sqlite3.connect(str(system.db_path)) as conn:
+        old_table = system._ensure_partition(conn, old_day.date())
+        conn.execute(
+            f"INSERT INTO {old_table} (id, category, importance, timestamp) VALUES (?, ?, ?, ?)",
+            (system.id_generator.next_id_at(int(old_day.timestamp() * 1000)), "test", 0.9, old_day)
+        )
+    
+    # El LSTM espera contenidos de 512 valores
+    first_id = await system.store_memory([0.1] * 512, category="test", importance=0.4)
+    await system.store_memory([0.2] * 512, category="test", importance=0.6, related_to=first_id)
+    
+    # La partición del día nuevo aplica la retención
+    assert old_table not in system._partitions
+    assert system._partition_name(datetime.now().date()) in system._partitions
+    
+    memories = await system.retrieve_memories("test", limit=10)
+    assert [m["importance"] for m in memories] == [0.6, 0.4]
+    assert memories[0]["related_memories"][0]["id"] == first_id
+
+@pytest.mark.asyncio
+async def test_partitioning_keeps_rows_in_memories(tmp_path):
+    """Test de que activar el particionado no oculta las memorias del mismo día en memories"""
+    db_path = str(tmp_path / "memory.db")
+    plain = AdvancedMemorySystem(memory_system_config(), db_path=db_path)
+    earlier_id = await plain.store_memory([0.1] * 512, category="test", importance=0.4)
+    
+    config = memory_system_config()
+    config["memory"]["partition_by_day"] = True
+    system = AdvancedMemorySystem(config, db_path=db_path)
+    later_id = await system.store_memory([0.2] * 512, category="test", importance=0.6, related_to=earlier_id)
+    assert system._partition_name(datetime.now().date()) in system._partitions
+    
+    assert (await system.get_memory(earlier_id))["importance"] == 0.4
+    memories = await system.retrieve_memories("test", limit=10)
+    assert [m["id"] for m in memories] == [later_id, earlier_id]
+    assert memories[0]["related_memories"][0]["id"] == earlier_id
+    
+    # La actualización de accesos llega a las dos tablas
+    assert (await system.get_memory(earlier_id))["access_count"] == 1
+    assert (await system.get_memory(later_id))["access_count"] == 1
+
+@pytest.mark.asyncio
+async def test_partitions_created_by_another_instance(tmp_path):
+    """Test de que una instancia ve las particiones que crea otra sobre la misma base de datos"""
+    db_path = str(tmp_path / "memory.db")
+    config = memory_system_config()
+    config["memory"]["partition_by_day"] = True
+    reader = AdvancedMemorySystem(config, db_path=db_path)
+    writer = AdvancedMemorySystem(config, db_path=db_path)
+    
+    memory_id = await writer.store_memory([0.1] * 512, category="test", importance=0.5)
+    
+    assert (await reader.get_memory(memory_id))["id"] == memory_id
+    assert [m["id"] for m in await reader.retrieve_memories("test", limit=10)] == [memory_id]
+
+@pytest.mark.asyncio
+async def test_legacy_id_lookup_across_migration(tmp_path):
+    """Test de búsqueda por ids TEXT anteriores antes y después de migrar"""
+    db_path = tmp_path / "legacy.db"
+    legacy_id = "20250301120000123456"
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.execute("""
+            CREATE TABLE memories (
+                id TEXT PRIMARY KEY, category TEXT, content BLOB,
+                importance REAL, timestamp DATETIME, last_accessed DATETIME,
+                access_count INTEGER, embedding BLOB
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE memory_relations (
+                source_id TEXT, target_id TEXT, relation_type TEXT,
+                strength REAL, PRIMARY KEY (source_id, target_id)
+            )
+        """)
+        conn.execute(
+            "INSERT INTO memories VALUES (?, 'test', ?, 0.5, ?, ?, 0, ?)",
+            (legacy_id, pickle.dumps({"legacy": True}), datetime.now(), datetime.now(), pickle.dumps(None))
+        )
+    
+    system = AdvancedMemorySystem(memory_system_config(), db_path=str(db_path))
+    
+    # Antes de migrar: la tabla TEXT admite ids nuevos y antiguos
+    new_id = await system.store_memory([0.1] * 512, category="test", related_to=legacy_id)
+    assert (await system.get_memory(legacy_id))["content"] == {"legacy": True}
+    
+    await system.run_migrations(batch_size=10, pause_seconds=0)
+    
+    migrated = await system.get_memory(legacy_id)
+    assert isinstance(migrated["id"], int)
+    assert migrated["content"] == {"legacy": True}
+    assert (await system.get_memory(new_id))["id"] == new_id
+    
+    memories = await system.retrieve_memories("test", limit=10)
+    related = next(m for m in memories if m["id"] == new_id)["related_memories"]
+    assert related[0]["id"] == migrated["id"]
+
+@pytest.mark.asyncio
+async def test_stepped_backup_allows_writers(tmp_path):
+    """Test de backup por pasos con escrituras concurrentes y progreso"""
+    db_path = tmp_path / "memory.db"
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.execute("PRAGMA journal_mode = wal")
+        conn.execute("CREATE TABLE blobs (id INTEGER PRIMARY KEY, data BLOB)")
+        conn.executemany("INSERT INTO blobs (data) VALUES (?)", [(b"x" * 2048,) for _ in range(500)])
+    
+    backup_system = MemoryBackup(db_path, tmp_path / "backups", pages_per_step=32, step_sleep=0)
+    updates = []
+    writes = []
+    
+    def on_progress(update):
+        updates.append(update)
+        # Un escritor sin espera por bloqueos avanza durante el backup
+        if len(updates) == 2:
+            writer = sqlite3.connect(str(db_path), timeout=0)
+            with writer:
+                writer.execute("INSERT INTO blobs (data) VALUES (?)", (b"y",))
+            writer.close()
+            writes.append(True)
+    
+    backup_path = await backup_system.create_backup(compress=False, progress=on_progress)
+    stats = backup_system.last_backup_stats
+    
+    assert writes == [True]
+    assert stats["steps"] > 10
+    assert stats["restarts"] == 1
+    assert stats["bytes"] == stats["pages"] * 4096
+    assert stats["bytes_per_second"] > 0
+    assert updates[-1]["pages_copied"] == updates[-1]["total_pages"]
+    assert updates[-1]["percent"] == 100.0
+    
+    with sqlite3.connect(str(backup_path)) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 501
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("compression", ["zstd", "gzip"])
+async def test_compressed_backup_checksum(tmp_path, compression):
+    """Test de backups comprimidos con checksum verificado antes de restaurar"""
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    db_path = tmp_path / "memory.db"
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.execute("CREATE TABLE blobs (id INTEGER PRIMARY KEY, data BLOB)")
+        conn.executemany("INSERT INTO blobs (data) VALUES (?)", [(b"x" * 2048,) for _ in range(200)])
+    
+    backup_dir = tmp_path / "backups"
+    backup_system = MemoryBackup(db_path, backup_dir, compression=compression)
+    backup_path = await backup_system.create_backup()
+    stats = backup_system.last_backup_stats
+    
+    assert backup_path.name.endswith({"zstd": ".db.zst", "gzip": ".db.gz"}[compression])
+    assert [p.name for p in backup_dir.iterdir()] == [backup_path.name]
+    assert stats["codec"] == compression
+    assert stats["compression_ratio"] > 1
+    
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.execute("DELETE FROM blobs WHERE id > 100")
+    assert await backup_system.restore_backup(backup_path)
+    with sqlite3.connect(str(db_path)) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 200
+    
+    # Un backup dañado (checksum de la cabecera o datos) se rechaza sin
+    # tocar la base de datos
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.execute("DELETE FROM blobs WHERE id > 150")
+    original = backup_path.read_bytes()
+    for offset in (10, len(original) - 20):
+        corrupted = bytearray(original)
+        corrupted[offset] ^= 0xFF
+        backup_path.write_bytes(bytes(corrupted))
+        
+        with pytest.raises(BackupIntegrityError):
+            await backup_system.restore_backup(backup_path)
+        with sqlite3.connect(str(db_path)) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 150
+    assert not list(backup_dir.glob("*.restore"))
+
+@pytest.mark.asyncio
+async def test_compressed_backup_syncs_only_output(tmp_path, monkeypatch):
+    """Test de que la copia sin comprimir es temporal y no se sincroniza"""
+    db_path = tmp_path / "memory.db"
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.execute("CREATE TABLE blobs (id INTEGER PRIMARY KEY, data BLOB)")
+        conn.executemany("INSERT INTO blobs (data) VALUES (?)", [(b"x" * 2048,) for _ in range(200)])
+    
+    backup_dir = tmp_path / "backups"
+    backup_system = MemoryBackup(db_path, backup_dir, compression="gzip", step_sleep=0)
+    synced = []
+    fsync_and_rename = memory_backup._fsync_and_rename
+    
+    def recording_fsync_and_rename(partial_path, path):
+        synced.append(path.name)
+        fsync_and_rename(partial_path, path)
+    
+    monkeypatch.setattr(memory_backup, "_fsync_and_rename", recording_fsync_and_rename)
+    backup_path = await backup_system.create_backup()
+    
+    assert synced == [backup_path.name]
+    assert [p.name for p in backup_dir.iterdir()] == [backup_path.name]
+    
+    # Si la compresión falla no queda ningún archivo con aspecto de backup
+    def failing_compress(snapshot_path, compressed_path):
+        raise OSError("disco lleno")
+    monkeypatch.setattr(backup_system, "_compress_snapshot", failing_compress)
+    with pytest.raises(OSError):
+        await backup_system.create_backup()
+    assert [p.name for p in backup_dir.iterdir()] == [backup_path.name]
+
+def test_content_defined_chunks_resync():
+    """Test de límites de chunk estables ante inserciones y tamaños de bloque"""
+    # Datos con semilla: los límites de los chunks son reproducibles
+    data = random.Random(7).randbytes(2 * 1024 * 1024)
+    chunks = list(iter_chunks(io.BytesIO(data)))
+    
+    assert b"".join(chunks) == data
+    assert all(MIN_CHUNK_SIZE <= len(c) <= MAX_CHUNK_SIZE for c in chunks[:-1])
+    assert list(iter_chunks(io.BytesIO(data), block_size=100_000)) == chunks
+    
+    # Insertar bytes al principio solo cambia el primer chunk
+    shifted = list(iter_chunks(io.BytesIO(b"cabecera" + data)))
+    assert len(set(chunks) - set(shifted)) == 1
+
+@pytest.mark.asyncio
+async def test_incremental_backup_dedup(tmp_path):
+    """Test de backups incrementales con chunks deduplicados y recolección"""
+    # Datos con semilla: los límites de los chunks son reproducibles
+    rng = random.Random(42)
+    db_path = tmp_path / "memory.db"
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.execute("CREATE TABLE blobs (id INTEGER PRIMARY KEY, data BLOB)")
+        conn.executemany("INSERT INTO blobs (data) VALUES (?)", [(rng.randbytes(1024),) for _ in range(3000)])
+    
+    backup_dir = tmp_path / "backups"
+    backup_system = MemoryBackup(db_path, backup_dir, step_sleep=0)
+    first = await backup_system.create_incremental_backup()
+    first_stats = backup_system.last_backup_stats
+    assert first_stats["new_chunks"] == first_stats["chunks"] > 10
+    
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.execute("UPDATE blobs SET data = ? WHERE id = 1500", (rng.randbytes(1024),))
+    second = await backup_system.create_incremental_backup()
+    second_stats = backup_system.last_backup_stats
+    
+    # Solo se escriben los chunks con páginas modificadas
+    assert second_stats["new_chunks"] <= 3
+    assert second_stats["bytes_written"] < first_stats["bytes_written"] / 5
+    
+    # Al conservar un único backup se eliminan los chunks solo del primero
+    chunks_before = len(list((backup_dir / "chunks").glob("*/*")))
+    await backup_system._cleanup_old_backups(keep=1)
+    assert not first.exists()
+    assert len(list((backup_dir / "chunks").glob("*/*"))) == chunks_before - second_stats["new_chunks"]
+    
+    with sqlite3.connect(str(db_path)) as conn:
+        expected = conn.execute("SELECT data FROM blobs WHERE id = 1500").fetchone()[0]
+        conn.execute("DELETE FROM blobs")
+    assert await backup_system.restore_backup(second)
+    with sqlite3.connect(str(db_path)) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 3000
+        assert conn.execute("SELECT data FROM blobs WHERE id = 1500").fetchone()[0] == expected
+
+@pytest.mark.asyncio
+async def test_incremental_backup_temporary_files(tmp_path, monkeypatch):
+    """Test de limpieza de la instantánea y de backups en curso"""
+    db_path = tmp_path / "memory.db"
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.execute("CREATE TABLE blobs (id INTEGER PRIMARY KEY, data BLOB)")
+        conn.executemany("INSERT INTO blobs (data) VALUES (?)", [(os.urandom(1024),) for _ in range(200)])
+    
+    backup_dir = tmp_path / "backups"
+    backup_system = MemoryBackup(db_path, backup_dir, step_sleep=0)
+    
+    # Un fallo al trocear no deja la instantánea en el disco
+    def failing_manifest(snapshot_path, manifest_path):
+        raise OSError("disco lleno")
+    monkeypatch.setattr(backup_system, "_write_manifest", failing_manifest)
+    with pytest.raises(OSError):
+        await backup_system.create_incremental_backup()
+    assert list(backup_dir.glob("memory_backup_*")) == []
+    monkeypatch.undo()
+    
+    manifests = [await backup_system.create_incremental_backup() for _ in range(2)]
+    assert sorted(backup_dir.glob("memory_backup_*")) == manifests
+    
+    # Un backup en curso, más reciente que todos, ni se borra ni ocupa
+    # el hueco de los que se conservan
+    in_progress = backup_dir / "memory_backup_29990101_000000_000000.db.zst.partial"
+    in_progress.write_bytes(b"\0" * 1024)
+    os.utime(in_progress, (time.time() + 60, time.time() + 60))
+    await backup_system._cleanup_old_backups(keep=1)
+    assert in_progress.exists()
+    assert manifests[1].exists()
+    assert not manifests[0].exists()
+
+@pytest.mark.asyncio
+async def test_point_in_time_restore(tmp_path):
+    """Test de archivado continuo del WAL y restauración a un instante"""
+    db_path = tmp_path / "memory.db"
+    with connect(db_path) as conn:
+        conn.execute("CREATE TABLE blobs (id INTEGER PRIMARY KEY, data BLOB)")
+    
+    backup_system = MemoryBackup(db_path, tmp_path / "backups", step_sleep=0)
+    archiver = WalArchiver(backup_system, segment_bytes=256 * 1024)
+    await archiver.start()
+    before_base = datetime.now() - timedelta(seconds=1)
+    
+    marks = []
+    try:
+        for _ in range(3):
+            with connect(db_path) as conn:
+                conn.executemany("INSERT INTO blobs (data) VALUES (?)", [(os.urandom(1024),) for _ in range(200)])
+            await archiver.archive_once()
+            await asyncio.sleep(0.01)
+            marks.append(datetime.now())
+            await asyncio.sleep(0.01)
+    finally:
+        await archiver.close()
+    
+    # El WAL se vació sin perder frames entre generaciones
+    assert archiver.stats["rotations"] >= 1
+    assert archiver.stats["gaps"] == 0
+    assert archiver.stats["chains"] == 1
+    
+    for rows, mark in zip((200, 400, 600), marks):
+        assert await backup_system.restore_to(mark)
+        with connect(db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == rows
+    
+    with pytest.raises(ValueError):
+        await backup_system.restore_to(before_base)
+
+def test_wal_scan_stops_at_bad_checksum(tmp_path):
+    """Test de que un commit escrito a medias no se acepta aunque sus salts coincidan"""
+    db_path = tmp_path / "memory.db"
+    conn = sqlite3.connect(str(db_path))
+    try:
+        conn.execute("PRAGMA journal_mode = wal")
+        conn.execute("PRAGMA wal_autocheckpoint = 0")
+        conn.execute("CREATE TABLE blobs (id INTEGER PRIMARY KEY, data BLOB)")
+        for _ in range(20):
+            with conn:
+                conn.execute("INSERT INTO blobs (data) VALUES (?)", (os.urandom(512),))
+        
+        wal_path = Path(f"{db_path}-wal")
+        header = read_wal_header(wal_path)
+        raw = wal_path.read_bytes()
+        data = raw[WAL_HEADER.size:]
+    finally:
+        conn.close()
+    
+    frame_size = FRAME_HEADER.size + header["page_size"]
+    args = (header["page_size"], header["salts"], header["checksum"], header["big_endian"])
+    extent, committed, checksum = scan_frames(data, *args)
+    assert extent == committed == len(data) // frame_size * frame_size
+    assert checksum == FRAME_HEADER.unpack_from(data, committed - frame_size)[4:6]
+    
+    # El escaneo puede continuar desde un commit con su checksum
+    middle = 5 * frame_size
+    _, first, middle_checksum = scan_frames(data[:middle], *args)
+    assert first + scan_frames(data[first:], args[0], args[1], middle_checksum, args[3])[1] == committed
+    
+    # Una página incompleta en el último commit lo invalida
+    torn = bytearray(data)
+    torn[committed - 100] ^= 0xFF
+    last_commit = max(
+        offset + frame_size for offset in range(0, committed - frame_size, frame_size)
+        if FRAME_HEADER.unpack_from(data, offset)[1]
+    )
+    assert scan_frames(bytes(torn), *args)[:2] == (committed - frame_size, last_commit)
+    
+    # Y una cabecera con checksum incorrecto invalida el WAL
+    wal_path.write_bytes(raw[:WAL_HEADER.size - 1] + bytes([raw[WAL_HEADER.size - 1] ^ 1]) + data)
+    assert read_wal_header(wal_path) is None
+
+@pytest.mark.asyncio
+async def test_wal_archiver_reopens_after_quiesce(tmp_path):
+    """Test de reapertura del archivador cuando la base de datos se sustituye"""
+    db_path = tmp_path / "memory.db"
+    with connect(db_path) as conn:
+        conn.execute("CREATE TABLE blobs (id INTEGER PRIMARY KEY, data BLOB)")
+    
+    archiver = WalArchiver(MemoryBackup(db_path, tmp_path / "backups", step_sleep=0))
+    await archiver.start()
+    try:
+        reader = archiver._reader
+        # Entre ciclos el archivador no retiene el control de conexiones
+        with quiesce(db_path, timeout=1):
+            pass
+        
+        with connect(db_path) as conn:
+            conn.execute("INSERT INTO blobs (data) VALUES (?)", (os.urandom(1024),))
+        await archiver.archive_once()
+        
+        assert archiver._reader is not reader
+        assert archiver.stats["chains"] == 2
+        assert archiver.stats["gaps"] == 0
+    finally:
+        await archiver.close()
+
+@pytest.mark.asyncio
+async def test_restore_swaps_file_atomically(tmp_path):
+    """Test de restauración por renombrado con conexiones detenidas y reversión"""
+    db_path = tmp_path / "memory.db"
+    with connect(db_path) as conn:
+        conn.execute("CREATE TABLE blobs (id INTEGER PRIMARY KEY, data BLOB)")
+        conn.executemany("INSERT INTO blobs (data) VALUES (?)", [(os.urandom(256),) for _ in range(100)])
+    
+    backup_system = MemoryBackup(db_path, tmp_path / "backups", step_sleep=0, quiesce_timeout=0.5)
+    backup_path = await backup_system.create_backup()
+    with connect(db_path) as conn:
+        conn.execute("DELETE FROM blobs WHERE id > 10")
+    
+    def count():
+        with connect(db_path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+    
+    # Una conexión que no se cierra a tiempo impide la restauración
+    held = threading.Event()
+    release = threading.Event()
+    
+    def hold_connection():
+        with connect(db_path):
+            held.set()
+            release.wait()
+    
+    holder = threading.Thread(target=hold_connection)
+    holder.start()
+    held.wait()
+    try:
+        with pytest.raises(TimeoutError):
+            await backup_system.restore_backup(backup_path)
+    finally:
+        release.set()
+        holder.join()
+    assert count() == 10
+    
+    # Restauración: la base de datos anterior queda en .pre-restore
+    assert await backup_system.restore_backup(backup_path)
+    assert count() == 100
+    previous = db_path.with_name("memory.db.pre-restore")
+    with sqlite3.connect(str(previous)) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 10
+    
+    # Si la base de datos sustituida no se abre, se revierte el renombrado
+    with connect(db_path) as conn:
+        conn.execute("DELETE FROM blobs WHERE id > 50")
+    check_database = backup_system._check_database
+    checks = []
+    
+    def counting_check(path):
+        checks.append(path)
+        check_database(path)
+    
+    def failing_header(path):
+        raise BackupIntegrityError("fallo simulado")
+    
+    # La verificación completa se hace una vez, sobre la copia preparada
+    backup_system._check_database = counting_check
+    backup_system._check_header = failing_header
+    assert not await backup_system.restore_backup(backup_path)
+    assert [p.suffix for p in checks] == [".staged"]
+    assert count() == 50
+    assert [p.name for p in tmp_path.iterdir() if p.suffix == ".staged"] == []
+
 @pytest.mark.asyncio
 async def test_backup_system(memory_system):
     """Test del sistema de backup"""
@@ -0,0 +1,131 @@
+import pytest
+import asyncio
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.mar_disrupcion.core.profiler import SamplingProfiler, install_profiler
+
+
+def busy_worker(seconds):
+    """Trabajo de CPU reconocible en las pilas"""
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        sum(range(1000))
+
+
+async def busy_coroutine(seconds):
+    """Bucle de eventos ocupado sin ceder el control"""
+    busy_worker(seconds)
+
+
+@pytest.mark.asyncio
+async def test_samples_event_loop_and_executor_workers(tmp_path):
+    """Test de pilas colapsadas del bucle de eventos y de los trabajadores"""
+    profiler = SamplingProfiler(output_dir=tmp_path, interval=0.002)
+    profiler.add_thread()
+    other = threading.Thread(target=busy_worker, args=(0.3,), name="otro-hilo")
+    other.start()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert profiler.start(duration=5)
+        assert not profiler.start()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            loop.run_in_executor(executor, busy_worker, 0.5),
+            busy_coroutine(0.5)
+        )
+        result = profiler.stop()
+    other.join()
+
+    assert not profiler.running
+    assert result["samples"] > 10
+    assert result["elapsed"] < 5
+    assert any(name.startswith("ThreadPoolExecutor-") for name in result["threads"])
+    assert "otro-hilo" not in result["threads"]
+
+    lines = open(result["path"]).read().splitlines()
+    stacks = {line.rsplit(" ", 1)[0]: int(line.rsplit(" ", 1)[1]) for line in lines}
+    assert sum(stacks.values()) >= result["samples"]
+    executor_stacks = [s for s in stacks if s.startswith("ThreadPoolExecutor-")]
+    assert any("busy_worker (" in s and "/test_profiler.py:" in s for s in executor_stacks)
+    assert any("busy_coroutine" in s and not s.startswith("ThreadPoolExecutor") for s in stacks)
+    # Los trabajadores se agrupan sin su índice
+    assert all(not s.split(";", 1)[0].endswith(("_0", "_1")) for s in executor_stacks)
+
+
+def test_window_ends_by_itself(tmp_path):
+    """Test de que el perfilado termina al acabar su ventana"""
+    profiler = SamplingProfiler(output_dir=tmp_path, interval=0.001)
+    profiler.add_thread()
+    profiler.start(duration=0.1)
+    time.sleep(0.3)
+
+    assert not profiler.running
+    assert profiler.last_result["samples"] > 0
+    assert os.path.exists(profiler.last_result["path"])
+
+
+def test_environment_starts_profiling(tmp_path):
+    """Test de activación por variable de entorno"""
+    idle = install_profiler(signum=None, environ={}, output_dir=tmp_path)
+    assert not idle.running
+
+    profiler = install_profiler(
+        signum=None,
+        environ={"MAR_PROFILE": "0.1", "MAR_PROFILE_DIR": str(tmp_path / "env")},
+        interval=0.001
+    )
+    assert profiler.running
+    result = profiler.stop()
+    assert result["path"].startswith(str(tmp_path / "env"))
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGUSR2"), reason="SIGUSR2 no disponible")
+def test_signal_toggles_profiling(tmp_path):
+    """Test de activación y parada con SIGUSR2"""
+    previous = signal.getsignal(signal.SIGUSR2)
+    try:
+        profiler = install_profiler(environ={}, output_dir=tmp_path, interval=0.001, duration=30)
+
+        os.kill(os.getpid(), signal.SIGUSR2)
+        time.sleep(0.1)
+        assert profiler.running
+
+        os.kill(os.getpid(), signal.SIGUSR2)
+        time.sleep(0.1)
+        assert not profiler.running
+        assert profiler.last_result["samples"] > 0
+    finally:
+        signal.signal(signal.SIGUSR2, previous)
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGUSR2"), reason="SIGUSR2 no disponible")
+def test_signal_handler_only_requests_toggle(tmp_path):
+    """Test de que el manejador de la señal delega el arranque en el hilo en espera"""
+    previous = signal.getsignal(signal.SIGUSR2)
+    try:
+        profiler = install_profiler(environ={}, output_dir=tmp_path, interval=0.001, duration=30)
+        callers = []
+        start = profiler.start
+
+        def recording_start(duration=None):
+            callers.append(threading.current_thread().name)
+            return start(duration)
+
+        profiler.start = recording_start
+        handler = signal.getsignal(signal.SIGUSR2)
+        handler(signal.SIGUSR2, None)
+        time.sleep(0.1)
+
+        assert profiler.running
+        assert callers == ["sampling-profiler-trigger"]
+        assert profiler.stop()["samples"] > 0
+    finally:
+        signal.signal(signal.SIGUSR2, previous)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
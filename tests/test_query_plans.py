@@ -0,0 +1,95 @@
+import pytest
+import sqlite3
+import logging
+from datetime import datetime, timedelta
+
+from src.mar_disrupcion.core.memory_schema import (
+    HOT_QUERIES,
+    REDUNDANT_INDEXES,
+    apply_schema,
+    create_memory_table,
+    explain_query_plan
+)
+
+logger = logging.getLogger(__name__)
+
+def _populate(conn):
+    """Inserta datos representativos para que ANALYZE genere estadísticas"""
+    now = datetime.now()
+    conn.executemany(
+        "INSERT INTO memories VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (f"{i:020d}", f"cat-{i % 12}", b"", (i % 100) / 100,
+             now - timedelta(minutes=i), now - timedelta(minutes=i % 50), i % 7, b"")
+            for i in range(5000)
+        ]
+    )
+    conn.executemany(
+        "INSERT INTO memory_relations VALUES (?, ?, 'related', ?)",
+        [(f"{i:020d}", f"{(i * 7) % 5000:020d}", (i % 10) / 10) for i in range(5000)]
+    )
+
+@pytest.fixture(params=["empty", "analyzed"])
+def conn(request):
+    """Fixture con el esquema aplicado, sin datos y con estadísticas"""
+    conn = sqlite3.connect(":memory:")
+    apply_schema(conn)
+    if request.param == "analyzed":
+        _populate(conn)
+        conn.execute("ANALYZE")
+    
+    yield conn
+    
+    conn.close()
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_index(conn, name):
+    """Test de que cada consulta caliente usa un índice sin ordenación temporal"""
+    sql, params = HOT_QUERIES[name]
+    plan = explain_query_plan(conn, sql, params)
+    logger.info(f"{name}: {plan}")
+    
+    assert any(step.startswith("SEARCH") for step in plan), plan
+    assert not any(step.startswith("SCAN memor") for step in plan), plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+
+def test_retrieve_query_is_index_ordered(conn):
+    """Test de que la recuperación por categoría resuelve el ORDER BY con el índice"""
+    sql, params = HOT_QUERIES["retrieve_by_category"]
+    plan = explain_query_plan(conn, sql, params)
+    
+    assert plan == ["SEARCH memories USING INDEX idx_memories_cat_imp_access (category=? AND importance>?)"]
+
+def test_retention_query_uses_timestamp_index(conn):
+    """Test de que la búsqueda de memorias expiradas recorre solo el rango anterior al corte"""
+    sql, params = HOT_QUERIES["expired_chunk"]
+    plan = explain_query_plan(conn, sql, params)
+    
+    assert plan == ["SEARCH memories USING COVERING INDEX idx_memories_time_imp (timestamp<?)"]
+
+def test_partition_tables_share_indexes(conn):
+    """Test de que las particiones diarias tienen los mismos índices"""
+    create_memory_table(conn, "memories_20240101")
+    sql, params = HOT_QUERIES["retrieve_by_category"]
+    plan = explain_query_plan(conn, sql.replace("FROM memories", "FROM memories_20240101"), params)
+    
+    assert "USING INDEX idx_memories_20240101_cat_imp_access" in plan[0]
+
+def test_apply_schema_drops_redundant_indexes():
+    """Test de migración de bases de datos con índices de versiones anteriores"""
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE memories (id TEXT PRIMARY KEY, category TEXT, importance REAL, timestamp DATETIME, last_accessed DATETIME)")
+    conn.execute("CREATE INDEX idx_category ON memories(category)")
+    conn.execute("CREATE INDEX idx_cat_time ON memories(category, timestamp)")
+    
+    apply_schema(conn)
+    apply_schema(conn)
+    
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert not indexes & set(REDUNDANT_INDEXES)
+    assert "idx_memories_cat_imp_access" in indexes
+    assert "idx_memories_time_imp" in indexes
+    assert "idx_relations_source_strength" in indexes
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
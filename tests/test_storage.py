@@ -0,0 +1,166 @@
+import pytest
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from src.mar_disrupcion.core.storage import (
+    STORAGE_PROFILES,
+    active_profile,
+    autotune,
+    configure_storage,
+    connect,
+    gated,
+    generation,
+    quiesce,
+    resolve_profile
+)
+
+CONFIG_FILE = Path(__file__).parent.parent / "config.toml"
+
+SYNCHRONOUS = {"off": 0, "normal": 1, "full": 2}
+TEMP_STORE = {"default": 0, "memory": 2}
+
+
+@pytest.fixture(autouse=True)
+def restore_profile():
+    """Restaura el perfil activo tras cada test."""
+    previous = active_profile()
+    yield
+    configure_storage(previous["name"])
+
+
+@pytest.mark.parametrize("name", sorted(STORAGE_PROFILES))
+def test_profile_pragmas_applied(tmp_path, name):
+    """Cada conexión aplica los PRAGMA del perfil activo"""
+    configure_storage(name)
+    expected = STORAGE_PROFILES[name]
+
+    with connect(tmp_path / "memory.db") as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == expected["journal_mode"]
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == SYNCHRONOUS[expected["synchronous"]]
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] == expected["cache_size"]
+        assert conn.execute("PRAGMA temp_store").fetchone()[0] == TEMP_STORE[expected["temp_store"]]
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == expected["busy_timeout"]
+
+
+def test_connect_commits_and_closes(tmp_path):
+    """connect confirma la transacción, la deshace ante errores y cierra la conexión"""
+    db_path = tmp_path / "memory.db"
+
+    with connect(db_path) as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.execute("INSERT INTO t VALUES (1)")
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+
+    with pytest.raises(RuntimeError):
+        with connect(db_path) as conn:
+            conn.execute("INSERT INTO t VALUES (2)")
+            raise RuntimeError("fallo")
+
+    with connect(db_path) as conn:
+        assert conn.execute("SELECT x FROM t").fetchall() == [(1,)]
+
+
+def test_quiesce_waits_for_connections(tmp_path):
+    """quiesce espera a las conexiones abiertas y retiene las nuevas hasta salir"""
+    db_path = tmp_path / "memory.db"
+    opened = []
+
+    def hold(seconds):
+        with connect(db_path):
+            opened.append(time.monotonic())
+            time.sleep(seconds)
+
+    holder = threading.Thread(target=hold, args=(0.2,))
+    holder.start()
+    while not opened:
+        time.sleep(0.01)
+
+    with quiesce(db_path, timeout=5):
+        entered = time.monotonic()
+        assert entered - opened[0] >= 0.2
+        waiter = threading.Thread(target=hold, args=(0,))
+        waiter.start()
+        time.sleep(0.1)
+        assert len(opened) == 1
+    waiter.join()
+    holder.join()
+    assert opened[1] > entered + 0.1
+
+    with connect(db_path):
+        with pytest.raises(TimeoutError):
+            with quiesce(db_path, timeout=0.05):
+                pass
+
+
+def test_quiesce_waits_for_gated_blocks(tmp_path):
+    """quiesce espera a los bloques de gated y cambia la generación al terminar"""
+    db_path = tmp_path / "memory.db"
+    before = generation(db_path)
+
+    with gated(db_path) as current:
+        assert current == before
+        with pytest.raises(TimeoutError):
+            with quiesce(db_path, timeout=0.05):
+                pass
+    assert generation(db_path) == before
+
+    with quiesce(db_path, timeout=1):
+        pass
+    with gated(db_path) as current:
+        assert current == generation(db_path) == before + 1
+
+
+def test_configured_profiles_override_defaults():
+    """Los perfiles de la configuración sustituyen valores de los incluidos"""
+    settings = configure_storage("balanced", {"balanced": {"cache_size": -1024}, "custom": {"synchronous": "full"}})
+    assert settings["cache_size"] == -1024
+    assert settings["synchronous"] == STORAGE_PROFILES["balanced"]["synchronous"]
+    assert resolve_profile("custom", {"custom": {"synchronous": "full"}})["synchronous"] == "full"
+
+    with pytest.raises(ValueError):
+        resolve_profile("inexistente")
+
+
+def test_config_file_selects_profile(tmp_path):
+    """La sección [storage] de config.toml selecciona el perfil a través de StorageConfig
+
+    core/config.py no se puede importar (arrastra un error de sintaxis en
+    setup_logging), así que se sigue su mismo camino: TOML, StorageConfig,
+    model_dump y configure_storage con el diccionario resultante, como hace
+    AdvancedMemorySystem.
+    """
+    toml = pytest.importorskip("toml")
+    pytest.importorskip("pydantic_settings")
+    from src.mar_disrupcion.core.config_models import StorageConfig
+
+    raw = toml.load(CONFIG_FILE)["storage"]
+    assert StorageConfig(**raw).model_dump()["profile"] == "balanced"
+
+    storage = StorageConfig(**dict(raw, profile="durable")).model_dump()
+    settings = configure_storage(storage["profile"], storage["profiles"])
+    assert settings == dict(STORAGE_PROFILES["durable"], name="durable")
+
+    with connect(tmp_path / "memory.db") as conn:
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == SYNCHRONOUS["full"]
+
+    assert StorageConfig().model_dump() == {"profile": "balanced", "profiles": {}}
+
+
+def test_autotune_reports_every_profile(tmp_path):
+    """autotune mide cada perfil en el directorio de destino y no deja archivos"""
+    results = autotune(tmp_path, rows=200, batch_size=50)
+
+    assert {r["profile"] for r in results} == set(STORAGE_PROFILES)
+    assert all(r["rows_per_second"] > 0 for r in results)
+    assert all(r["commit_p99_ms"] >= r["commit_p50_ms"] for r in results)
+    assert [r["rows_per_second"] for r in results] == sorted(
+        (r["rows_per_second"] for r in results), reverse=True
+    )
+    assert list(tmp_path.iterdir()) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])